@@ -0,0 +1,55 @@
+"""
+Registration throughput with and without group commits.
+
+Submits N concurrent registrations through AsyncUserRepository (writes that
+arrive together share one commit) and compares them with the same
+registrations made one add_user() call, and one commit, at a time.
+
+Run with: python -m benchmarks.bench_async [--writes 1000] [--backends json cached]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from src.async_repository import AsyncUserRepository
+from src.models import User
+from src.repository import create_repository
+
+BACKENDS = {'json': 'users.json', 'cached': 'users.json', 'log': 'users.json', 'sqlite': 'users.db'}
+
+def make_users(writes: int):
+    return [User(f"User{i}", f"user{i}@example.com", "Password1@") for i in range(writes)]
+
+def run_sequential(path: str, backend: str, writes: int) -> float:
+    repository = create_repository(path, backend)
+    start = time.perf_counter()
+    for user in make_users(writes):
+        repository.add_user(user)
+    return time.perf_counter() - start
+
+def run_grouped(path: str, backend: str, writes: int, commit_delay: float):
+    async def register_all():
+        async with AsyncUserRepository(create_repository(path, backend), commit_delay=commit_delay) as repository:
+            start = time.perf_counter()
+            await asyncio.gather(*(repository.add_user(user) for user in make_users(writes)))
+            return time.perf_counter() - start, repository.commits
+    return asyncio.run(register_all())
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Group commit throughput benchmark")
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument('--writes', type=int, default=1000, help="Concurrent registrations")
+    parser.add_argument('--commit-delay', type=float, default=0.005, help="Group commit window in seconds")
+    args = parser.parse_args()
+    print(f"{args.writes} registrations")
+    for backend in args.backends:
+        with tempfile.TemporaryDirectory() as tmp:
+            sequential = run_sequential(os.path.join(tmp, 'seq-' + BACKENDS[backend]), backend, args.writes)
+            grouped, commits = run_grouped(os.path.join(tmp, 'grp-' + BACKENDS[backend]), backend,
+                                           args.writes, args.commit_delay)
+        print(f"  {backend:<7} one commit each {args.writes / sequential:9.0f} writes/s   "
+              f"grouped {args.writes / grouped:9.0f} writes/s in {commits} commits")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Online backups and restore time.
+
+For each dataset size it takes a full backup of a repository, changes 1% of
+the users (updates, deletes and adds), takes an incremental backup, verifies
+the chain, and restores it into a new data store of each backend, checking
+the restore time against a target.
+
+Run with: python -m benchmarks.bench_backup --sizes 1000000 --target-seconds 60
+"""
+import os
+import tempfile
+import time
+from src.backup import BackupStore
+from src.models import User
+from src.repository import create_repository
+from .common import make_records, size_parser
+
+def timed(fn):
+    # Backups and restores are not repeatable, so they are timed once
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+def main() -> None:
+    parser = size_parser("Snapshot, incremental backup and restore")
+    parser.add_argument('--backend', default='cached', choices=['json', 'cached', 'log', 'sqlite', 'binary'],
+                        help="Backend of the data store that is backed up")
+    parser.add_argument('--restore-backends', nargs='+', default=['cached', 'sqlite'],
+                        choices=['json', 'cached', 'log', 'sqlite', 'binary', 'sharded'])
+    parser.add_argument('--workers', type=int, help="Threads compressing and decoding chunks")
+    parser.add_argument('--target-seconds', type=float, default=60.0, help="Restore time to stay under")
+    args = parser.parse_args()
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'users.db' if args.backend == 'sqlite' else 'users.json')
+            repository = create_repository(path, args.backend)
+            repository.bulk_add_users(User.from_dict(record) for record in make_records(size))
+            store = BackupStore(os.path.join(tmp, 'backups'), workers=args.workers)
+            print(f"{size} users ({args.backend})")
+
+            def report(label, entry, seconds):
+                stored = sum(chunk['length'] for chunk in entry['chunks'])
+                print(f"  {label:<12} {seconds:8.2f} s   {entry['changed']} written, {entry['deleted']} deleted, "
+                      f"{stored / 1e6:.2f} MB", flush=True)
+
+            entry, seconds = timed(lambda: store.backup(repository, full=True))
+            report('full backup', entry, seconds)
+            users = repository.get_all_users()
+            changes = max(1, size // 100)
+            repository.update_many({'user_id': user.user_id, 'name': user.name + ' Jr'} for user in users[:changes])
+            repository.delete_many(user.user_id for user in users[-changes:])
+            repository.bulk_add_users(User(f"New{i}", f"new{i}@example.com", "Password1@") for i in range(changes))
+            entry, seconds = timed(lambda: store.backup(repository))
+            report('delta backup', entry, seconds)
+            _, seconds = timed(store.verify)
+            print(f"  {'verify':<12} {seconds:8.2f} s")
+            for backend in args.restore_backends:
+                target = os.path.join(tmp, f"restored-{backend}", 'users.db' if backend == 'sqlite' else 'users.json')
+                restored, seconds = timed(lambda: store.restore(target, backend))
+                count = sum(1 for _ in restored.iter_users())
+                verdict = 'under' if seconds <= args.target_seconds else 'OVER'
+                print(f"  restore {backend:<8} {seconds:8.2f} s   {count} users   "
+                      f"({verdict} the {args.target_seconds:.0f} s target)", flush=True)
+                if hasattr(restored, 'close'):
+                    restored.close()
+            if hasattr(repository, 'close'):
+                repository.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+JSON versus the memory-mapped binary format.
+
+For each dataset size it writes the users as JSON, converts them to the
+binary format, and compares the file sizes, the conversion time and the
+latency of one lookup by email and by UserID on a freshly opened
+repository (cold: the JSON backends parse the whole file first, the binary
+one maps it and binary-searches the offset tables) and on an open one.
+
+Run with: python -m benchmarks.bench_binary --sizes 100000 1000000
+"""
+import os
+import tempfile
+from src.binary_repository import json_to_binary
+from src.models import User
+from src.repository import create_repository, dump_users
+from .common import make_records, measure, size_parser
+
+def drop_startup_files(path: str) -> None:
+    # The cached backend's warm-start files would hide the JSON parse
+    for side_file in (path + '.snapshot', path + '.names'):
+        if os.path.exists(side_file):
+            os.remove(side_file)
+
+def main() -> None:
+    parser = size_parser("JSON vs binary storage format")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per measurement (fastest is kept)")
+    args = parser.parse_args()
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path, binary_path = os.path.join(tmp, 'users.json'), os.path.join(tmp, 'users.bin')
+            with open(json_path, 'w') as f:
+                dump_users((User.from_dict(record) for record in make_records(size)), f)
+            _, convert_seconds, _ = measure(lambda: json_to_binary(json_path, binary_path))
+            json_size, binary_size = os.path.getsize(json_path), os.path.getsize(binary_path)
+            print(f"{size} users: JSON {json_size / 1e6:.1f} MB, binary {binary_size / 1e6:.1f} MB "
+                  f"({binary_size / json_size:.0%}), conversion {convert_seconds:.2f} s")
+            email = f"user{size // 2}@example.com"
+            user_id = create_repository(binary_path).get_by_email(email).user_id
+            for backend, path in [('json', json_path), ('cached', json_path), ('binary', binary_path)]:
+                setup = (lambda: drop_startup_files(json_path)) if backend == 'cached' else None
+                rows = {
+                    'cold get_by_email': lambda *_: create_repository(path, backend).get_by_email(email),
+                    'cold get_by_id': lambda *_: create_repository(path, backend).get_by_id(user_id),
+                }
+                repository = create_repository(path, backend)
+                repository.get_by_email(email)
+                rows['warm get_by_email'] = lambda *_: repository.get_by_email(email)
+                for name, fn in rows.items():
+                    _, seconds, _ = measure(fn, setup if name.startswith('cold') else None, args.repeat)
+                    print(f"  {backend:<7} {name:<18} {seconds * 1000:10.3f} ms", flush=True)
+
+if __name__ == "__main__":
+    main()
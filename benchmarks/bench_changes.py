@@ -0,0 +1,59 @@
+"""
+Incremental sync through the change feed versus re-reading the data file.
+
+For each dataset size it seeds a repository with the change feed enabled
+(so the feed holds one event per user), makes a few more changes, then
+compares what a downstream consumer pays to catch up: changes_since(cursor)
+versus loading every user and diffing against its previous copy. It also
+times add_user with the feed off and on.
+
+Run with: python -m benchmarks.bench_changes --sizes 100000 --changes 10 1000
+"""
+import os
+import tempfile
+from itertools import count
+from src.models import User
+from src.repository import create_repository
+from .common import make_records, measure, size_parser
+
+def main() -> None:
+    parser = size_parser("Change feed catch-up vs full re-read")
+    parser.add_argument('--changes', type=int, nargs='+', default=[10, 1000],
+                        help="Numbers of changes the consumer is behind")
+    parser.add_argument('--backend', default='cached', choices=['json', 'cached', 'log', 'sqlite', 'binary'])
+    args = parser.parse_args()
+    serial = count()
+
+    def new_user() -> User:
+        n = next(serial)
+        return User(f"New{n}", f"new{n}@example.com", "Password1@")
+
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'users.db' if args.backend == 'sqlite' else 'users.json')
+            repository = create_repository(path, args.backend, change_feed=True)
+            repository.bulk_add_users(User.from_dict(record) for record in make_records(size))
+            feed = repository.change_feed
+            print(f"{size} users ({args.backend}), feed {os.path.getsize(feed.path) / 1e6:.1f} MB")
+            previous = {user.user_id: user.to_dict() for user in repository.get_all_users()}
+            for behind in args.changes:
+                cursor = feed.last_seq()
+                repository.bulk_add_users(new_user() for _ in range(behind))
+
+                def full_diff() -> int:
+                    current = create_repository(path, args.backend).get_all_users()
+                    return sum(1 for user in current if previous.get(user.user_id) != user.to_dict())
+
+                _, feed_seconds, _ = measure(lambda: feed.changes_since(cursor), repeat=3)
+                _, diff_seconds, _ = measure(full_diff)
+                print(f"  {behind:>6} changes behind: changes_since {feed_seconds * 1000:10.3f} ms   "
+                      f"re-read and diff {diff_seconds * 1000:10.1f} ms", flush=True)
+            for label, feed_on in (('feed off', None), ('feed on', feed)):
+                repository.change_feed = feed_on
+                _, seconds, _ = measure(repository.add_user, new_user, repeat=5)
+                print(f"  add_user {label:<9} {seconds * 1000:10.3f} ms")
+            if hasattr(repository, 'close'):
+                repository.close()
+
+if __name__ == "__main__":
+    main()
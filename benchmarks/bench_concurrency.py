@@ -0,0 +1,60 @@
+"""
+Concurrent write stress test for the storage backends.
+
+Starts N threads (sharing one repository) or N processes (one repository
+each) that add users to the same data store, then reports throughput and
+checks that no write was lost.
+
+Run with: python -m benchmarks.bench_concurrency [--workers 4] [--writes 200]
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from src.models import User
+from src.repository import create_repository
+
+BACKENDS = {'json': 'users.json', 'cached': 'users.json', 'log': 'users.json', 'sqlite': 'users.db'}
+
+def add_users(path: str, backend: str, worker: int, writes: int, repository=None) -> None:
+    """
+    Add writes users with unique emails from one worker.
+    """
+    repository = repository or create_repository(path, backend)
+    for i in range(writes):
+        repository.add_user(User(f"User{worker}x{i}", f"user{worker}x{i}@example.com", "Password1@"))
+
+def run(backend: str, mode: str, workers: int, writes: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, BACKENDS[backend])
+        shared = create_repository(path, backend)
+        if mode == 'threads':
+            runners = [threading.Thread(target=add_users, args=(path, backend, n, writes, shared)) for n in range(workers)]
+        else:
+            runners = [multiprocessing.Process(target=add_users, args=(path, backend, n, writes)) for n in range(workers)]
+        start = time.perf_counter()
+        for runner in runners:
+            runner.start()
+        for runner in runners:
+            runner.join()
+        elapsed = time.perf_counter() - start
+        stored = len(create_repository(path, backend).get_all_users())
+        expected = workers * writes
+        print(f"  {backend:<7} {mode:<10} {expected / elapsed:9.0f} writes/s   "
+              f"stored {stored}/{expected}   lost {expected - stored}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Concurrent write stress test")
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument('--workers', type=int, default=4, help="Threads or processes per run")
+    parser.add_argument('--writes', type=int, default=200, help="Users added by each worker")
+    args = parser.parse_args()
+    print(f"{args.workers} workers x {args.writes} writes")
+    for backend in args.backends:
+        for mode in ('threads', 'processes'):
+            run(backend, mode, args.workers, args.writes)
+
+if __name__ == "__main__":
+    main()
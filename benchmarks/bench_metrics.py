@@ -0,0 +1,41 @@
+"""
+Overhead of the metrics instrumentation.
+
+Times cached-repository lookups (an instrumented hot path) with metrics
+disabled and enabled, next to the same lookup without the instrumentation
+wrapper.
+
+Run with: python -m benchmarks.bench_metrics [--calls 200000]
+"""
+import argparse
+import os
+import tempfile
+import time
+from src import metrics
+from src.models import User
+from src.repository import CachedUserRepository
+
+def per_call(fn, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn("user5@example.com")
+    return (time.perf_counter() - start) / calls
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Metrics instrumentation overhead")
+    parser.add_argument('--calls', type=int, default=200_000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        repository = CachedUserRepository(os.path.join(tmp, 'users.json'))
+        repository.bulk_add_users(User(f"User{i}", f"user{i}@example.com", "Password1@") for i in range(1000))
+        uninstrumented = CachedUserRepository.get_by_email.__wrapped__.__get__(repository)
+        rows = [('no metrics wrapper', uninstrumented, False),
+                ('metrics disabled', repository.get_by_email, False),
+                ('metrics enabled', repository.get_by_email, True)]
+        for label, fn, enabled in rows:
+            metrics.REGISTRY.enabled = enabled
+            print(f"  {label:<18} {per_call(fn, args.calls) * 1e9:8.0f} ns/call")
+        metrics.REGISTRY.enabled = False
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Memory and load-time benchmark for the User representation.
+
+Compares a dict-backed user class (the previous User layout), the slotted
+User and the columnar UserTable, and the old json.load + from_dict load path
+against decoding straight into User/UserTable.
+
+Run with: python -m benchmarks.bench_models [--sizes 100000 1000000]
+"""
+import json
+from src.models import User, UserTable
+from .common import make_records, measure, retained_bytes, size_parser
+
+class DictUser:
+    """
+    User with a per-instance __dict__, as User was before __slots__.
+    """
+    def __init__(self, name, email, password, user_id):
+        self.user_id = user_id
+        self.name = name
+        self.email = email
+        self.password = password
+
+def main() -> None:
+    args = size_parser(__doc__.strip().splitlines()[0]).parse_args()
+    for size in args.sizes:
+        records = make_records(size)
+        text = json.dumps(records, indent=4)
+        print(f"\n{size:,} users ({len(text) / 1e6:.1f} MB of JSON)")
+
+        # Per-user memory, counting only the containers (field strings are shared)
+        holders = {
+            'dicts': lambda: [dict(r) for r in records],
+            'dict-backed class': lambda: [DictUser(r['name'], r['email'], r['password'], r['user_id']) for r in records],
+            'User (__slots__)': lambda: [User(r['name'], r['email'], r['password'], r['user_id']) for r in records],
+            'UserTable': lambda: UserTable(User(r['name'], r['email'], r['password'], r['user_id']) for r in records),
+        }
+        for label, build in holders.items():
+            _, retained = retained_bytes(build)
+            print(f"  memory  {label:<28} {retained / size:7.1f} B/user")
+
+        loaders = {
+            'json.loads + from_dict': lambda: [User.from_dict(d) for d in json.loads(text)],
+            'User.list_from_json': lambda: User.list_from_json(text),
+            'UserTable.from_json': lambda: UserTable.from_json(text),
+        }
+        for label, load in loaders.items():
+            _, elapsed, peak = measure(load)
+            print(f"  load    {label:<28} {elapsed:7.3f} s   peak {peak / 1e6:8.1f} MB")
+        del records, text
+
+if __name__ == "__main__":
+    main()
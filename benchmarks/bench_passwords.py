@@ -0,0 +1,31 @@
+"""
+Password hashing throughput with one process and with a process pool.
+
+Run with: python -m benchmarks.bench_passwords [--count 200] [--workers 1 4] [--cost 14]
+"""
+import argparse
+import os
+import time
+from src.passwords import ALGORITHMS, PasswordHasher
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Password hashing throughput")
+    parser.add_argument('--algorithm', choices=ALGORITHMS, default='scrypt')
+    parser.add_argument('--cost', type=int, help="Work factor (algorithm default if omitted)")
+    parser.add_argument('--count', type=int, default=200, help="Passwords to hash")
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted({1, os.cpu_count() or 1}))
+    args = parser.parse_args()
+    hasher = PasswordHasher(args.algorithm, args.cost)
+    passwords = [f"Password{i}@" for i in range(args.count)]
+    print(f"{args.count} passwords, {hasher.algorithm} cost {hasher.cost}")
+    start = time.perf_counter()
+    hasher.verify(passwords[0], hasher.hash(passwords[0]))
+    print(f"  single hash + verify {1000 * (time.perf_counter() - start):8.1f} ms")
+    for workers in args.workers:
+        start = time.perf_counter()
+        hasher.hash_many(passwords, workers=workers)
+        elapsed = time.perf_counter() - start
+        print(f"  {workers:>3} worker(s) {args.count / elapsed:9.1f} hashes/s")
+
+if __name__ == "__main__":
+    main()
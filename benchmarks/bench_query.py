@@ -0,0 +1,70 @@
+"""
+Planned multi-field queries versus filtering and sorting every user.
+
+For each dataset size and backend it runs a few queries through
+repository.query() and through the code they replace (get_all_users(),
+a list comprehension and a full sort), prints the plan of each query and
+checks that both return the same users. Users are spread over 100 email
+domains so the domain index has something to select.
+
+Run with: python -m benchmarks.bench_query --sizes 100000 1000000
+"""
+import os
+import tempfile
+from src.models import User
+from src.query import UserQuery
+from src.repository import create_repository
+from .common import make_records, measure, size_parser
+
+DOMAINS = 100
+
+def make_users(size: int):
+    for i, record in enumerate(make_records(size)):
+        record['email'] = f"user{i}@d{i % DOMAINS}.example.com"
+        yield User.from_dict(record)
+
+def naive(repository, criteria):
+    query = UserQuery(**criteria)
+    matches = [user for user in repository.get_all_users() if query.matches(user)]
+    if query.order_field:
+        matches.sort(key=query.sort_key(), reverse=query.descending)
+    return matches[:query.limit]
+
+def main() -> None:
+    parser = size_parser("Planned queries vs full scans")
+    parser.add_argument('--backends', nargs='+', default=['cached', 'sqlite'],
+                        choices=['json', 'cached', 'log', 'sqlite', 'binary', 'sharded'])
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per measurement (fastest is kept)")
+    args = parser.parse_args()
+    for size in args.sizes:
+        queries = [
+            {'name_prefix': f"user{size // 7}", 'email_domain': f"d{size // 7 % DOMAINS}.example.com",
+             'order_by': 'name', 'limit': 10},
+            {'email_domain': 'd7.example.com', 'order_by': '-email', 'limit': 10},
+            {'name_contains': '4242', 'limit': 10},
+            {'order_by': 'email', 'limit': 10},
+        ]
+        for backend in args.backends:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, 'users.db' if backend == 'sqlite' else 'users.json')
+                repository = create_repository(path, backend)
+                repository.bulk_add_users(make_users(size))
+                print(f"{size} users ({backend})")
+                for criteria in queries:
+                    planned, query_seconds, _ = measure(lambda: list(repository.query(**criteria)), repeat=args.repeat)
+                    scanned, scan_seconds, _ = measure(lambda: naive(repository, criteria), repeat=args.repeat)
+                    query = UserQuery(**criteria)
+                    if query.order_field:
+                        key = query.sort_key()
+                        same = list(map(key, planned)) == list(map(key, scanned))
+                    else:
+                        # Unordered results may be any limit matches
+                        same = len(planned) == len(scanned) and all(map(query.matches, planned))
+                    print(f"  {criteria}\n    plan: {repository.query(**criteria).plan}\n"
+                          f"    query {query_seconds * 1000:10.3f} ms   scan and sort {scan_seconds * 1000:10.1f} ms"
+                          f"   {'same results' if same else 'DIFFERENT RESULTS'}", flush=True)
+                if hasattr(repository, 'close'):
+                    repository.close()
+
+if __name__ == "__main__":
+    main()
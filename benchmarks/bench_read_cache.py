@@ -0,0 +1,110 @@
+"""
+Lookup latency with and without a ReadThroughCache under a Zipfian workload.
+
+Lookups by email, by UserID and by name (with the console's search limit)
+pick their user from a Zipf distribution, so a few users are looked up very
+often and most rarely, as in console and API traffic. A small share of the
+operations rename a user, through the cache, so entries get invalidated.
+The same operations run against the repository directly and through the
+cache; lookup latencies (mean, p50, p99) are compared, and a sample of the
+cached results is checked against the repository.
+
+Run with: python -m benchmarks.bench_read_cache --sizes 100000 1000000
+"""
+import os
+import random
+import tempfile
+import time
+from itertools import accumulate
+from typing import List, Tuple
+from src.models import User
+from src.read_cache import ReadThroughCache
+from src.repository import create_repository
+from .common import make_records, size_parser
+
+SEARCH_LIMIT = 10
+
+def zipf_operations(size: int, count: int, exponent: float, write_ratio: float, seed: int) -> List[Tuple[str, int]]:
+    """
+    Draw (kind, user index) operations, the users following a Zipf distribution over a random ranking.
+    """
+    rng = random.Random(seed)
+    ranking = list(range(size))
+    rng.shuffle(ranking)
+    cum_weights = list(accumulate(1 / rank ** exponent for rank in range(1, size + 1)))
+    picks = rng.choices(ranking, cum_weights=cum_weights, k=count)
+    kinds = rng.choices(['email', 'id', 'name', 'write'], weights=[0.4, 0.3, 0.3 - write_ratio, write_ratio], k=count)
+    return list(zip(kinds, picks))
+
+def lookup(repository, kind: str, user: User, index: int):
+    if kind == 'email':
+        return repository.get_by_email(user.email)
+    if kind == 'id':
+        return repository.get_by_id(user.user_id)
+    return repository.find_by_name(f"User{index}", limit=SEARCH_LIMIT)
+
+def run(repository, users: List[User], operations: List[Tuple[str, int]]) -> List[float]:
+    """
+    Run the operations, returning the latency of each lookup.
+    """
+    latencies = []
+    for kind, index in operations:
+        user = users[index]
+        if kind == 'write':
+            repository.update_user(user.user_id, name=f"User{index}x")
+            continue
+        start = time.perf_counter()
+        lookup(repository, kind, user, index)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def describe(latencies: List[float]) -> str:
+    ordered = sorted(latencies)
+    mean = sum(ordered) / len(ordered)
+    p50, p99 = ordered[len(ordered) // 2], ordered[int(len(ordered) * 0.99)]
+    return f"mean {mean * 1e6:9.1f} us   p50 {p50 * 1e6:9.1f} us   p99 {p99 * 1e6:9.1f} us"
+
+def as_dicts(result):
+    if isinstance(result, list):
+        return [user.to_dict() for user in result]
+    return None if result is None else result.to_dict()
+
+def main() -> None:
+    parser = size_parser("Zipfian lookups with and without the read-through cache")
+    parser.add_argument('--backends', nargs='+', default=['cached', 'sqlite'],
+                        choices=['json', 'cached', 'log', 'sqlite', 'binary', 'sharded'])
+    parser.add_argument('--operations', type=int, default=20000, help="Operations per run")
+    parser.add_argument('--exponent', type=float, default=1.1, help="Zipf exponent (higher is more skewed)")
+    parser.add_argument('--write-ratio', type=float, default=0.001, help="Share of operations renaming a user")
+    parser.add_argument('--cache-size', type=int, default=10000, help="Maximum number of cached results")
+    args = parser.parse_args()
+    for size in args.sizes:
+        operations = zipf_operations(size, args.operations, args.exponent, args.write_ratio, seed=size)
+        for backend in args.backends:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, {'sqlite': 'users.db', 'binary': 'users.bin'}.get(backend, 'users.json'))
+                repository = create_repository(path, backend)
+                users = [User.from_dict(record) for record in make_records(size)]
+                repository.bulk_add_users(users)
+                print(f"{size} users ({backend}), {args.operations} operations, Zipf exponent {args.exponent}",
+                      flush=True)
+                direct = run(repository, users, operations)
+                print(f"  repository       {describe(direct)}", flush=True)
+                cache = ReadThroughCache(repository, maxsize=args.cache_size)
+                cached = run(cache, users, operations)
+                stats = cache.stats()
+                print(f"  read-through     {describe(cached)}   {sum(direct) / sum(cached):6.1f}x faster\n"
+                      f"  hit ratio {stats['hit_ratio']:.1%}, {stats['size']} entries "
+                      f"(~{stats['bytes'] / 2 ** 20:.1f} MB), {stats['evictions']} evicted, "
+                      f"{stats['expirations']} expired, {stats['invalidations']} invalidated", flush=True)
+                # Every sampled lookup, answered from the cache where it is still cached, agrees with the repository
+                lookups = [operation for operation in operations if operation[0] != 'write']
+                same = all(as_dicts(lookup(cache, kind, users[index], index))
+                           == as_dicts(lookup(repository, kind, users[index], index))
+                           for kind, index in random.Random(0).sample(lookups, min(500, len(lookups))))
+                print(f"  {'cached results match the repository' if same else 'CACHED RESULTS DIFFER'}", flush=True)
+                if hasattr(repository, 'close'):
+                    repository.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Single data file versus sharded storage.
+
+For each dataset size it loads the users into a single repository and into
+sharded repositories with several shard counts, then times a write (JSON
+backends rewrite only the written shard), point lookups and the fan-out
+reads.
+
+Run with: python -m benchmarks.bench_sharding --sizes 100000 --shards 4 16
+"""
+import os
+import tempfile
+from itertools import count
+from src.models import User
+from src.repository import create_repository
+from src.sharded_repository import ShardedUserRepository
+from .common import make_records, measure, size_parser
+
+def open_repository(path: str, shards: int, backend: str):
+    if shards == 1:
+        return create_repository(path, backend)
+    return ShardedUserRepository(path, shards=shards, shard_backend=backend)
+
+def main() -> None:
+    parser = size_parser("Single file vs sharded repository")
+    parser.add_argument('--shards', type=int, nargs='+', default=[4, 16], help="Shard counts to compare")
+    parser.add_argument('--backend', default='cached', choices=['json', 'cached', 'log', 'sqlite'],
+                        help="Backend of the single repository and of each shard")
+    args = parser.parse_args()
+    for size in args.sizes:
+        users = [User.from_dict(record) for record in make_records(size)]
+        print(f"{size} users ({args.backend})")
+        for shards in [1] + args.shards:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, 'users.db' if args.backend == 'sqlite' and shards == 1 else 'users.json')
+                repository = open_repository(path, shards, args.backend)
+                repository.bulk_add_users(users)
+                serial = count()
+
+                def new_user() -> User:
+                    n = next(serial)
+                    return User(f"New{n}", f"new{n}@example.com", "Password1@")
+
+                rows = {
+                    'add_user': (new_user, repository.add_user),
+                    'get_by_email': (None, lambda: repository.get_by_email(f"user{size // 2}@example.com")),
+                    'get_by_id': (None, lambda: repository.get_by_id(users[size // 3].user_id)),
+                    'find_by_name': (None, lambda: repository.find_by_name("User99", limit=10)),
+                    'get_all_users': (None, repository.get_all_users),
+                }
+                label = 'single' if shards == 1 else f"{shards} shards"
+                for name, (setup, fn) in rows.items():
+                    _, seconds, _ = measure(fn, setup, repeat=3)
+                    print(f"  {label:<10} {name:<14} {seconds * 1000:10.3f} ms", flush=True)
+                if hasattr(repository, 'close'):
+                    repository.close()
+        del users
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Startup cost of the console app.
+
+Measures, in fresh interpreters, the time to import src.app and to
+construct UserManagementApp (which opens nothing), then for each dataset
+size the time to the first answered query on a cold start (JSON parsed,
+no snapshot) and on a warm start (binary snapshot and name index reused).
+
+Run with: python -m benchmarks.bench_startup --sizes 1000000
+"""
+import os
+import subprocess
+import sys
+import tempfile
+from src.models import User
+from src.repository import dump_users
+from .common import make_records, size_parser
+
+IMPORT_SCRIPT = """
+import time
+start = time.perf_counter()
+from src.app import UserManagementApp
+imported = time.perf_counter()
+UserManagementApp()
+print(imported - start, time.perf_counter() - imported)
+"""
+
+FIRST_QUERY_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+from src.app import UserManagementApp
+app = UserManagementApp()
+app.repository.get_by_email(sys.argv[1])
+print(time.perf_counter() - start)
+app.repository.save_snapshot()  # as the app does on exit, for the warm starts
+"""
+
+def run_script(script: str, *args: str, env=None) -> list:
+    """
+    Run a timing script in a fresh interpreter and parse the numbers it prints.
+    """
+    output = subprocess.run([sys.executable, '-c', script, *args], check=True, capture_output=True,
+                            text=True, env=env).stdout
+    return [float(value) for value in output.split()]
+
+def best_of(repeat: int, script: str, *args: str, env=None) -> list:
+    """
+    Run a timing script several times and keep the fastest value of each number.
+    """
+    runs = [run_script(script, *args, env=env) for _ in range(repeat)]
+    return [min(values) for values in zip(*runs)]
+
+def main() -> None:
+    parser = size_parser("Console app startup time")
+    parser.set_defaults(sizes=[1_000_000])
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per measurement (fastest is kept)")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATA_FILE_PATH=os.path.join(tmp, 'empty.json'))
+        imported, constructed = best_of(args.repeat, IMPORT_SCRIPT, env=env)
+        print(f"import src.app          {imported * 1000:10.1f} ms")
+        print(f"UserManagementApp()     {constructed * 1000:10.1f} ms")
+        for size in args.sizes:
+            path = os.path.join(tmp, f'users-{size}.json')
+            with open(path, 'w') as f:
+                dump_users((User.from_dict(record) for record in make_records(size)), f)
+            env = dict(os.environ, DATA_FILE_PATH=path, STORAGE_BACKEND='cached')
+            email = f"user{size // 2}@example.com"
+            cold = float('inf')
+            for _ in range(args.repeat):
+                for side_file in (path + '.snapshot', path + '.names'):
+                    if os.path.exists(side_file):
+                        os.remove(side_file)
+                cold = min(cold, run_script(FIRST_QUERY_SCRIPT, email, env=env)[0])
+            warm, = best_of(args.repeat, FIRST_QUERY_SCRIPT, email, env=env)
+            print(f"{size:>9} users  first query  cold {cold:8.3f} s   warm {warm:8.3f} s   "
+                  f"({cold / warm:.1f}x)", flush=True)
+
+if __name__ == "__main__":
+    main()
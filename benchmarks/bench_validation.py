@@ -0,0 +1,52 @@
+"""
+Bulk validation throughput: per-call string regexes vs the validation engine.
+
+The "legacy" column validates each record the way User.validate_* used to,
+with re.match on pattern strings; "engine" is validation.validate_many with
+the set-backed duplicate check.
+
+Run with: python -m benchmarks.bench_validation [--sizes 100000 1000000]
+"""
+import re
+import time
+from benchmarks.common import make_records, size_parser
+from src.validation import validate_many
+
+LEGACY_EMAIL = r'^[^@\s]+@[^@\s]+\.[^@\s]+$'
+LEGACY_PASSWORD = r'^(?=.*[0-9])(?=.*[a-z])(?=.*[A-Z])(?=.*[@#$%^&+=])(?=\S+$).{8,}$'
+
+def legacy_validate(records):
+    errors = []
+    for index, record in enumerate(records):
+        if not record.get('name'):
+            errors.append((index, "missing name"))
+        elif not re.match(LEGACY_EMAIL, record.get('email') or ''):
+            errors.append((index, "invalid email"))
+        elif not re.match(LEGACY_PASSWORD, record.get('password') or ''):
+            errors.append((index, "invalid password"))
+    return errors
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+def main() -> None:
+    args = size_parser("Bulk validation benchmark").parse_args()
+    for size in args.sizes:
+        records = make_records(size)
+        # Make every 10th record invalid and every 100th a duplicate
+        for index in range(0, size, 10):
+            records[index]['password'] = "weak"
+        for index in range(5, size, 100):
+            records[index]['email'] = records[index - 1]['email']
+        legacy, legacy_time = timed(lambda: legacy_validate(records))
+        engine, engine_time = timed(lambda: validate_many(records))
+        _, dedupe_time = timed(lambda: validate_many(records, existing_emails=()))
+        assert legacy == engine
+        print(f"{size:>9} records  legacy {legacy_time:6.2f}s ({size / legacy_time:9.0f}/s)  "
+              f"engine {engine_time:6.2f}s ({size / engine_time:9.0f}/s)  "
+              f"engine + duplicates {dedupe_time:6.2f}s")
+
+if __name__ == "__main__":
+    main()
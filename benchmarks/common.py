@@ -0,0 +1,86 @@
+"""
+Shared helpers for the benchmark scripts.
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+
+def make_records(count: int) -> List[Dict[str, str]]:
+    """
+    Generate synthetic user records in the users.json format.
+    Args:
+        count (int): Number of records
+    Returns:
+        List[Dict[str, str]]: User records with unique emails
+    """
+    return [
+        {
+            'user_id': str(uuid.UUID(int=i + 1)),
+            'name': f"User{i}",
+            'email': f"user{i}@example.com",
+            'password': f"Password{i}@"
+        }
+        for i in range(count)
+    ]
+
+def measure(fn: Callable[..., Any], setup: Optional[Callable[[], Any]] = None,
+            repeat: int = 1) -> Tuple[Any, float, int]:
+    """
+    Time fn, then run it again with tracemalloc to get its peak memory.
+    The two runs are separate because tracing slows allocation-heavy code down.
+    Args:
+        fn (Callable[..., Any]): Function to run (given setup's result when there is a setup)
+        setup (Optional[Callable[[], Any]]): Untimed preparation run before every call of fn
+        repeat (int): Number of timed runs; the fastest one is reported
+    Returns:
+        Tuple[Any, float, int]: (result, seconds, peak bytes allocated during the call)
+    """
+    elapsed = float('inf')
+    for _ in range(repeat):
+        args = () if setup is None else (setup(),)
+        gc.collect()
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = min(elapsed, time.perf_counter() - start)
+        del result
+    args = () if setup is None else (setup(),)
+    gc.collect()
+    tracemalloc.start()
+    result = fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+def retained_bytes(fn: Callable[[], Any]) -> Tuple[Any, int]:
+    """
+    Measure how much memory the object returned by fn keeps alive.
+    Args:
+        fn (Callable[[], Any]): Function building the object
+    Returns:
+        Tuple[Any, int]: (result, bytes still allocated after the call)
+    """
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+def size_parser(description: str) -> argparse.ArgumentParser:
+    """
+    Build an argument parser with the common --sizes option.
+    Args:
+        description (str): Benchmark description
+    Returns:
+        argparse.ArgumentParser: Parser to extend and run
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="Dataset sizes (number of users)")
+    return parser
@@ -0,0 +1,116 @@
+"""
+Load generator for the HTTP service.
+
+Runs N client threads, each on its own keep-alive connection, for a fixed
+number of requests per endpoint, and reports p50/p99 latency and requests/s
+per endpoint. Without --port it starts a server in this process on a
+temporary data file seeded with --users users.
+
+Run with: python -m benchmarks.load_http [--port 8000] [--clients 8] [--requests 500]
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from src.models import User
+from src.passwords import PasswordHasher
+from src.repository import create_repository
+from src.server import UserHTTPServer, UserService
+
+ENDPOINTS = ['list', 'search', 'get', 'register', 'login']
+PASSWORD = "Password1@"
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def start_server(directory: str, users: int, backend: str) -> Tuple[UserHTTPServer, int]:
+    hasher = PasswordHasher("scrypt", cost=4)
+    repository = create_repository(os.path.join(directory, 'users.db' if backend == 'sqlite' else 'users.json'), backend)
+    stored = hasher.hash(PASSWORD)
+    repository.bulk_add_users(User(f"User{i}", f"user{i}@example.com", stored) for i in range(users))
+    # All clients share one address: lift the login rate limit so logins are measured, not rejections
+    service = UserService(repository, hasher, login_rate=1e9, login_burst=1_000_000)
+    server = UserHTTPServer(("127.0.0.1", 0), service)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_address[1]
+
+def client(port: int, endpoint: str, count: int, users: int, worker: int, latencies: List[float],
+           errors: List[int], user_ids: List[str]) -> None:
+    rng = random.Random(worker)
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    for i in range(count):
+        body = None
+        method = 'GET'
+        if endpoint == 'list':
+            path = f"/users?offset={rng.randrange(max(1, users - 20))}&limit=20"
+        elif endpoint == 'search':
+            path = f"/users/search?name=user{rng.randrange(1000)}&limit=10"
+        elif endpoint == 'get':
+            path = f"/users/{rng.choice(user_ids)}"
+        elif endpoint == 'register':
+            method, path = 'POST', "/users"
+            body = {'name': "Loadtest", 'email': f"load{worker}x{i}x{time.time_ns()}@example.com", 'password': PASSWORD}
+        else:
+            # One email per request: the per-email rate limiter would otherwise reject most attempts
+            method, path = 'POST', "/login"
+            body = {'email': f"user{(worker * count + i) % users}@example.com", 'password': PASSWORD}
+        start = time.perf_counter()
+        conn.request(method, path, body=None if body is None else json.dumps(body))
+        response = conn.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        if response.status >= 400:
+            errors.append(response.status)
+    conn.close()
+
+def run_endpoint(port: int, endpoint: str, clients: int, requests: int, users: int,
+                 user_ids: List[str]) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors: List[int] = []
+    per_client = max(1, requests // clients)
+    threads = [threading.Thread(target=client, args=(port, endpoint, per_client, users, n, latencies, errors, user_ids))
+               for n in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {'p50': percentile(latencies, 0.50), 'p99': percentile(latencies, 0.99),
+            'rps': len(latencies) / elapsed, 'errors': len(errors)}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="HTTP service load generator")
+    parser.add_argument('--port', type=int, help="Port of a running server (default: start one in-process)")
+    parser.add_argument('--users', type=int, default=10_000, help="Users to seed the in-process server with")
+    parser.add_argument('--backend', default='cached', help="Backend of the in-process server")
+    parser.add_argument('--clients', type=int, default=8, help="Concurrent keep-alive connections")
+    parser.add_argument('--requests', type=int, default=500, help="Requests per endpoint")
+    parser.add_argument('--endpoints', nargs='+', default=ENDPOINTS, choices=ENDPOINTS)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        server: Optional[UserHTTPServer] = None
+        port = args.port
+        if port is None:
+            server, port = start_server(tmp, args.users, args.backend)
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        conn.request('GET', f"/users?limit={min(args.users, 1000)}")
+        user_ids = [user['user_id'] for user in json.loads(conn.getresponse().read())['users']]
+        conn.close()
+        print(f"{args.clients} clients, {args.requests} requests per endpoint")
+        for endpoint in args.endpoints:
+            result = run_endpoint(port, endpoint, args.clients, args.requests, args.users, user_ids)
+            print(f"  {endpoint:<9} p50 {1000 * result['p50']:7.2f} ms   p99 {1000 * result['p99']:7.2f} ms   "
+                  f"{result['rps']:8.0f} req/s   {result['errors']} errors")
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+if __name__ == "__main__":
+    main()
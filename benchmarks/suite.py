@@ -0,0 +1,161 @@
+"""
+Benchmark suite for the repository and model hot paths.
+
+For each dataset size and storage backend it times User.from_dict, opening
+and loading a repository (cold, and warm from the startup snapshot of the
+cached backend), _save_users, add_user, find_by_name and
+delete_user, records their peak memory, and writes the results as JSON.
+Given a baseline file written by an earlier run, it flags the operations
+that got slower or hungrier than the threshold allows and exits with 1.
+
+Run with:
+    python -m benchmarks.suite --sizes 1000 100000 --output results.json
+    python -m benchmarks.suite --sizes 1000 100000 --baseline results.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from itertools import count
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from src.models import User
+from src.repository import create_repository, dump_users
+from .common import make_records, measure
+
+SIZES = [1_000, 100_000, 1_000_000]
+BACKENDS = {'json': 'users.json', 'cached': 'users.json', 'log': 'users.json', 'sqlite': 'users.db',
+            'binary': 'users.bin'}
+FORMAT_VERSION = 1
+# Timings below this are too noisy to flag as regressions
+MIN_SECONDS = 0.001
+
+def seed(path: str, backend: str, records: List[Dict[str, str]]) -> None:
+    """
+    Write a dataset in the backend's storage format.
+    """
+    if backend in ('sqlite', 'binary'):
+        create_repository(path, backend).bulk_add_users(User.from_dict(record) for record in records)
+    else:
+        with open(path, 'w') as f:
+            dump_users((User.from_dict(record) for record in records), f)
+
+def operations(path: str, backend: str, records: List[Dict[str, str]]) -> Dict[str, Tuple[Optional[Callable], Callable]]:
+    """
+    Build the benchmarked operations as (setup, fn) pairs for benchmarks.common.measure.
+    """
+    repository = create_repository(path, backend)
+    users = repository.get_all_users()
+    serial = count()
+
+    def new_user() -> User:
+        n = next(serial)
+        return User(f"Bench{n}", f"bench{n}@example.com", "Password1@")
+
+    def added_user() -> User:
+        user = new_user()
+        repository.add_user(user)
+        return user
+
+    def drop_startup_files() -> None:
+        # Startup without the binary snapshot and name index written by earlier loads
+        for side_file in (path + '.snapshot', path + '.names'):
+            if os.path.exists(side_file):
+                os.remove(side_file)
+
+    def write_startup_files() -> None:
+        # Loads only write them under the write lock; the app saves them on exit
+        save = getattr(repository, 'save_snapshot', None)
+        if save is not None:
+            save()
+
+    return {
+        'from_dict': (None, lambda: [User.from_dict(record) for record in records]),
+        'cold_load': (drop_startup_files, lambda _: create_repository(path, backend).get_all_users()),
+        'load': (write_startup_files, lambda _: create_repository(path, backend).get_all_users()),
+        'save': (None, lambda: repository._save_users(users)),
+        'add_user': (new_user, repository.add_user),
+        'find_by_name': (None, lambda: repository.find_by_name("ser99")),
+        'find_by_name_limit': (None, lambda: repository.find_by_name("User99", limit=10)),
+        'delete_user': (added_user, lambda user: repository.delete_user(user.email)),
+    }
+
+def run(sizes: List[int], backends: List[str], repeat: int) -> List[Dict[str, Any]]:
+    """
+    Run every operation for every size and backend.
+    Returns:
+        List[Dict[str, Any]]: One result per (backend, size, operation)
+    """
+    results = []
+    for size in sizes:
+        records = make_records(size)
+        for backend in backends:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, BACKENDS[backend])
+                seed(path, backend, records)
+                for name, (setup, fn) in operations(path, backend, records).items():
+                    _, seconds, peak = measure(fn, setup, repeat)
+                    results.append({'backend': backend, 'size': size, 'operation': name,
+                                    'seconds': seconds, 'peak_bytes': peak})
+                    print(f"  {backend:<7} {size:>9} {name:<19} {seconds * 1000:10.2f} ms   "
+                          f"peak {peak / 1e6:9.2f} MB", flush=True)
+        del records
+    return results
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], threshold: float) -> List[str]:
+    """
+    Find the results that regressed against a baseline.
+    Args:
+        results (List[Dict[str, Any]]): Current results
+        baseline (List[Dict[str, Any]]): Results of the baseline run
+        threshold (float): Allowed relative increase (0.2 = 20%)
+    Returns:
+        List[str]: One message per regression (empty if none)
+    """
+    previous = {(r['backend'], r['size'], r['operation']): r for r in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get((result['backend'], result['size'], result['operation']))
+        if old is None:
+            continue
+        label = f"{result['backend']} {result['size']} {result['operation']}"
+        if result['seconds'] > max(old['seconds'] * (1 + threshold), MIN_SECONDS):
+            regressions.append(f"{label}: time {old['seconds'] * 1000:.2f} -> {result['seconds'] * 1000:.2f} ms")
+        if result['peak_bytes'] > old['peak_bytes'] * (1 + threshold) and result['peak_bytes'] - old['peak_bytes'] > 1024:
+            regressions.append(f"{label}: peak memory {old['peak_bytes'] / 1e6:.2f} -> {result['peak_bytes'] / 1e6:.2f} MB")
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Repository and model benchmark suite")
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help="Dataset sizes (number of users)")
+    parser.add_argument('--backends', nargs='+', default=['json', 'cached'], choices=list(BACKENDS))
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per operation (fastest is kept)")
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    parser.add_argument('--baseline', help="Compare against the results in this JSON file")
+    parser.add_argument('--threshold', type=float, default=0.25, help="Allowed relative slowdown (default 0.25)")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.backends, args.repeat)
+    if args.output:
+        document = {
+            'version': FORMAT_VERSION,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': results,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)['results'], args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        print(f"{len(regressions)} regression(s) against {args.baseline}")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
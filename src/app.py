@@ -1,10 +1,14 @@
 import os
-from typing import Optional
-from colorama import init, Fore, Style
-from decouple import config
+from functools import cached_property
+from typing import TYPE_CHECKING, List, Tuple
+from . import metrics
 from .models import User
-from .repository import UserRepository
-from .utils import clear_screen, print_header, get_user_input, retry_input
+from .passwords import PasswordHasher, hasher_from_config
+from .repository import UserRepository, batched, create_repository
+from .utils import Fore, Style, clear_screen, print_header, get_user_input, retry_input
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ThreadPoolExecutor
 
 class UserManagementApp:
     """
@@ -16,10 +20,61 @@ class UserManagementApp:
     def __init__(self):
         """
         Initialize the UserManagementApp.
-        Sets up the repository and initializes colorama for colored output.
+        Nothing is opened here: the repository, the password hasher and the
+        settings are created on first use, and colorama is initialized when the
+        console starts, so creating the app (e.g. in tests or scripts) is cheap.
         """
-        init()  # Initialize colorama
-        self.repository = UserRepository(config('DATA_FILE_PATH', default='data/users.json'))
+        # (email, future) of the registrations still being hashed and stored
+        self._pending_registrations: List[Tuple[str, 'Future']] = []
+    
+    @cached_property
+    def repository(self) -> UserRepository:
+        """
+        Repository for the configured data store, opened on first use.
+        The storage backend is selected with the STORAGE_BACKEND setting, or
+        from the DATA_FILE_PATH extension when it is not set. With
+        READ_CACHE_SIZE set, lookups go through a ReadThroughCache.
+        """
+        from decouple import config
+        from .read_cache import read_cache_from_config
+        metrics.configure()
+        return read_cache_from_config(create_repository(
+            config('DATA_FILE_PATH', default='data/users.json'),
+            config('STORAGE_BACKEND', default=''),
+            config('MIGRATE_FROM_JSON', default=''),
+            config('CHANGE_FEED', default=False, cast=bool)
+        ))
+    
+    @cached_property
+    def page_size(self) -> int:
+        """
+        Number of users per page of "List Users" (PAGE_SIZE setting).
+        """
+        from decouple import config
+        return config('PAGE_SIZE', default=20, cast=int)
+    
+    @cached_property
+    def search_limit(self) -> int:
+        """
+        Maximum number of name search results (SEARCH_LIMIT setting).
+        """
+        from decouple import config
+        return config('SEARCH_LIMIT', default=10, cast=int)
+    
+    @cached_property
+    def hasher(self) -> PasswordHasher:
+        """
+        Password hasher configured with PASSWORD_HASH_ALGORITHM and PASSWORD_HASH_COST.
+        """
+        return hasher_from_config()
+    
+    @cached_property
+    def _registrations(self) -> 'ThreadPoolExecutor':
+        """
+        Thread that hashes and stores new users, so registration never waits on the KDF.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        return ThreadPoolExecutor(max_workers=1, thread_name_prefix="register")
     
     def clear_screen(self) -> None:
         pass  # Now handled by utils.clear_screen
@@ -30,10 +85,46 @@ class UserManagementApp:
     def get_user_input(self, prompt: str) -> str:
         pass  # Now handled by utils.get_user_input
     
+    def _store_user(self, name: str, email: str, password: str) -> bool:
+        """
+        Hash the password and add the new user to the repository.
+        
+        Args:
+            name (str): User's full name
+            email (str): User's email address
+            password (str): Plain text password
+            
+        Returns:
+            bool: True if user was added, False if email already exists
+        """
+        return self.repository.add_user(User(name, email, self.hasher.hash(password)))
+    
+    def wait_for_registrations(self) -> None:
+        """
+        Wait until every registration started by register_user is stored,
+        and report how each one ended: the email may have been taken in the
+        meantime, or hashing or storing may have failed.
+        """
+        pending, self._pending_registrations = self._pending_registrations, []
+        for email, registration in pending:
+            try:
+                added = registration.result()
+            except Exception as error:
+                print(f"{Fore.RED}User {email} could not be registered: {error}{Style.RESET_ALL}")
+                continue
+            if added:
+                print(f"{Fore.GREEN}User {email} registered successfully!{Style.RESET_ALL}")
+            else:
+                print(f"{Fore.RED}User {email} could not be registered: the email is already in use.{Style.RESET_ALL}")
+    
+    @metrics.timed("app.register_user")
     def register_user(self) -> None:
         """
         Register a new user with input validation.
+        The password is hashed and the user stored in the background; the
+        outcome is reported by wait_for_registrations, before the next action.
         """
+        self.wait_for_registrations()
         while True:
             print_header("Register New User")
             # Validar nombre antes de avanzar (4 intentos)
@@ -51,7 +142,7 @@ class UserManagementApp:
             def email_validator(email):
                 if not User.validate_email(email):
                     return False
-                if any(u.email == email for u in self.repository.get_all_users()):
+                if self.repository.get_by_email(email) is not None:
                     return False
                 return True
             try:
@@ -84,87 +175,142 @@ class UserManagementApp:
                 print(f"{Fore.RED}User could not be registered: password was invalid 4 times. Returning to main menu.{Style.RESET_ALL}")
                 return
 
-            user = User(name, email, password)
-            print(f"{Fore.GREEN}User registered successfully!{Style.RESET_ALL}")
-            self.repository.add_user(user)
+            registration = self._registrations.submit(self._store_user, name, email, password)
+            self._pending_registrations.append((email, registration))
+            print(f"{Fore.GREEN}Registration of {email} queued: it is confirmed once the password is hashed.{Style.RESET_ALL}")
             break
     
+    @metrics.timed("app.list_users")
     def list_users(self) -> None:
         """
-        Display all registered users.
+        Display registered users, one page at a time.
+        Users are streamed from the repository instead of loading the full list.
         """
         print_header("Registered Users")
-        users = self.repository.get_all_users()
+        pages = batched(self.repository.iter_users(), self.page_size)
+        page = next(pages, None)
         
-        if not users:
+        if not page:
             print(f"{Fore.YELLOW}No users registered yet.{Style.RESET_ALL}")
             return
         
-        for user in users:
-            print(f"{Fore.CYAN}UserID: {user.user_id}")
-            print(f"Name: {user.name}")
-            print(f"Email: {user.email}{Style.RESET_ALL}")
-            print("-" * 30)
+        page_number = 1
+        while page:
+            for user in page:
+                print(f"{Fore.CYAN}UserID: {user.user_id}")
+                print(f"Name: {user.name}")
+                print(f"Email: {user.email}{Style.RESET_ALL}")
+                print("-" * 30)
+            page = next(pages, None)
+            if page:
+                answer = get_user_input(f"Page {page_number} - press Enter for the next page or 'q' to stop: ")
+                if answer.strip().lower() == "q":
+                    break
+                page_number += 1
     
+    @metrics.timed("app.search_users")
     def search_users(self) -> None:
         """
-        Search for a user by email or by UserID.
+        Search for a user by email, by UserID or by name, or for the users
+        matching a name prefix and an email domain.
         """
         print_header("Search User")
         print("1. Search by Email")
         print("2. Search by UserID")
-        option = get_user_input("Select an option (1-2): ")
-        users = self.repository.get_all_users()
+        print("3. Search by Name")
+        print("4. Search by Name prefix and Email domain")
+        option = get_user_input("Select an option (1-4): ")
         if option == "1":
             email = get_user_input("Enter email to search: ")
-            found = False
-            for user in users:
-                if user.email == email:
-                    print(f"{Fore.GREEN}User found:{Style.RESET_ALL}")
-                    print(f"{Fore.CYAN}UserID: {user.user_id}")
-                    print(f"Name: {user.name}")
-                    print(f"Email: {user.email}{Style.RESET_ALL}")
-                    found = True
-                    break
-            if not found:
+            user = self.repository.get_by_email(email)
+            if user:
+                print(f"{Fore.GREEN}User found:{Style.RESET_ALL}")
+                print(f"{Fore.CYAN}UserID: {user.user_id}")
+                print(f"Name: {user.name}")
+                print(f"Email: {user.email}{Style.RESET_ALL}")
+            else:
                 print(f"{Fore.YELLOW}No user found with that email.{Style.RESET_ALL}")
         elif option == "2":
             user_id = get_user_input("Enter UserID to search: ")
-            found = False
-            for user in users:
-                if user.user_id == user_id:
-                    print(f"{Fore.GREEN}User found:{Style.RESET_ALL}")
+            user = self.repository.get_by_id(user_id)
+            if user:
+                print(f"{Fore.GREEN}User found:{Style.RESET_ALL}")
+                print(f"{Fore.CYAN}UserID: {user.user_id}")
+                print(f"Name: {user.name}")
+                print(f"Email: {user.email}{Style.RESET_ALL}")
+            else:
+                print(f"{Fore.YELLOW}No user found with that UserID.{Style.RESET_ALL}")
+        elif option == "3":
+            name = get_user_input("Enter name (or part of it) to search: ")
+            users = self.repository.find_by_name(name, limit=self.search_limit)
+            if users:
+                print(f"{Fore.GREEN}Top {len(users)} match(es):{Style.RESET_ALL}")
+                for user in users:
                     print(f"{Fore.CYAN}UserID: {user.user_id}")
                     print(f"Name: {user.name}")
                     print(f"Email: {user.email}{Style.RESET_ALL}")
-                    found = True
-                    break
-            if not found:
-                print(f"{Fore.YELLOW}No user found with that UserID.{Style.RESET_ALL}")
+                    print("-" * 30)
+            else:
+                print(f"{Fore.YELLOW}No user found with that name.{Style.RESET_ALL}")
+        elif option == "4":
+            name_prefix = get_user_input("Enter the start of the name (empty for any): ")
+            domain = get_user_input("Enter the email domain (empty for any): ")
+            users = list(self.repository.query(name_prefix=name_prefix or None, email_domain=domain or None,
+                                               order_by="name", limit=self.search_limit))
+            if users:
+                print(f"{Fore.GREEN}First {len(users)} match(es) by name:{Style.RESET_ALL}")
+                for user in users:
+                    print(f"{Fore.CYAN}UserID: {user.user_id}")
+                    print(f"Name: {user.name}")
+                    print(f"Email: {user.email}{Style.RESET_ALL}")
+                    print("-" * 30)
+            else:
+                print(f"{Fore.YELLOW}No user found matching those conditions.{Style.RESET_ALL}")
         else:
             print(f"{Fore.RED}Invalid option!{Style.RESET_ALL}")
     
+    @metrics.timed("app.delete_user")
     def delete_user(self) -> None:
         """
         Delete a user by UserID.
         """
         print_header("Delete User")
         user_id = get_user_input("Enter UserID of user to delete: ")
-        users = self.repository.get_all_users()
-        found = False
-        for user in users:
-            if user.user_id == user_id:
-                users.remove(user)
-                self.repository._save_users(users)
-                print(f"{Fore.GREEN}User deleted successfully!{Style.RESET_ALL}")
-                found = True
-                break
-        if not found:
+        if self.repository.delete_by_id(user_id):
+            print(f"{Fore.GREEN}User deleted successfully!{Style.RESET_ALL}")
+        else:
             print(f"{Fore.RED}User not found!{Style.RESET_ALL}")
     
     def run(self) -> None:
         """
         Run the main application loop.
+        With PROFILE enabled the session runs under cProfile, and with
+        METRICS_FILE set the recorded metrics are written there on exit.
+        On exit the warm-start files of the repository are saved.
+        """
+        from colorama import init
+        from decouple import config
+        init()  # Initialize colorama
+        with metrics.profiled():
+            self._menu_loop()
+        self.wait_for_registrations()
+        self.save_warm_start()
+        metrics_file = config('METRICS_FILE', default='')
+        if metrics_file:
+            metrics.REGISTRY.dump(metrics_file)
+    
+    def save_warm_start(self) -> None:
+        """
+        Persist the repository's startup files (users snapshot and name index),
+        if the backend keeps any, so the next start can skip parsing the data file.
+        """
+        save = getattr(self.repository, 'save_snapshot', None)
+        if save is not None:
+            save()
+    
+    def _menu_loop(self) -> None:
+        """
+        Show the main menu until the user exits.
         """
         while True:
             clear_screen()
@@ -177,6 +323,8 @@ class UserManagementApp:
             
             choice = get_user_input("\nEnter your choice (1-5): ")
             
+            if choice != "1":
+                self.wait_for_registrations()
             if choice == "1":
                 self.register_user()
             elif choice == "2":
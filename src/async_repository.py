@@ -0,0 +1,205 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional, Tuple
+from .models import User
+from .repository import UserRepository
+
+class AsyncUserRepository:
+    """
+    Asyncio front end for a UserRepository.
+
+    Reads run in a thread pool so they don't block the event loop. Writes are
+    queued and coalesced: the writes that arrive within commit_delay seconds
+    of each other (up to max_batch) are applied with a single
+    repository.apply_batch() call, i.e. one group commit of the data store.
+    Commits run on a dedicated thread, so batches are applied in arrival order.
+    """
+
+    def __init__(self, repository: UserRepository, commit_delay: float = 0.005, max_batch: int = 1000):
+        """
+        Initialize the AsyncUserRepository.
+
+        Args:
+            repository (UserRepository): Repository to wrap
+            commit_delay (float): Seconds to wait for more writes before committing
+            max_batch (int): Maximum number of writes per commit
+        """
+        self.repository = repository
+        self.commit_delay = commit_delay
+        self.max_batch = max_batch
+        self.commits = 0
+        self._pending: List[Tuple[Tuple[str, Any], asyncio.Future]] = []
+        self._batch_full: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="user-commit")
+
+    async def _read(self, method, *args) -> Any:
+        """
+        Run a blocking repository read in the default thread pool.
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, method, *args)
+
+    async def get_all_users(self) -> List[User]:
+        """
+        Get all users from the repository.
+
+        Returns:
+            List[User]: List of all User objects
+        """
+        return await self._read(self.repository.get_all_users)
+
+    async def find_by_name(self, name: str, limit: Optional[int] = None) -> List[User]:
+        """
+        Find users by name (case-insensitive partial match).
+
+        Args:
+            name (str): Name to search for
+            limit (Optional[int]): Maximum number of results (all if None)
+
+        Returns:
+            List[User]: List of matching User objects
+        """
+        return await self._read(self.repository.find_by_name, name, limit)
+
+    async def get_by_email(self, email: str) -> Optional[User]:
+        """
+        Get a user by email.
+
+        Args:
+            email (str): Email of the user to look up
+
+        Returns:
+            Optional[User]: The matching User, or None if not found
+        """
+        return await self._read(self.repository.get_by_email, email)
+
+    async def get_by_id(self, user_id: str) -> Optional[User]:
+        """
+        Get a user by UserID.
+
+        Args:
+            user_id (str): UserID (UUID) of the user to look up
+
+        Returns:
+            Optional[User]: The matching User, or None if not found
+        """
+        return await self._read(self.repository.get_by_id, user_id)
+
+    async def add_user(self, user: User) -> bool:
+        """
+        Add a new user as part of the next group commit.
+
+        Args:
+            user (User): User object to add
+
+        Returns:
+            bool: True if user was added successfully, False if the email or UserID already exists
+        """
+        return await self._submit(("add", user))
+
+    async def delete_user(self, email: str) -> bool:
+        """
+        Delete a user by email as part of the next group commit.
+
+        Args:
+            email (str): Email of the user to delete
+
+        Returns:
+            bool: True if user was deleted, False if user not found
+        """
+        return await self._submit(("delete", email))
+
+    async def delete_by_id(self, user_id: str) -> bool:
+        """
+        Delete a user by UserID as part of the next group commit.
+
+        Args:
+            user_id (str): UserID (UUID) of the user to delete
+
+        Returns:
+            bool: True if user was deleted, False if user not found
+        """
+        return await self._submit(("delete_id", user_id))
+
+    async def update_user(self, user_id: str, expected_version: Optional[int] = None, **fields: str) -> Optional[User]:
+        """
+        Change some fields of a user once the queued writes are committed.
+        The update runs on the commit thread, after any batch already in progress.
+
+        Args:
+            user_id (str): UserID (UUID) of the user to update
+            expected_version (Optional[int]): Version the caller read (no check if None)
+            **fields (str): New values for name, email and/or password
+
+        Returns:
+            Optional[User]: The updated user, or None if user not found
+
+        Raises:
+            ValueError: If a field cannot be updated or the new email belongs to another user
+            VersionConflictError: If the user is no longer at expected_version
+        """
+        await self.flush()
+        update = functools.partial(self.repository.update_user, user_id, expected_version, **fields)
+        return await asyncio.get_running_loop().run_in_executor(self._writer, update)
+
+    def _submit(self, operation: Tuple[str, Any]) -> asyncio.Future:
+        """
+        Queue a write and make sure a flusher task will commit it.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((operation, future))
+        if self._batch_full is None:
+            self._batch_full = asyncio.Event()
+        if self._flusher is None or self._flusher.done():
+            self._flusher = loop.create_task(self._flush_pending())
+        elif len(self._pending) >= self.max_batch:
+            self._batch_full.set()
+        return future
+
+    async def _flush_pending(self) -> None:
+        """
+        Commit queued writes in batches until the queue is empty.
+        """
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            if len(self._pending) < self.max_batch:
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), self.commit_delay)
+                except asyncio.TimeoutError:
+                    pass
+            self._batch_full.clear()
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            operations = [operation for operation, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._writer, self.repository.apply_batch, operations)
+            except Exception as exc:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            self.commits += 1
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def flush(self) -> None:
+        """
+        Wait until every queued write has been committed.
+        """
+        while self._flusher is not None and not self._flusher.done():
+            await self._flusher
+
+    async def close(self) -> None:
+        """
+        Commit queued writes and stop the commit thread.
+        """
+        await self.flush()
+        self._writer.shutdown(wait=True)
+
+    async def __aenter__(self) -> 'AsyncUserRepository':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
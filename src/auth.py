@@ -0,0 +1,219 @@
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+from .cache import LRUCache
+from .models import User
+from .passwords import PasswordHasher
+from .repository import UserRepository, VersionConflictError
+
+class RateLimitError(Exception):
+    """
+    Raised when a login attempt is rejected by the rate limiter.
+    """
+
+class TokenBucketLimiter:
+    """
+    In-memory token bucket per key (e.g. an email or an IP address).
+
+    Each key may make burst attempts at once and then rate attempts per second.
+    At most max_keys buckets are kept; the least recently used one is dropped
+    first, which is harmless since a dropped bucket comes back full.
+
+    Attributes:
+        rejected (int): Attempts refused because the bucket was empty
+        evictions (int): Buckets dropped to stay under max_keys
+    """
+
+    def __init__(self, rate: float, burst: int, max_keys: int = 100_000,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the TokenBucketLimiter.
+
+        Args:
+            rate (float): Tokens added per second
+            burst (int): Bucket capacity
+            max_keys (int): Maximum number of buckets kept in memory
+            clock (Callable[[], float]): Time source, in seconds
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: 'OrderedDict[Hashable, list]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.evictions = 0
+
+    def allow(self, key: Hashable) -> bool:
+        """
+        Take a token from the key's bucket.
+
+        Args:
+            key (Hashable): Bucket key
+
+        Returns:
+            bool: True if a token was available, False if the attempt is rate limited
+        """
+        now = self._clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now]
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(float(self.burst), bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] < 1:
+                self.rejected += 1
+                return False
+            bucket[0] -= 1
+            return True
+
+class Authenticator:
+    """
+    Check email/password credentials against a UserRepository.
+
+    Users are looked up with the repository's email index. Successful
+    verifications are remembered in a bounded LRU/TTL cache keyed by email:
+    an entry holds the stored hash and a keyed digest of the password (HMAC
+    with a per-process random key, never the password itself), so repeated
+    logins skip the KDF and a password change invalidates the entry. Attempts
+    are rate limited per email and per IP address. Hashes made with an old
+    algorithm or cost are replaced after a successful login. An unknown email
+    still costs one verification, against a dummy hash made with the current
+    settings, so response times do not tell which emails are registered.
+    """
+
+    def __init__(self, repository: UserRepository, hasher: Optional[PasswordHasher] = None,
+                 cache_size: int = 10_000, cache_ttl: float = 300.0,
+                 rate: float = 1.0, burst: int = 5, max_keys: int = 100_000,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the Authenticator.
+
+        Args:
+            repository (UserRepository): Repository holding the users
+            hasher (Optional[PasswordHasher]): Hasher for verification and rehashing (scrypt default if None)
+            cache_size (int): Maximum number of cached successful verifications
+            cache_ttl (float): Seconds a cached verification stays valid
+            rate (float): Login attempts per second allowed per email and per IP
+            burst (int): Attempts allowed at once per email and per IP
+            max_keys (int): Maximum number of rate limiter buckets per kind
+            clock (Callable[[], float]): Time source, in seconds
+        """
+        self.repository = repository
+        self.hasher = hasher or PasswordHasher()
+        self._cache = LRUCache(cache_size, cache_ttl, clock)
+        self._email_limiter = TokenBucketLimiter(rate, burst, max_keys, clock)
+        self._ip_limiter = TokenBucketLimiter(rate, burst, max_keys, clock)
+        self._cache_key = os.urandom(32)
+        # Verified against when the email is unknown; made on first need
+        self._dummy_hash: Optional[str] = None
+        self.successes = 0
+        self.failures = 0
+        self.rehashed = 0
+        # Counted here rather than by the LRUCache: an entry found for a wrong password is a miss
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _digest(self, password: str) -> bytes:
+        return hmac.new(self._cache_key, password.encode(), hashlib.sha256).digest()
+
+    def _verify_dummy(self, password: str) -> None:
+        """
+        Spend the time of a real verification, for an email that is not registered.
+        """
+        if self._dummy_hash is None:
+            self._dummy_hash = self.hasher.hash(os.urandom(16).hex())
+        self.hasher.verify(password, self._dummy_hash)
+
+    def authenticate(self, email: str, password: str, ip: Optional[str] = None) -> Optional[User]:
+        """
+        Check a user's credentials.
+
+        Args:
+            email (str): User email
+            password (str): Plain text password
+            ip (Optional[str]): Client address, rate limited separately when given
+
+        Returns:
+            Optional[User]: The authenticated user, or None if the credentials are wrong
+
+        Raises:
+            RateLimitError: If too many attempts were made for the email or IP
+        """
+        if not self._email_limiter.allow(email) or (ip is not None and not self._ip_limiter.allow(ip)):
+            raise RateLimitError(f"Too many login attempts for {email if ip is None else ip}")
+        user = self.repository.get_by_email(email)
+        if user is None:
+            self._verify_dummy(password)
+            self.failures += 1
+            return None
+        digest = self._digest(password)
+        cached = self._cache.get(email)
+        if cached is not None and cached[0] == user.password and hmac.compare_digest(cached[1], digest):
+            self.cache_hits += 1
+            self.successes += 1
+            return user
+        self.cache_misses += 1
+        if not self.hasher.verify(password, user.password):
+            self.failures += 1
+            return None
+        if self.hasher.needs_rehash(user.password):
+            user = self._rehash(user, password)
+        self._cache.put(email, (user.password, digest))
+        self.successes += 1
+        return user
+
+    def _rehash(self, user: User, password: str) -> User:
+        """
+        Store a new hash for a user whose hash is plain text or uses old settings.
+        The write is version-checked: if the user changed since it was read
+        (e.g. a concurrent password change), the stored user is kept.
+        """
+        try:
+            rehashed = self.repository.update_user(user.user_id, user.version, password=self.hasher.hash(password))
+        except VersionConflictError:
+            return self.repository.get_by_id(user.user_id) or user
+        if rehashed is None:
+            return user
+        self.rehashed += 1
+        return rehashed
+
+    def invalidate(self, email: str) -> None:
+        """
+        Forget the cached verification for an email (e.g. after a password change).
+
+        Args:
+            email (str): User email
+        """
+        self._cache.pop(email)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the authentication counters.
+
+        Returns:
+            Dict[str, Any]: Login outcomes, verification cache counters and rate limiter counters
+        """
+        cache = self._cache.stats()
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            'successes': self.successes,
+            'failures': self.failures,
+            'rehashed': self.rehashed,
+            'cache_size': cache['size'],
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'cache_hit_ratio': self.cache_hits / lookups if lookups else 0.0,
+            'cache_evictions': cache['evictions'] + cache['expirations'],
+            'rate_limited': self._email_limiter.rejected + self._ip_limiter.rejected,
+            'limiter_evictions': self._email_limiter.evictions + self._ip_limiter.evictions,
+        }
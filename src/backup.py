@@ -0,0 +1,358 @@
+import argparse
+import hashlib
+import json
+import marshal
+import os
+import sys
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from decouple import config
+from .locking import FileLock, atomic_write
+from .models import User
+from .repository import UserRepository, create_repository
+
+FORMAT_VERSION = 1
+# Users per compressed chunk; chunks are compressed, checked and decoded independently
+CHUNK_USERS = 20000
+MANIFEST = "manifest.json"
+# Digests of the users as of the newest snapshot, to compute the next delta
+HEAD_DIGESTS = "head.digests"
+
+class BackupError(Exception):
+    """
+    Raised when a backup is missing, fails its checksums or cannot be applied.
+    """
+
+def user_digest(user: User) -> int:
+    """
+    Get a 64-bit digest of every field of a user, to detect changed records.
+    Args:
+        user (User): User to digest
+    Returns:
+        int: CRC-32 and Adler-32 of the fields, combined
+    """
+    data = '\0'.join((user.user_id, user.name, user.email, user.password, str(user.version))).encode()
+    return zlib.crc32(data) << 32 | zlib.adler32(data)
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def _encode_chunk(kind: str, items: List[Any], level: int) -> Tuple[str, int, bytes]:
+    """
+    Compress one chunk: a JSON array of user records ("users") or of UserIDs ("deletes").
+    """
+    records = [user.to_dict() for user in items] if kind == 'users' else items
+    return kind, len(items), zlib.compress(json.dumps(records, separators=(',', ':')).encode(), level)
+
+def _decode_chunk(kind: str, data: bytes, checksum: str) -> List[Any]:
+    """
+    Check and decompress one chunk.
+    """
+    if _sha256(data) != checksum:
+        raise BackupError("chunk checksum mismatch")
+    text = zlib.decompress(data).decode()
+    return User.list_from_json(text) if kind == 'users' else json.loads(text)
+
+class BackupStore:
+    """
+    Directory of point-in-time snapshots of a user store.
+
+    A backup is either full (every user) or an incremental delta holding only
+    the users added or changed since the previous snapshot and the UserIDs
+    removed since then, found by comparing per-user digests with those of
+    the previous snapshot. Snapshots are taken from
+    repository.snapshot_users(), so writers keep going while the backup is
+    compressed and written.
+
+    Each snapshot file is a series of independently zlib-compressed JSON
+    chunks; manifest.json lists the snapshots in order with the SHA-256 of
+    every chunk. Restores verify the chunks and decode them on a thread pool
+    (zlib and hashlib release the GIL), apply the deltas in order on top of
+    the last full snapshot and rebuild the target store and its indexes
+    with restore_users().
+    """
+
+    def __init__(self, directory: str, workers: Optional[int] = None, level: int = 1):
+        """
+        Initialize the BackupStore.
+
+        Args:
+            directory (str): Directory of the snapshots (created by the first backup)
+            workers (Optional[int]): Threads compressing, checking and decoding chunks (CPU count if None)
+            level (int): zlib compression level of new snapshots
+        """
+        self.directory = directory
+        self.workers = workers or os.cpu_count() or 1
+        self.level = level
+        self._file_lock = FileLock()
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.directory, MANIFEST)
+
+    def _manifest(self) -> Dict[str, Any]:
+        """
+        Read the manifest (an empty one if there is no backup yet).
+        """
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return {'version': FORMAT_VERSION, 'snapshots': [], 'head_digests': None}
+        except ValueError as error:
+            raise BackupError(f"{self.manifest_path} is corrupt: {error}") from error
+        if manifest.get('version') != FORMAT_VERSION:
+            raise BackupError(f"unsupported backup format {manifest.get('version')}")
+        return manifest
+
+    def snapshots(self) -> List[Dict[str, Any]]:
+        """
+        Get the manifest entries of the snapshots, oldest first.
+        """
+        return self._manifest()['snapshots']
+
+    def _write_manifest(self, snapshots: List[Dict[str, Any]], head_digests: Optional[str]) -> None:
+        with atomic_write(self.manifest_path) as f:
+            json.dump({'version': FORMAT_VERSION, 'snapshots': snapshots, 'head_digests': head_digests}, f, indent=1)
+
+    def _head_digests(self, head: Dict[str, Any], checksum: Optional[str]) -> Optional[Dict[str, int]]:
+        """
+        Load the digests of the newest snapshot, or None if they are missing or don't match the manifest.
+        """
+        try:
+            with open(os.path.join(self.directory, HEAD_DIGESTS), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        if _sha256(data) != checksum:
+            return None
+        try:
+            name, digests = marshal.loads(zlib.decompress(data))
+        except (zlib.error, ValueError, EOFError, TypeError):
+            # e.g. written by another Python version's marshal
+            return None
+        return digests if name == head['name'] else None
+
+    def backup(self, repository: UserRepository, full: bool = False) -> Dict[str, Any]:
+        """
+        Take a snapshot of a repository.
+
+        A delta is written when the newest snapshot was taken from the same
+        data file and its digests are intact; otherwise (or with full=True)
+        a full snapshot.
+
+        Args:
+            repository (UserRepository): Repository to back up
+            full (bool): Whether to force a full snapshot
+
+        Returns:
+            Dict[str, Any]: Manifest entry of the new snapshot
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with self._file_lock.locked(os.path.join(self.directory, "backup.lock")):
+            manifest = self._manifest()
+            snapshots = manifest['snapshots']
+            head = snapshots[-1] if snapshots else None
+            source = os.path.abspath(repository.file_path)
+            parent_digests = None
+            if head is not None and not full and head['source'] == source:
+                parent_digests = self._head_digests(head, manifest['head_digests'])
+            users = repository.snapshot_users()
+            digests = {user.user_id: user_digest(user) for user in users}
+            if parent_digests is None:
+                kind, changed, deleted = 'full', users, []
+            else:
+                kind = 'delta'
+                changed = [user for user in users if parent_digests.get(user.user_id) != digests[user.user_id]]
+                deleted = [user_id for user_id in parent_digests if user_id not in digests]
+            number = int(head['name']) + 1 if head else 1
+            entry = {
+                'name': f"{number:06d}", 'kind': kind, 'parent': head['name'] if kind == 'delta' else None,
+                'created': time.time(), 'source': source, 'users': len(users),
+                'changed': len(changed), 'deleted': len(deleted), 'file': f"{number:06d}.{kind}",
+            }
+            entry['chunks'] = self._write_chunks(os.path.join(self.directory, entry['file']), changed, deleted)
+            digest_data = zlib.compress(marshal.dumps((entry['name'], digests)), self.level)
+            with atomic_write(os.path.join(self.directory, HEAD_DIGESTS), 'wb') as f:
+                f.write(digest_data)
+            self._write_manifest(snapshots + [entry], _sha256(digest_data))
+        return entry
+
+    def _write_chunks(self, path: str, users: List[User], deleted: List[str]) -> List[Dict[str, Any]]:
+        """
+        Compress users and deleted UserIDs in chunks on the thread pool and write them to path.
+
+        Returns:
+            List[Dict[str, Any]]: Kind, item count, offset, length and SHA-256 of each chunk
+        """
+        jobs = [('users', users[i:i + CHUNK_USERS]) for i in range(0, len(users), CHUNK_USERS)]
+        jobs += [('deletes', deleted[i:i + CHUNK_USERS]) for i in range(0, len(deleted), CHUNK_USERS)]
+        chunks = []
+        with ThreadPoolExecutor(self.workers) as pool, atomic_write(path, 'wb') as f:
+            for kind, count, data in pool.map(lambda job: _encode_chunk(job[0], job[1], self.level), jobs):
+                chunks.append({'kind': kind, 'count': count, 'offset': f.tell(), 'length': len(data),
+                               'sha256': _sha256(data)})
+                f.write(data)
+        return chunks
+
+    def _chain(self, name: Optional[str]) -> List[Dict[str, Any]]:
+        """
+        Get the snapshots to apply to rebuild a snapshot: its full snapshot, then the deltas up to it.
+        """
+        snapshots = self.snapshots()
+        if not snapshots:
+            raise BackupError(f"no snapshot in {self.directory}")
+        position = len(snapshots) - 1
+        if name is not None:
+            position = next((i for i, entry in enumerate(snapshots) if entry['name'] == name), None)
+            if position is None:
+                raise BackupError(f"unknown snapshot {name}")
+        chain = [snapshots[position]]
+        while chain[0]['kind'] == 'delta':
+            position -= 1
+            if position < 0 or snapshots[position]['name'] != chain[0]['parent']:
+                raise BackupError(f"snapshot {chain[0]['name']} has no parent {chain[0]['parent']}")
+            chain.insert(0, snapshots[position])
+        return chain
+
+    def _read_chunks(self, entry: Dict[str, Any], pool: ThreadPoolExecutor) -> Iterable[Tuple[str, List[Any]]]:
+        """
+        Check and decode the chunks of one snapshot on the pool.
+
+        Returns:
+            Iterable[Tuple[str, List[Any]]]: (kind, users or UserIDs) per chunk, in file order
+        """
+        path = os.path.join(self.directory, entry['file'])
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            raise BackupError(f"snapshot {entry['name']}: {path} is missing")
+        if len(data) != sum(chunk['length'] for chunk in entry['chunks']):
+            raise BackupError(f"snapshot {entry['name']}: {path} has the wrong size")
+
+        def decode(chunk: Dict[str, Any]) -> Tuple[str, List[Any]]:
+            payload = data[chunk['offset']:chunk['offset'] + chunk['length']]
+            try:
+                items = _decode_chunk(chunk['kind'], payload, chunk['sha256'])
+            except (BackupError, zlib.error, ValueError) as error:
+                raise BackupError(f"snapshot {entry['name']}: {error}") from error
+            if len(items) != chunk['count']:
+                raise BackupError(f"snapshot {entry['name']}: chunk has {len(items)} items, expected {chunk['count']}")
+            return chunk['kind'], items
+
+        return pool.map(decode, entry['chunks'])
+
+    def verify(self, name: Optional[str] = None) -> List[str]:
+        """
+        Check the checksums of a snapshot and of the snapshots it is built on.
+
+        Args:
+            name (Optional[str]): Snapshot to check (the newest if None)
+
+        Returns:
+            List[str]: Names of the checked snapshots
+
+        Raises:
+            BackupError: If a file is missing or a checksum does not match
+        """
+        chain = self._chain(name)
+        with ThreadPoolExecutor(self.workers) as pool:
+            for entry in chain:
+                for _ in self._read_chunks(entry, pool):
+                    pass
+        return [entry['name'] for entry in chain]
+
+    def read(self, name: Optional[str] = None) -> List[User]:
+        """
+        Rebuild the users of a snapshot, checking every chunk on the way.
+
+        Args:
+            name (Optional[str]): Snapshot to read (the newest if None)
+
+        Returns:
+            List[User]: The users as of that snapshot, in storage order
+
+        Raises:
+            BackupError: If a file is missing or a checksum does not match
+        """
+        chain = self._chain(name)
+        users: Dict[str, User] = {}
+        with ThreadPoolExecutor(self.workers) as pool:
+            for entry in chain:
+                for kind, items in self._read_chunks(entry, pool):
+                    if kind == 'users':
+                        users.update((user.user_id, user) for user in items)
+                    else:
+                        for user_id in items:
+                            users.pop(user_id, None)
+        if len(users) != chain[-1]['users']:
+            raise BackupError(f"snapshot {chain[-1]['name']} rebuilt {len(users)} users, expected {chain[-1]['users']}")
+        return list(users.values())
+
+    def restore(self, file_path: str, backend: Optional[str] = None, name: Optional[str] = None) -> UserRepository:
+        """
+        Rebuild a data store from a snapshot, replacing its content.
+
+        Args:
+            file_path (str): Data store to restore into (see create_repository)
+            backend (Optional[str]): Storage backend of the data store
+            name (Optional[str]): Snapshot to restore (the newest if None)
+
+        Returns:
+            UserRepository: The restored repository
+
+        Raises:
+            BackupError: If a file is missing or a checksum does not match (the data store is left untouched)
+        """
+        users = self.read(name)
+        repository = create_repository(file_path, backend)
+        repository.restore_users(users)
+        return repository
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the backup command line.
+    Args:
+        argv (Optional[List[str]]): Command line arguments (defaults to sys.argv)
+    Returns:
+        int: Process exit code
+    """
+    parser = argparse.ArgumentParser(prog="python -m src.backup",
+                                     description="Back up DATA_FILE_PATH to BACKUP_DIR, or restore it.")
+    parser.add_argument('command', choices=['create', 'list', 'verify', 'restore'])
+    parser.add_argument('--full', action='store_true', help="Take a full snapshot instead of a delta (create)")
+    parser.add_argument('--snapshot', help="Snapshot to verify or restore (default: the newest)")
+    parser.add_argument('--target', help="Data store to restore into (default: DATA_FILE_PATH)")
+    parser.add_argument('--workers', type=int, help="Threads compressing and decoding chunks")
+    args = parser.parse_args(argv)
+
+    data_path = config('DATA_FILE_PATH', default='data/users.json')
+    backend = config('STORAGE_BACKEND', default='')
+    store = BackupStore(config('BACKUP_DIR', default='backups'), workers=args.workers)
+    try:
+        if args.command == 'create':
+            entry = store.backup(create_repository(data_path, backend), full=args.full)
+            print(f"Snapshot {entry['name']} ({entry['kind']}): {entry['users']} users, "
+                  f"{entry['changed']} written, {entry['deleted']} deleted", file=sys.stderr)
+        elif args.command == 'list':
+            for entry in store.snapshots():
+                created = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['created']))
+                print(f"{entry['name']}  {entry['kind']:<5}  {created}  {entry['users']} users  "
+                      f"{entry['changed']} written  {entry['deleted']} deleted")
+        elif args.command == 'verify':
+            names = store.verify(args.snapshot)
+            print(f"Snapshots {', '.join(names)} are intact", file=sys.stderr)
+        else:
+            start = time.perf_counter()
+            repository = store.restore(args.target or data_path, backend, args.snapshot)
+            print(f"Restored {repository.file_path} in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+    except BackupError as error:
+        print(f"Backup error: {error}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,355 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple
+from . import metrics
+from .locking import atomic_write
+from .models import User
+from .repository import CorruptDataError, UserRepository, dump_users, read_operation
+
+# File layout (all integers little-endian):
+#   header        MAGIC, format version, reserved, user count, then the offsets of the
+#                 records, the user_id index, the email index and the string heap
+#   records       one RECORD per user, in storage order: heap offset of its strings,
+#                 byte lengths of user_id, name, email and password, and version
+#   user_id index record numbers (uint32) sorted by UTF-8 user_id
+#   email index   record numbers (uint32) sorted by UTF-8 email
+#   string heap   user_id, name, email and password of each record, back to back
+MAGIC = b'UMSB'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHHIQQQQ')
+RECORD = struct.Struct('<QHHHHI')
+INDEX_ITEM = struct.Struct('<I')
+# Strings are stored with 16-bit lengths
+MAX_FIELD_BYTES = 0xFFFF
+
+def _index_bytes(order: List[int]) -> bytes:
+    items = array('I', order)
+    if sys.byteorder == 'big':
+        items.byteswap()
+    return items.tobytes()
+
+def write_users(users: Iterable[User], stream: BinaryIO) -> int:
+    """
+    Write users in the binary format.
+    Args:
+        users (Iterable[User]): Users to write, in storage order
+        stream (BinaryIO): Binary stream to write to
+    Returns:
+        int: Number of users written
+    Raises:
+        ValueError: If a field is longer than MAX_FIELD_BYTES once encoded
+    """
+    records, heap, ids, emails = [], bytearray(), [], []
+    for user in users:
+        fields = [user.user_id.encode(), user.name.encode(), user.email.encode(), user.password.encode()]
+        if max(map(len, fields)) > MAX_FIELD_BYTES:
+            raise ValueError(f"Field too long for the binary format in user {user.user_id}")
+        records.append(RECORD.pack(len(heap), *map(len, fields), user.version))
+        heap += b''.join(fields)
+        ids.append(fields[0])
+        emails.append(fields[2])
+    count = len(records)
+    records_offset = HEADER.size
+    id_index_offset = records_offset + count * RECORD.size
+    email_index_offset = id_index_offset + count * INDEX_ITEM.size
+    heap_offset = email_index_offset + count * INDEX_ITEM.size
+    stream.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, count, records_offset, id_index_offset,
+                             email_index_offset, heap_offset))
+    stream.write(b''.join(records))
+    stream.write(_index_bytes(sorted(range(count), key=ids.__getitem__)))
+    stream.write(_index_bytes(sorted(range(count), key=emails.__getitem__)))
+    stream.write(heap)
+    return count
+
+class BinaryUserFile:
+    """
+    Read-only, memory-mapped view of a binary users file.
+
+    Nothing is read up front: lookups by user_id or email binary-search the
+    sorted index and decode only the records they visit, so the cost of a
+    lookup does not depend on how much of the file is in memory.
+    """
+
+    def __init__(self, path: str):
+        """
+        Map a binary users file.
+
+        Args:
+            path (str): File path
+
+        Raises:
+            CorruptDataError: If the file is not a binary users file of a known version,
+                or its header does not match its size
+        """
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            # The mapping keeps its own handle, so the file can be closed (and replaced) right away
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self._path = path
+        if len(self._map) < HEADER.size:
+            raise CorruptDataError(f"{path} is not a binary users file")
+        (magic, version, _, self.count, self._records, self._id_index, self._email_index,
+         self._heap) = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise CorruptDataError(f"{path} is not a binary users file (format version {FORMAT_VERSION})")
+        # The sections follow each other as write_users lays them out, and the
+        # strings of the last record end the heap, so end where the file ends
+        if (self._records != HEADER.size or self._id_index != self._records + self.count * RECORD.size
+                or self._email_index != self._id_index + self.count * INDEX_ITEM.size
+                or self._heap != self._email_index + self.count * INDEX_ITEM.size or self._heap > len(self._map)):
+            raise CorruptDataError(f"{path} is truncated or corrupt")
+        end = self._heap
+        if self.count:
+            offset, *lengths, _ = RECORD.unpack_from(self._map, self._records + (self.count - 1) * RECORD.size)
+            end += offset + sum(lengths)
+        if end != len(self._map):
+            raise CorruptDataError(f"{path} is truncated or corrupt")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _fields(self, number: int) -> Tuple[List[bytes], int]:
+        offset, *lengths, version = RECORD.unpack_from(self._map, self._records + number * RECORD.size)
+        start = self._heap + offset
+        if start + sum(lengths) > len(self._map):
+            raise CorruptDataError(f"{self._path} is truncated or corrupt (record {number})")
+        fields = []
+        for length in lengths:
+            fields.append(self._map[start:start + length])
+            start += length
+        return fields, version
+
+    def user(self, number: int) -> User:
+        """
+        Decode the user stored in a record.
+
+        Args:
+            number (int): Record number, in storage order
+
+        Returns:
+            User: The decoded user
+        """
+        (user_id, name, email, password), version = self._fields(number)
+        return User(name.decode(), email.decode(), password.decode(), user_id.decode(), version)
+
+    def _key(self, number: int, field: int) -> bytes:
+        offset, *lengths, _ = RECORD.unpack_from(self._map, self._records + number * RECORD.size)
+        start = self._heap + offset + sum(lengths[:field])
+        return self._map[start:start + lengths[field]]
+
+    def _find(self, index: int, field: int, value: str) -> Optional[User]:
+        key = value.encode()
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            number, = INDEX_ITEM.unpack_from(self._map, index + middle * INDEX_ITEM.size)
+            if self._key(number, field) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.count:
+            return None
+        number, = INDEX_ITEM.unpack_from(self._map, index + low * INDEX_ITEM.size)
+        return self.user(number) if self._key(number, field) == key else None
+
+    def find_by_id(self, user_id: str) -> Optional[User]:
+        """
+        Binary-search the user_id index.
+        """
+        return self._find(self._id_index, 0, user_id)
+
+    def find_by_email(self, email: str) -> Optional[User]:
+        """
+        Binary-search the email index.
+        """
+        return self._find(self._email_index, 2, email)
+
+    def users(self, start: int = 0, stop: Optional[int] = None) -> Iterator[User]:
+        """
+        Decode a range of records in storage order.
+
+        Args:
+            start (int): First record number
+            stop (Optional[int]): Record number to stop before (the end if None)
+
+        Returns:
+            Iterator[User]: The decoded users
+        """
+        stop = self.count if stop is None else min(stop, self.count)
+        for number in range(start, stop):
+            yield self.user(number)
+
+    def __iter__(self) -> Iterator[User]:
+        return self.users()
+
+class BinaryUserRepository(UserRepository):
+    """
+    Repository storing users in a compact binary file read through mmap.
+
+    The file holds a header, a fixed-size record per user, two offset tables
+    (record numbers sorted by user_id and by email) and a string heap; see
+    write_users(). get_by_id and get_by_email binary-search the mapped offset
+    tables, so a lookup on a freshly opened repository reads a few pages
+    instead of parsing the whole data set, and the file is about half the
+    size of the indented JSON. Writes rewrite the whole file atomically, like
+    the JSON backend, so this format suits read-mostly data.
+    """
+
+    def __init__(self, file_path: str = "data/users.bin"):
+        """
+        Initialize the BinaryUserRepository.
+
+        Args:
+            file_path (str): Path to the binary data file
+        """
+        super().__init__(file_path)
+        self._mapped: Optional[Tuple[tuple, BinaryUserFile]] = None
+
+    def _users_file(self) -> Optional[BinaryUserFile]:
+        """
+        Get the mapping of the current data file, remapping it when the file was replaced.
+
+        Returns:
+            Optional[BinaryUserFile]: The mapped file, or None if there is no data file
+        """
+        try:
+            stat = os.stat(self.file_path)
+        except FileNotFoundError:
+            return None
+        stamp = (self.file_path, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        mapped = self._mapped
+        if mapped is None or mapped[0] != stamp:
+            # Earlier mappings are not closed: a concurrent reader may still use them
+            mapped = self._mapped = (stamp, BinaryUserFile(self.file_path))
+        return mapped[1]
+
+    def _load_users(self) -> List[User]:
+        """
+        Load users from the binary file.
+
+        Returns:
+            List[User]: List of User objects
+        """
+        users_file = self._users_file()
+        users = list(users_file) if users_file is not None else []
+        if metrics.REGISTRY.enabled:
+            metrics.observe('repository_load_records', len(users), metrics.SIZE_BUCKETS)
+        return users
+
+    def _save_users(self, users: List[User]) -> None:
+        """
+        Save users to the binary file through a temporary file.
+
+        Args:
+            users (List[User]): List of User objects to save
+        """
+        with atomic_write(self.file_path, 'wb') as f:
+            write_users(users, f)
+
+    def iter_users(self) -> Iterator[User]:
+        """
+        Iterate over all users, decoding one record at a time.
+
+        Returns:
+            Iterator[User]: Iterator over User objects
+        """
+        users_file = self._users_file()
+        return iter(users_file) if users_file is not None else iter(())
+
+    @read_operation
+    def list_users(self, offset: int = 0, limit: Optional[int] = None) -> List[User]:
+        """
+        Get one page of users, decoding only the records of the page.
+
+        Args:
+            offset (int): Number of users to skip
+            limit (Optional[int]): Maximum number of users to return (all if None)
+
+        Returns:
+            List[User]: Users in the requested page
+        """
+        users_file = self._users_file()
+        if users_file is None:
+            return []
+        return list(users_file.users(offset, None if limit is None else offset + limit))
+
+    @read_operation
+    def get_by_email(self, email: str) -> Optional[User]:
+        """
+        Get a user by email through the mapped email index.
+
+        Args:
+            email (str): Email address to search for
+
+        Returns:
+            Optional[User]: User object if found, None otherwise
+        """
+        users_file = self._users_file()
+        return users_file.find_by_email(email) if users_file is not None else None
+
+    @read_operation
+    def get_by_id(self, user_id: str) -> Optional[User]:
+        """
+        Get a user by UserID through the mapped user_id index.
+
+        Args:
+            user_id (str): UserID (UUID) to search for
+
+        Returns:
+            Optional[User]: User object if found, None otherwise
+        """
+        users_file = self._users_file()
+        return users_file.find_by_id(user_id) if users_file is not None else None
+
+def json_to_binary(json_path: str, binary_path: str) -> int:
+    """
+    Convert a JSON users file to the binary format.
+    Args:
+        json_path (str): Source JSON file
+        binary_path (str): Destination binary file (replaced atomically)
+    Returns:
+        int: Number of users converted
+    """
+    with atomic_write(binary_path, 'wb') as f:
+        return write_users(UserRepository(json_path).iter_users(), f)
+
+def binary_to_json(binary_path: str, json_path: str) -> int:
+    """
+    Convert a binary users file to the JSON format.
+    Args:
+        binary_path (str): Source binary file
+        json_path (str): Destination JSON file (replaced atomically)
+    Returns:
+        int: Number of users converted
+    """
+    users_file = BinaryUserFile(binary_path)
+    with atomic_write(json_path) as f:
+        dump_users(users_file, f)
+    return len(users_file)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the format conversion command line.
+    Args:
+        argv (Optional[List[str]]): Command line arguments (defaults to sys.argv)
+    Returns:
+        int: Process exit code
+    """
+    parser = argparse.ArgumentParser(prog="python -m src.binary_repository",
+                                     description="Convert a users file between the JSON and binary formats.")
+    parser.add_argument('command', choices=['to-binary', 'to-json'])
+    parser.add_argument('source', help="File to read")
+    parser.add_argument('target', help="File to write (replaced if it exists)")
+    args = parser.parse_args(argv)
+
+    convert = json_to_binary if args.command == 'to-binary' else binary_to_json
+    count = convert(args.source, args.target)
+    print(f"Converted {count} users to {args.target}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+import argparse
+import csv
+import json
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO
+from decouple import config
+from . import validation
+from .models import User
+from .passwords import PasswordHasher, hasher_from_config, is_hashed
+from .repository import UserRepository, create_repository
+
+FIELDS = ['user_id', 'name', 'email', 'password', 'version']
+MAX_REPORTED_ERRORS = 20
+
+@dataclass
+class ImportResult:
+    """
+    Summary of a bulk import.
+
+    Attributes:
+        read (int): Records read from the input
+        added (int): Users added to the repository
+        invalid (int): Records rejected by validation
+        duplicates (int): Valid records skipped because the email or UserID already exists
+        errors (List[str]): First validation errors, as "record N: message"
+    """
+    read: int = 0
+    added: int = 0
+    invalid: int = 0
+    duplicates: int = 0
+    errors: List[str] = field(default_factory=list)
+
+def detect_format(path: str, fmt: Optional[str] = None) -> str:
+    """
+    Get the file format from an explicit value or the file extension.
+    Args:
+        path (str): File path
+        fmt (Optional[str]): Explicit format ("csv" or "jsonl")
+    Returns:
+        str: "csv" or "jsonl"
+    Raises:
+        ValueError: If the format is not supported
+    """
+    fmt = (fmt or path.rsplit('.', 1)[-1]).lower()
+    if fmt == 'ndjson':
+        fmt = 'jsonl'
+    if fmt not in ('csv', 'jsonl'):
+        raise ValueError(f"Unsupported format: {fmt} (use csv or jsonl)")
+    return fmt
+
+def read_records(stream: TextIO, fmt: str) -> Iterator[Any]:
+    """
+    Stream records from a CSV (with header) or JSON Lines file.
+    A JSON line that does not parse is yielded as its JSONDecodeError, so the import can
+    report it and go on (see validate_record).
+    Args:
+        stream (TextIO): Open input file
+        fmt (str): "csv" or "jsonl"
+    Returns:
+        Iterator[Any]: One decoded value per record
+    """
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+    else:
+        for line in stream:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as error:
+                    yield error
+
+def validate_record(record: Any) -> Optional[str]:
+    """
+    Validate one import record.
+    Passwords that are already hashed (e.g. from an export) skip the password rules; only
+    well-formed hashes with a cost in passwords.COST_RANGES count (see is_hashed).
+    Args:
+        record (Any): Record with name, email and password, as read by read_records
+    Returns:
+        Optional[str]: Error message, or None if the record is valid
+    """
+    if isinstance(record, json.JSONDecodeError):
+        return f"invalid JSON: {record.msg}"
+    if not isinstance(record, dict):
+        return "not a JSON object"
+    return validation.validate_record(record, check_password=not is_hashed(record.get('password') or ''))
+
+def import_users(repository: UserRepository, records: Iterable[Dict[str, str]],
+                 batch_size: int = 10000, hasher: Optional[PasswordHasher] = None,
+                 workers: Optional[int] = None) -> ImportResult:
+    """
+    Validate records and add the valid ones to the repository in batches.
+    Args:
+        repository (UserRepository): Target repository
+        records (Iterable[Dict[str, str]]): Records to import, consumed lazily
+        batch_size (int): Number of users per commit
+        hasher (Optional[PasswordHasher]): Hasher for plain text passwords (stored as given if None)
+        workers (Optional[int]): Number of hashing processes (CPU count if None)
+    Returns:
+        ImportResult: Import summary
+    """
+    result = ImportResult()
+
+    def valid_users() -> Iterator[User]:
+        for number, record in enumerate(records, start=1):
+            result.read += 1
+            try:
+                error = validate_record(record)
+                user = None if error else User.from_dict(record)
+            except (ValueError, TypeError) as exc:
+                error = f"invalid value: {exc}"
+            if error:
+                result.invalid += 1
+                if len(result.errors) < MAX_REPORTED_ERRORS:
+                    result.errors.append(f"record {number}: {error}")
+                continue
+            yield user
+
+    users = valid_users()
+    if hasher is not None:
+        users = hasher.hash_users(users, batch_size=min(batch_size, 1000), workers=workers)
+    result.added = repository.bulk_add_users(users, batch_size=batch_size)
+    result.duplicates = result.read - result.invalid - result.added
+    return result
+
+def export_users(repository: UserRepository, stream: TextIO, fmt: str) -> int:
+    """
+    Stream all users from the repository to a CSV or JSON Lines file.
+    Args:
+        repository (UserRepository): Source repository
+        stream (TextIO): Open output file
+        fmt (str): "csv" or "jsonl"
+    Returns:
+        int: Number of users written
+    """
+    count = 0
+    writer = csv.DictWriter(stream, fieldnames=FIELDS) if fmt == 'csv' else None
+    if writer:
+        writer.writeheader()
+    for user in repository.iter_users():
+        if writer:
+            writer.writerow(user.to_dict())
+        else:
+            stream.write(json.dumps(user.to_dict()) + '\n')
+        count += 1
+    return count
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the bulk import/export command line.
+    Args:
+        argv (Optional[List[str]]): Command line arguments (defaults to sys.argv)
+    Returns:
+        int: Process exit code
+    """
+    parser = argparse.ArgumentParser(prog="python -m src.bulk", description="Bulk import/export users.")
+    parser.add_argument('command', choices=['import', 'export'])
+    parser.add_argument('path', help="CSV or JSONL file ('-' for stdin/stdout)")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help="File format (default: from extension)")
+    parser.add_argument('--batch-size', type=int, default=10000, help="Users per commit on import")
+    parser.add_argument('--workers', type=int, help="Password hashing processes on import (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    fmt = detect_format(args.path, args.format) if args.path != '-' else (args.format or 'jsonl')
+    repository = create_repository(
+        config('DATA_FILE_PATH', default='data/users.json'),
+        config('STORAGE_BACKEND', default=''),
+        change_feed=config('CHANGE_FEED', default=False, cast=bool)
+    )
+    if args.command == 'import':
+        stream = sys.stdin if args.path == '-' else open(args.path, newline='')
+        try:
+            result = import_users(repository, read_records(stream, fmt), batch_size=args.batch_size,
+                                  hasher=hasher_from_config(), workers=args.workers)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        for error in result.errors:
+            print(error, file=sys.stderr)
+        print(f"Read {result.read}, added {result.added}, "
+              f"invalid {result.invalid}, duplicates {result.duplicates}", file=sys.stderr)
+        return 1 if result.invalid else 0
+    stream = sys.stdout if args.path == '-' else open(args.path, 'w', newline='')
+    try:
+        count = export_users(repository, stream, fmt)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+    print(f"Exported {count} users", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
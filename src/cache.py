@@ -0,0 +1,164 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+_MISSING = object()
+
+class LRUCache:
+    """
+    Thread-safe, size-bounded least-recently-used cache with optional expiry.
+
+    When the cache is full the least recently used entry is evicted. With a
+    ttl, entries older than ttl seconds are treated as missing and dropped
+    when looked up; put() can give an entry its own ttl. With max_bytes, the
+    sizes given to put() are added up and least recently used entries are
+    evicted to keep the total under max_bytes as well.
+
+    Attributes:
+        hits (int): Lookups that found a live entry
+        misses (int): Lookups that found nothing or an expired entry
+        evictions (int): Entries dropped to make room
+        expirations (int): Entries dropped because they were too old
+        nbytes (int): Total size of the entries, as given to put()
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic, max_bytes: Optional[int] = None,
+                 on_discard: Optional[Callable[[Hashable, Any], None]] = None):
+        """
+        Initialize the LRUCache.
+
+        Args:
+            maxsize (int): Maximum number of entries
+            ttl (Optional[float]): Seconds an entry stays valid (forever if None)
+            clock (Callable[[], float]): Time source, in seconds
+            max_bytes (Optional[int]): Maximum total size of the entries (unbounded if None)
+            on_discard (Optional[Callable[[Hashable, Any], None]]): Called with the key and value of every
+                entry evicted or expired (not of the ones removed by pop() or clear()), outside the cache's lock
+
+        Raises:
+            ValueError: If maxsize or max_bytes is not positive
+        """
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        if max_bytes is not None and max_bytes <= 0:
+            raise ValueError("max_bytes must be positive")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._on_discard = on_discard
+        # key -> (value, expiry time or None, size)
+        self._entries: 'OrderedDict[Hashable, Tuple[Any, Optional[float], int]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.nbytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _discarded(self, entries: List[Tuple[Hashable, Any]]) -> None:
+        if self._on_discard is not None:
+            for key, value in entries:
+                self._on_discard(key, value)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Look up a key and mark it as recently used.
+
+        Args:
+            key (Hashable): Cache key
+            default (Any): Value returned when the key is missing or expired
+
+        Returns:
+            Any: Cached value or default
+        """
+        expired = None
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING and entry[1] is not None and self._clock() > entry[1]:
+                del self._entries[key]
+                self.nbytes -= entry[2]
+                self.expirations += 1
+                expired, entry = entry, _MISSING
+            if entry is not _MISSING:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        if expired is not None:
+            self._discarded([(key, expired[0])])
+        return default
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None, nbytes: int = 0) -> None:
+        """
+        Store a value, evicting least recently used entries if the cache is full.
+
+        Args:
+            key (Hashable): Cache key
+            value (Any): Value to store
+            ttl (Optional[float]): Seconds this entry stays valid (the cache's ttl if None)
+            nbytes (int): Size of the entry, counted against max_bytes
+        """
+        ttl = self.ttl if ttl is None else ttl
+        evicted = []
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[2]
+            self._entries[key] = (value, None if ttl is None else self._clock() + ttl, nbytes)
+            self.nbytes += nbytes
+            while len(self._entries) > self.maxsize or (self.max_bytes is not None and self.nbytes > self.max_bytes
+                                                        and len(self._entries) > 1):
+                evicted_key, entry = self._entries.popitem(last=False)
+                self.nbytes -= entry[2]
+                self.evictions += 1
+                evicted.append((evicted_key, entry[0]))
+        self._discarded(evicted)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Remove a key if present.
+
+        Args:
+            key (Hashable): Cache key
+            default (Any): Value returned when the key is missing
+
+        Returns:
+            Any: The removed value (even if expired) or default
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return default
+            self.nbytes -= entry[2]
+            return entry[0]
+
+    def clear(self) -> None:
+        """
+        Remove every entry (counters are kept).
+        """
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the cache counters.
+
+        Returns:
+            Dict[str, Any]: size, hits, misses, hit_ratio, evictions and expirations
+        """
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
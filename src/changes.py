@@ -0,0 +1,335 @@
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, BinaryIO, Deque, Dict, Iterable, List, Optional, Tuple
+from .locking import FileLock
+from .models import User
+
+# Bytes read from the end of the feed at a time when looking for the last event
+_TAIL_CHUNK = 4096
+
+def _last_complete_line(f: BinaryIO, end: int) -> Tuple[int, bytes]:
+    """
+    Find the last newline-terminated line of a file, reading backwards from end.
+    Args:
+        f (BinaryIO): File open for reading
+        end (int): File size
+    Returns:
+        Tuple[int, bytes]: Offset just past that line, and the line (b'' if there is none)
+    """
+    position = end
+    while position > 0:
+        position = max(0, position - _TAIL_CHUNK)
+        f.seek(position)
+        tail = f.read(end - position)
+        last = tail.rfind(b'\n')
+        if last < 0:
+            continue
+        previous = tail.rfind(b'\n', 0, last)
+        if previous >= 0 or position == 0:
+            return position + last + 1, tail[previous + 1:last + 1]
+    return 0, b''
+
+class ChangeEvent:
+    """
+    One committed change to a user.
+
+    Attributes:
+        seq (int): Position in the change feed (1, 2, 3, ... in commit order)
+        op (str): "add", "update" or "delete"
+        user (Dict[str, Any]): The user record after the change (before it, for a delete)
+        timestamp (float): Commit time, in seconds since the epoch
+    """
+
+    __slots__ = ('seq', 'op', 'user', 'timestamp')
+
+    def __init__(self, seq: int, op: str, user: Dict[str, Any], timestamp: float):
+        self.seq = seq
+        self.op = op
+        self.user = user
+        self.timestamp = timestamp
+
+    @property
+    def user_id(self) -> str:
+        return self.user['user_id']
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'seq': self.seq, 'op': self.op, 'user': self.user, 'timestamp': self.timestamp}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ChangeEvent':
+        return cls(data['seq'], data['op'], data['user'], data['timestamp'])
+
+    def __repr__(self) -> str:
+        return f"ChangeEvent(seq={self.seq}, op={self.op!r}, user_id={self.user_id!r})"
+
+class SubscriptionClosed(Exception):
+    """
+    Raised by Subscription.get() once the subscription was closed.
+    """
+
+class Subscription:
+    """
+    In-process stream of the events published to a ChangeFeed.
+
+    Events are delivered in sequence order through a bounded queue. When the
+    queue stays full (the consumer falls behind), the feed stops queueing
+    for this subscription and get() transparently catches up from the
+    durable feed, then goes back to the queue, so no event is lost or
+    repeated. Only events committed by this process are queued; changes
+    made by other processes are read from the durable feed with
+    ChangeFeed.changes_since().
+    """
+
+    def __init__(self, feed: 'ChangeFeed', maxsize: int, last_seq: int, lagging: bool):
+        self._feed = feed
+        self._queue: 'queue.Queue[ChangeEvent]' = queue.Queue(maxsize)
+        self._backlog: Deque[ChangeEvent] = deque()
+        self.maxsize = maxsize
+        self.last_seq = last_seq
+        self.lagging = lagging
+        self.closed = False
+
+    def _offer(self, event: ChangeEvent, timeout: float) -> None:
+        """
+        Queue an event, waiting up to timeout seconds for room (publisher side).
+        """
+        if self.lagging or self.closed:
+            return
+        try:
+            self._queue.put(event, timeout=timeout)
+        except queue.Full:
+            self.lagging = True
+
+    def get(self, timeout: Optional[float] = None) -> Optional[ChangeEvent]:
+        """
+        Get the next event.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait for an event (forever if None)
+
+        Returns:
+            Optional[ChangeEvent]: The next event, or None if none arrived in time
+
+        Raises:
+            SubscriptionClosed: If the subscription was closed
+        """
+        if self.closed:
+            raise SubscriptionClosed()
+        if not self._backlog and self.lagging and self._queue.empty():
+            self._catch_up()
+        if self._backlog:
+            event = self._backlog.popleft()
+        else:
+            try:
+                event = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                return None
+        self.last_seq = event.seq
+        return event
+
+    def _catch_up(self) -> None:
+        """
+        Read the events missed while lagging from the durable feed.
+        The last read is done under the publish lock, so the queue takes over
+        exactly where the durable feed ends.
+        """
+        events = self._feed.changes_since(self.last_seq, limit=self.maxsize)
+        if len(events) < self.maxsize:
+            with self._feed._publish_lock:
+                events = self._feed.changes_since(self.last_seq)
+                self.lagging = False
+        self._backlog.extend(events)
+
+    def close(self) -> None:
+        """
+        Stop receiving events.
+        """
+        self.closed = True
+        self._feed._unsubscribe(self)
+
+class ChangeFeed:
+    """
+    Durable, ordered log of the changes committed to a repository.
+
+    Each committed write appends its events to a JSON Lines file (one event
+    per line, fsynced once per commit) and numbers them with a sequence
+    number that increases by one per event, across processes. Consumers sync
+    incrementally with changes_since(seq), which finds its start position by
+    binary search, so its cost depends on the number of new events rather
+    than on the size of the feed or of the data set. In-process consumers can
+    subscribe() to receive events as they are committed.
+
+    Writers wait up to block_timeout seconds for room in a full subscriber
+    queue, which slows them down to the pace of the consumers; a subscriber
+    still full after that is switched to catching up from the file instead.
+
+    Delivery is at most once: the events of a write are appended after the
+    repository committed it (still under its write lock, so the feed is in
+    commit order). A crash, or an error writing the feed, between the commit
+    and the append loses that write's events, while an event is never
+    recorded for a write that was not committed. Consumers that must not miss
+    a change should reconcile with the repository after an unclean shutdown,
+    e.g. by comparing each user's version with the last one they saw.
+    """
+
+    def __init__(self, path: str, block_timeout: float = 1.0):
+        """
+        Initialize the ChangeFeed.
+
+        Args:
+            path (str): JSON Lines feed file (created on the first change)
+            block_timeout (float): Seconds a writer waits for room in a full subscriber queue
+        """
+        self.path = path
+        self.block_timeout = block_timeout
+        self._publish_lock = threading.Lock()
+        self._file_lock = FileLock()
+        self._subscribers: List[Subscription] = []
+        # (file identity, last seq) of the feed as this process last wrote or read it
+        self._tail: Optional[Tuple[Tuple[int, int], int]] = None
+
+    @property
+    def lock_path(self) -> str:
+        return self.path + ".lock"
+
+    def _file_identity(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_size)
+
+    def last_seq(self) -> int:
+        """
+        Get the sequence number of the last committed event (0 if there is none).
+        """
+        identity = self._file_identity()
+        if identity is None:
+            return 0
+        if self._tail is None or self._tail[0] != identity:
+            with open(self.path, 'rb') as f:
+                _, line = _last_complete_line(f, identity[1])
+            self._tail = (identity, json.loads(line)['seq'] if line else 0)
+        return self._tail[1]
+
+    def publish(self, changes: Iterable[Tuple[str, User]]) -> List[ChangeEvent]:
+        """
+        Commit the changes of one write to the feed and hand them to the subscribers.
+
+        Args:
+            changes (Iterable[Tuple[str, User]]): (op, user) pairs in the order they were applied
+
+        Returns:
+            List[ChangeEvent]: The numbered events (empty if there were no changes)
+        """
+        changes = list(changes)
+        if not changes:
+            return []
+        with self._publish_lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with self._file_lock.locked(self.lock_path):
+                seq = self.last_seq()
+                now = time.time()
+                events = [ChangeEvent(seq + i, op, user.to_dict(), now) for i, (op, user) in enumerate(changes, 1)]
+                self._append(events)
+            for subscriber in list(self._subscribers):
+                for event in events:
+                    subscriber._offer(event, self.block_timeout)
+        return events
+
+    def _append(self, events: List[ChangeEvent]) -> None:
+        """
+        Append events to the feed file and sync them to disk.
+        """
+        data = ''.join(json.dumps(event.to_dict()) + '\n' for event in events).encode()
+        with open(self.path, 'ab+') as f:
+            end = f.seek(0, os.SEEK_END)
+            if end:
+                f.seek(end - 1)
+                if f.read(1) != b'\n':
+                    # Drop the partial line left by a crash, so the new events start on a line of their own
+                    f.truncate(_last_complete_line(f, end)[0])
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self._tail = (self._file_identity(), events[-1].seq)
+
+    @staticmethod
+    def _start_offset(f: BinaryIO, seq: int, size: int) -> int:
+        """
+        Binary-search the byte offset of the first event after seq.
+        """
+        def line_start(offset: int) -> int:
+            # Offset of the first line starting at or after offset
+            if offset == 0:
+                return 0
+            f.seek(offset - 1)
+            f.readline()
+            return f.tell()
+
+        low, high = 0, size
+        while low < high:
+            middle = (low + high) // 2
+            f.seek(line_start(middle))
+            line = f.readline()
+            if not line.endswith(b'\n') or json.loads(line)['seq'] > seq:
+                high = middle
+            else:
+                low = middle + 1
+        return line_start(low)
+
+    def changes_since(self, seq: int, limit: Optional[int] = None) -> List[ChangeEvent]:
+        """
+        Get the committed events that come after a sequence number.
+
+        Args:
+            seq (int): Last sequence number already seen (0 for the whole feed)
+            limit (Optional[int]): Maximum number of events to return (all if None)
+
+        Returns:
+            List[ChangeEvent]: Events with a sequence number above seq, in order
+        """
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return []
+        events = []
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            f.seek(self._start_offset(f, seq, size))
+            while limit is None or len(events) < limit:
+                line = f.readline()
+                if not line.endswith(b'\n'):
+                    break
+                event = ChangeEvent.from_dict(json.loads(line))
+                if event.seq > seq:
+                    events.append(event)
+        return events
+
+    def subscribe(self, since: Optional[int] = None, maxsize: int = 1000) -> Subscription:
+        """
+        Receive the events committed from now on (or after since) as they happen.
+
+        Args:
+            since (Optional[int]): Last sequence number already seen; the older events
+                are replayed from the durable feed first (None starts at the current end)
+            maxsize (int): Bound of the subscription queue
+
+        Returns:
+            Subscription: The event stream (close() it when done)
+        """
+        with self._publish_lock:
+            current = self.last_seq()
+            subscription = Subscription(self, maxsize, current if since is None else since,
+                                        lagging=since is not None and since < current)
+            self._subscribers.append(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription) -> None:
+        with self._publish_lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
@@ -0,0 +1,212 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional, TextIO
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, only the in-process lock applies
+    fcntl = None
+
+class RWLock:
+    """
+    Readers-writer lock for threads of one process.
+
+    Many readers may hold the lock at once; a writer holds it alone. Waiting
+    writers block new readers so writes are not starved. The lock is reentrant:
+    a writer may acquire it again for reading or writing and a reader may
+    acquire it again for reading. Upgrading a read lock to a write lock is
+    not supported.
+    """
+
+    def __init__(self):
+        """
+        Initialize the RWLock.
+        """
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer: Optional[int] = None
+        self._writer_depth = 0
+        self._waiting_writers = 0
+        self._local = threading.local()
+
+    def _read_depth(self) -> int:
+        return getattr(self._local, 'depth', 0)
+
+    def owned_for_write(self) -> bool:
+        """
+        Check whether the current thread holds the write lock.
+        """
+        return self._writer == threading.get_ident()
+
+    def owned_for_read(self) -> bool:
+        """
+        Check whether the current thread holds a read lock.
+        """
+        return self._read_depth() > 0
+
+    def acquire_read(self) -> None:
+        """
+        Acquire the lock for reading.
+        """
+        if self.owned_for_write():
+            self._writer_depth += 1
+            return
+        depth = self._read_depth()
+        with self._cond:
+            if depth == 0:
+                while self._writer is not None or self._waiting_writers:
+                    self._cond.wait()
+            self._readers += 1
+        self._local.depth = depth + 1
+
+    def release_read(self) -> None:
+        """
+        Release a read lock.
+        """
+        if self.owned_for_write():
+            self._writer_depth -= 1
+            return
+        self._local.depth = self._read_depth() - 1
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire_write(self) -> None:
+        """
+        Acquire the lock for writing.
+
+        Raises:
+            RuntimeError: If the current thread holds a read lock
+        """
+        if self.owned_for_write():
+            self._writer_depth += 1
+            return
+        if self.owned_for_read():
+            raise RuntimeError("Cannot upgrade a read lock to a write lock")
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writer is not None or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = threading.get_ident()
+            self._writer_depth = 1
+
+    def release_write(self) -> None:
+        """
+        Release the write lock.
+        """
+        self._writer_depth -= 1
+        if self._writer_depth == 0:
+            with self._cond:
+                self._writer = None
+                self._cond.notify_all()
+
+    @contextmanager
+    def read_locked(self) -> Iterator[None]:
+        """
+        Hold the lock for reading inside a with block.
+        """
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write_locked(self) -> Iterator[None]:
+        """
+        Hold the lock for writing inside a with block.
+        """
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+class FileLock:
+    """
+    Exclusive advisory lock on a lock file, shared between processes (fcntl.flock).
+
+    The lock is meant to be taken while the in-process write lock is held, so
+    only one thread per process uses it at a time; nested acquisitions by that
+    thread are counted. On platforms without fcntl it does nothing.
+    """
+
+    def __init__(self):
+        """
+        Initialize the FileLock.
+        """
+        self._fd: Optional[int] = None
+        self._depth = 0
+
+    @property
+    def held(self) -> bool:
+        """
+        Whether the lock is currently held (by the thread holding the in-process write lock).
+        """
+        return self._depth > 0
+
+    @contextmanager
+    def locked(self, path: str) -> Iterator[None]:
+        """
+        Hold the exclusive lock on path inside a with block.
+
+        Args:
+            path (str): Lock file path (created if missing)
+        """
+        if self._depth == 0 and fcntl is not None:
+            self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if self._depth == 0 and self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+                os.close(self._fd)
+                self._fd = None
+
+@contextmanager
+def atomic_write(path: str, mode: str = 'w') -> Iterator[TextIO]:
+    """
+    Write a file through a temporary file that replaces it only once complete.
+
+    Readers see either the old or the new content, never a partial write, and a
+    crash leaves the old file in place.
+
+    Args:
+        path (str): Destination file path
+        mode (str): File mode for the temporary file ('w' or 'wb')
+
+    Returns:
+        Iterator[TextIO]: Open temporary file to write to
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, mode) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def sync_directory(path: str) -> None:
+    """
+    Flush the entries of a directory (renamed, created or removed files) to disk.
+    Does nothing on platforms where a directory cannot be opened (Windows).
+
+    Args:
+        path (str): Directory path ('' for the current directory)
+    """
+    if os.name != 'posix':
+        return
+    fd = os.open(path or '.', os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
@@ -0,0 +1,428 @@
+import io
+import json
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from . import metrics
+from .locking import atomic_write, sync_directory
+from .models import User
+from .repository import (CachedUserRepository, CorruptDataError, UserRepository, batched, dump_users, stage_updates,
+                         update_changes, write_operation)
+
+class LogUserRepository(CachedUserRepository):
+    """
+    Repository that appends changes to a write-ahead log instead of rewriting the JSON file.
+
+    The JSON file keeps the same format as UserRepository and is used as a
+    snapshot. Every add/delete is appended as one JSON Lines record to
+    "<file_path>.log", so a write costs O(1) bytes. On load the snapshot is read
+    and the log is replayed on top of it. Once the log grows past
+    compact_threshold bytes, a background thread folds it into a new snapshot.
+
+    Log records are applied as upserts/deletes by user_id, so replaying a log
+    prefix that is already part of the snapshot (e.g. after a crash during
+    compaction) gives the same result. Appends and compactions hold the
+    cross-process file lock, and other processes pick up new records by
+    replaying the log tail.
+
+    Appends are fsynced unless sync is off, so a committed change survives a
+    crash. Only the last record can be torn by a crash: it is ignored, and
+    dropped by the next append. A damaged record before it raises
+    CorruptDataError rather than being skipped.
+    """
+
+    def __init__(self, file_path: str = "data/users.json", compact_threshold: Optional[int] = 1024 * 1024,
+                 sync: Optional[bool] = None):
+        """
+        Initialize the LogUserRepository.
+
+        Args:
+            file_path (str): Path to the JSON snapshot file
+            compact_threshold (Optional[int]): Log size in bytes that triggers a background
+                compaction, or None to compact only when compact() is called
+            sync (Optional[bool]): fsync every append (LOG_SYNC, default True); without it a crash
+                of the machine can lose the last appended changes
+        """
+        if sync is None:
+            from decouple import config
+            sync = config('LOG_SYNC', default=True, cast=bool)
+        self.sync = sync
+        self.compact_threshold = compact_threshold
+        self._source: Optional[Tuple[str, Optional[Tuple[str, int, int, int]]]] = None
+        self._log_offset = 0
+        self._compactor: Optional[threading.Thread] = None
+        super().__init__(file_path)
+
+    @property
+    def log_path(self) -> str:
+        """
+        Path of the write-ahead log next to the snapshot file.
+        """
+        return self.file_path + ".log"
+
+    def _ensure_data_directory(self) -> None:
+        """
+        Ensure the data directory and an (empty) snapshot file exist.
+        """
+        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+        if not os.path.exists(self.file_path):
+            with self._exclusive():
+                if not os.path.exists(self.file_path):
+                    self._write_snapshot([])
+
+    def _write_snapshot(self, users: List[User]) -> None:
+        """
+        Write a snapshot to a temporary file and move it over the JSON file.
+
+        Args:
+            users (List[User]): Users to store in the snapshot
+        """
+        with atomic_write(self.file_path) as f:
+            dump_users(users, f)
+            if metrics.REGISTRY.enabled:
+                metrics.inc('json_bytes_written_total', f.tell())
+
+    def _apply_record(self, record: Dict) -> None:
+        """
+        Apply one log record to the in-memory state.
+
+        Args:
+            record (Dict): Decoded log record ({"op": "add", "user": {...}} or {"op": "delete", "user_id": ...})
+        """
+        if record.get('op') == 'add':
+            self._index_add(User.from_dict(record['user']))
+        elif record.get('op') == 'delete':
+            self._index_remove(record['user_id'])
+
+    def _log_size(self) -> int:
+        """
+        Get the current size of the log file (0 if missing).
+        """
+        try:
+            return os.path.getsize(self.log_path)
+        except FileNotFoundError:
+            return 0
+
+    def _needs_sync(self) -> bool:
+        """
+        Check whether the snapshot or the log changed since they were last read.
+        """
+        return (self.file_path, self._file_stamp()) != self._source or self._log_size() != self._log_offset
+
+    def _sync(self) -> None:
+        """
+        Bring the in-memory state up to date with the snapshot and the log.
+
+        The snapshot is re-read only if it changed on disk or the log shrank
+        (another writer compacted it); otherwise only the new log tail is replayed.
+        Must be called with the write lock held.
+        """
+        source = (self.file_path, self._file_stamp())
+        log_size = self._log_size()
+        if source != self._source or log_size < self._log_offset:
+            users = UserRepository._load_users(self) if source[1] else []
+            self._set_users(users, source[1])
+            # The name index matches the snapshot only before the log is replayed
+            self._save_side_files()
+            self._source = source
+            self._log_offset = 0
+        if log_size > self._log_offset:
+            self._replay_log()
+
+    def _replay_log(self) -> None:
+        """
+        Apply the complete log records written after the current log offset.
+        A trailing partial line (a write in progress or torn by a crash) is left for later.
+
+        Raises:
+            CorruptDataError: If a complete record cannot be decoded
+        """
+        with open(self.log_path, 'rb') as f:
+            f.seek(self._log_offset)
+            data = f.read()
+        end = data.rfind(b'\n') + 1
+        if metrics.REGISTRY.enabled:
+            metrics.inc('json_bytes_read_total', end)
+        position = self._log_offset
+        for line in data[:end].splitlines(keepends=True):
+            try:
+                self._apply_record(json.loads(line))
+            except (ValueError, KeyError, TypeError) as error:
+                raise CorruptDataError(f"{self.log_path} is corrupt at byte {position}: {error}") from error
+            position += len(line)
+        self._log_offset += end
+
+    def _append(self, records: List[Dict]) -> None:
+        """
+        Append records to the log and apply them.
+
+        Args:
+            records (List[Dict]): Log records to append
+        """
+        with self._exclusive():
+            self._refresh()
+            if self._log_size() > self._log_offset:
+                # A record torn by a crashed writer: drop it so the new records start on their own line
+                os.truncate(self.log_path, self._log_offset)
+            text = ''.join(json.dumps(record) + '\n' for record in records)
+            with open(self.log_path, 'a') as f:
+                f.write(text)
+                if self.sync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            if metrics.REGISTRY.enabled:
+                metrics.inc('json_bytes_written_total', len(text))
+            self._refresh()
+            if self.compact_threshold is not None and self._log_offset >= self.compact_threshold:
+                self._start_compaction()
+
+    def _save_users(self, users: List[User]) -> None:
+        """
+        Save the given users as the full repository content.
+
+        Only the difference with the current content is appended to the log.
+
+        Args:
+            users (List[User]): List of User objects to save
+        """
+        with self._exclusive():
+            self._refresh()
+            wanted = {user.user_id: user for user in users}
+            records = [{'op': 'delete', 'user_id': user_id} for user_id in self._by_id if user_id not in wanted]
+            for user in users:
+                current = self._by_id.get(user.user_id)
+                if current is None or current.to_dict() != user.to_dict():
+                    records.append({'op': 'add', 'user': user.to_dict()})
+            if records:
+                self._append(records)
+
+    @write_operation
+    def restore_users(self, users: List[User]) -> None:
+        """
+        Replace the whole content with a new snapshot and an empty log, and rebuild the indexes.
+
+        Args:
+            users (List[User]): The new content
+        """
+        self._write_snapshot(users)
+        if os.path.exists(self.log_path):
+            # The new snapshot must be on disk before the log it replaces is gone
+            sync_directory(os.path.dirname(self.file_path))
+            os.remove(self.log_path)
+        stamp = self._file_stamp()
+        self._stamp = None
+        self._set_users(users, stamp)
+        self._save_side_files()
+        self._source = (self.file_path, stamp)
+        self._log_offset = 0
+
+    @write_operation
+    def add_user(self, user: User) -> bool:
+        """
+        Add a new user by appending it to the log.
+
+        Args:
+            user (User): User object to add
+
+        Returns:
+            bool: True if user was added successfully, False if the email or UserID already exists
+        """
+        self._refresh()
+        # An "add" record is an upsert by UserID, so a reused UserID would overwrite its user
+        if user.email in self._by_email or user.user_id in self._by_id:
+            return False
+        self._append([{'op': 'add', 'user': user.to_dict()}])
+        self._publish_changes([('add', user)])
+        return True
+
+    @write_operation
+    def bulk_add_users(self, users: Iterable[User], batch_size: int = 10000) -> int:
+        """
+        Add many users, appending one log write per batch.
+
+        Args:
+            users (Iterable[User]): Users to add, consumed lazily
+            batch_size (int): Number of users per log append
+
+        Returns:
+            int: Number of users added
+        """
+        added = 0
+        self._refresh()
+        emails = set(self._by_email)
+        user_ids = set(self._by_id)
+        for batch in batched(users, batch_size):
+            new_users = []
+            for user in batch:
+                # An "add" record is an upsert by UserID, so a reused UserID would overwrite its user
+                if user.email in emails or user.user_id in user_ids:
+                    continue
+                emails.add(user.email)
+                user_ids.add(user.user_id)
+                new_users.append(user)
+            if new_users:
+                self._append([{'op': 'add', 'user': user.to_dict()} for user in new_users])
+                self._publish_changes([('add', user) for user in new_users])
+                added += len(new_users)
+        return added
+
+    @write_operation
+    def apply_batch(self, operations: List[Tuple[str, Any]]) -> List[bool]:
+        """
+        Apply several changes in order with a single log append.
+
+        Args:
+            operations (List[Tuple[str, Any]]): ("add", User), ("delete", email) or ("delete_id", user_id) pairs
+
+        Returns:
+            List[bool]: Result of each operation, as add_user/delete_user/delete_by_id would return it
+
+        Raises:
+            ValueError: If an operation name is unknown
+        """
+        self._refresh()
+        emails = {email: user.user_id for email, user in self._by_email.items()}
+        email_of = {user_id: user.email for user_id, user in self._by_id.items()}
+        added_users: Dict[str, User] = {}
+        records, changes = [], []
+        results = []
+        for operation, argument in operations:
+            if operation == "add":
+                added = argument.email not in emails and argument.user_id not in email_of
+                if added:
+                    emails[argument.email] = argument.user_id
+                    email_of[argument.user_id] = argument.email
+                    added_users[argument.user_id] = argument
+                    records.append({'op': 'add', 'user': argument.to_dict()})
+                    changes.append(('add', argument))
+                results.append(added)
+            elif operation in ("delete", "delete_id"):
+                user_id = emails.pop(argument, None) if operation == "delete" else argument
+                email = email_of.pop(user_id, None)
+                if email is not None:
+                    emails.pop(email, None)
+                    records.append({'op': 'delete', 'user_id': user_id})
+                    changes.append(('delete', added_users.pop(user_id, None) or self._by_id[user_id]))
+                results.append(email is not None)
+            else:
+                raise ValueError(f"Unknown operation: {operation}")
+        if records:
+            self._append(records)
+            self._publish_changes(changes)
+        return results
+
+    @write_operation
+    def update_many(self, updates: Iterable[Dict[str, Any]]) -> List[Optional[User]]:
+        """
+        Apply several updates with a single log append.
+        Each updated user is appended as an upsert record; the snapshot is not rewritten.
+
+        Args:
+            updates (Iterable[Dict[str, Any]]): Updates to apply in order (see UserRepository.update_many)
+
+        Returns:
+            List[Optional[User]]: The updated user for each update, None for unknown UserIDs
+
+        Raises:
+            ValueError: If a field cannot be updated or a new email belongs to another user
+            VersionConflictError: If an expected version is stale
+        """
+        self._refresh()
+        results, changed = stage_updates(self._by_id, self._by_email, updates)
+        if changed:
+            self._append([{'op': 'add', 'user': user.to_dict()} for user in changed.values()])
+            self._publish_changes(update_changes(results))
+        return results
+
+    @write_operation
+    def delete_many(self, user_ids: Iterable[str]) -> int:
+        """
+        Delete several users by UserID with a single log append.
+        Each deletion is a tombstone record; the snapshot is not rewritten.
+
+        Args:
+            user_ids (Iterable[str]): UserIDs of the users to delete
+
+        Returns:
+            int: Number of users deleted
+        """
+        self._refresh()
+        ids = {user_id for user_id in user_ids if user_id in self._by_id}
+        if ids:
+            deleted = [self._by_id[user_id] for user_id in ids]
+            self._append([{'op': 'delete', 'user_id': user_id} for user_id in ids])
+            self._publish_changes([('delete', user) for user in deleted])
+        return len(ids)
+
+    @write_operation
+    def delete_user(self, email: str) -> bool:
+        """
+        Delete a user by email by appending a delete record to the log.
+
+        Args:
+            email (str): Email of the user to delete
+
+        Returns:
+            bool: True if user was deleted, False if user not found
+        """
+        self._refresh()
+        user = self._by_email.get(email)
+        if user is None:
+            return False
+        self._append([{'op': 'delete', 'user_id': user.user_id}])
+        self._publish_changes([('delete', user)])
+        return True
+
+    def save_snapshot(self) -> None:
+        """
+        Do nothing: the state is the JSON snapshot plus the log, which compact() folds together.
+        """
+
+    def _start_compaction(self) -> None:
+        """
+        Start a background compaction unless one is already running.
+        """
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self.compact, daemon=True)
+        self._compactor.start()
+
+    def wait_for_compaction(self) -> None:
+        """
+        Block until a running background compaction finishes.
+        """
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+
+    def compact(self) -> None:
+        """
+        Fold the log into a new snapshot.
+
+        The snapshot is serialized without holding the lock, so writers keep
+        appending meanwhile; records appended after the snapshot point are
+        carried over into the new log. The new snapshot, and the directory
+        entry pointing to it, are synced to disk before the log is replaced.
+        """
+        with self._rwlock.write_locked():
+            self._refresh()
+            users = list(self._by_id.values())
+            source = self._source
+            offset = self._log_offset
+        snapshot = io.StringIO()
+        dump_users(users, snapshot)
+        with self._exclusive():
+            self._refresh()
+            if self._source != source:
+                # The snapshot was replaced meanwhile (e.g. another process compacted)
+                return
+            with open(self.log_path, 'rb') as f:
+                f.seek(offset)
+                tail = f.read(self._log_offset - offset)
+            with atomic_write(self.file_path) as f:
+                f.write(snapshot.getvalue())
+            sync_directory(os.path.dirname(self.file_path))
+            with atomic_write(self.log_path, 'wb') as f:
+                f.write(tail)
+            self._source = (self.file_path, self._file_stamp())
+            self._log_offset = len(tail)
@@ -0,0 +1,249 @@
+import functools
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets, Prometheus style
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds of the records-per-load histogram buckets
+SIZE_BUCKETS = (10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+class Histogram:
+    """
+    Cumulative-bucket histogram, as exposed by Prometheus.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """
+        Get (upper bound, observations <= bound) pairs, ending with "+Inf".
+        """
+        pairs, total = [], 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), self.counts):
+            total += bucket_count
+            pairs.append(('+Inf' if bound == float('inf') else repr(bound), total))
+        return pairs
+
+class MetricsRegistry:
+    """
+    In-process counters and histograms for the repository and the app.
+
+    Recording is opt-in: while enabled is False every recording call returns
+    immediately, so instrumented code only pays for a function call and an
+    attribute check. Metric names follow Prometheus conventions and each
+    sample can carry labels, e.g. operation="repository.add_user".
+    """
+
+    def __init__(self, enabled: bool = False):
+        """
+        Initialize the MetricsRegistry.
+
+        Args:
+            enabled (bool): Whether to record from the start
+        """
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        """
+        Add to a counter.
+
+        Args:
+            name (str): Counter name
+            value (float): Amount to add
+            **labels (str): Sample labels
+        """
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **labels: str) -> None:
+        """
+        Record one observation in a histogram.
+
+        Args:
+            name (str): Histogram name
+            value (float): Observed value
+            buckets (Tuple[float, ...]): Bucket upper bounds, used when the histogram is created
+            **labels (str): Sample labels
+        """
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self._buckets.setdefault(name, buckets))
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, operation: str) -> Iterator[None]:
+        """
+        Record the duration of a with block in the operation latency histogram.
+
+        Args:
+            operation (str): Operation label, e.g. "app.search_users"
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('operation_duration_seconds', time.perf_counter() - start, operation=operation)
+
+    def timed(self, operation: str) -> Callable[[Callable], Callable]:
+        """
+        Decorator recording each call of a function in the operation latency histogram.
+
+        Args:
+            operation (str): Operation label, e.g. "repository.add_user"
+
+        Returns:
+            Callable[[Callable], Callable]: The decorator
+        """
+        def decorator(fn: Callable) -> Callable:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe('operation_duration_seconds', time.perf_counter() - start, operation=operation)
+            return wrapper
+        return decorator
+
+    def reset(self) -> None:
+        """
+        Drop every recorded sample.
+        """
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get all samples as JSON-serializable data.
+
+        Returns:
+            Dict[str, Any]: {"counters": {name: [{labels, value}]},
+                "histograms": {name: [{labels, count, sum, buckets}]}}
+        """
+        with self._lock:
+            return {
+                'counters': {
+                    name: [{'labels': dict(key), 'value': value} for key, value in series.items()]
+                    for name, series in self._counters.items()
+                },
+                'histograms': {
+                    name: [{'labels': dict(key), 'count': h.count, 'sum': h.sum, 'buckets': dict(h.cumulative())}
+                           for key, h in series.items()]
+                    for name, series in self._histograms.items()
+                },
+            }
+
+    def to_json(self) -> str:
+        """
+        Dump all samples as JSON.
+        """
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """
+        Dump all samples in the Prometheus text exposition format.
+        """
+        def labels_text(labels: Dict[str, str], extra: Optional[Tuple[str, str]] = None) -> str:
+            items = list(labels.items()) + ([extra] if extra else [])
+            if not items:
+                return ''
+            return '{' + ','.join(f'{key}="{value}"' for key, value in items) + '}'
+
+        data = self.snapshot()
+        lines = []
+        for name, samples in sorted(data['counters'].items()):
+            lines.append(f"# TYPE {name} counter")
+            for sample in samples:
+                lines.append(f"{name}{labels_text(sample['labels'])} {sample['value']:g}")
+        for name, samples in sorted(data['histograms'].items()):
+            lines.append(f"# TYPE {name} histogram")
+            for sample in samples:
+                for bound, count in sample['buckets'].items():
+                    lines.append(f"{name}_bucket{labels_text(sample['labels'], ('le', bound))} {count}")
+                lines.append(f"{name}_sum{labels_text(sample['labels'])} {sample['sum']:g}")
+                lines.append(f"{name}_count{labels_text(sample['labels'])} {sample['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path: str) -> None:
+        """
+        Write all samples to a file: Prometheus text for ".prom"/".txt", JSON otherwise.
+
+        Args:
+            path (str): Output file path
+        """
+        text = self.to_prometheus() if path.endswith(('.prom', '.txt')) else self.to_json()
+        with open(path, 'w') as f:
+            f.write(text)
+
+# Process-wide registry used by the instrumented modules
+REGISTRY = MetricsRegistry()
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+timer = REGISTRY.timer
+timed = REGISTRY.timed
+
+def configure() -> None:
+    """
+    Enable or disable recording from the METRICS_ENABLED setting.
+    """
+    from decouple import config
+    REGISTRY.enabled = config('METRICS_ENABLED', default=False, cast=bool)
+
+@contextmanager
+def profiled(path: Optional[str] = None) -> Iterator[None]:
+    """
+    Run a with block under cProfile when profiling is configured.
+
+    Profiling is on when PROFILE is true; the pstats file is written to path,
+    or to PROFILE_FILE (default "profile.pstats"). Load it with pstats or
+    snakeviz. When profiling is off the block runs untouched.
+
+    Args:
+        path (Optional[str]): Output file (overrides PROFILE_FILE)
+    """
+    from decouple import config
+    if not config('PROFILE', default=False, cast=bool):
+        yield
+        return
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path or config('PROFILE_FILE', default='profile.pstats'))
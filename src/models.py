@@ -1,6 +1,11 @@
-import re
+import json
+import marshal
+import os
 import uuid
-from typing import Dict, Optional
+from typing import Dict, Iterable, Iterator, List, Optional
+from . import validation
+
+SNAPSHOT_FORMAT_VERSION = 1
 
 class User:
     """
@@ -10,10 +15,16 @@ class User:
         user_id (str): Unique user identifier (UUID)
         name (str): User's full name
         email (str): User's email address
-        password (str): User's password (stored as plain text for demo purposes)
+        password (str): User's password hash (see passwords.py; plain text in unmigrated data)
+        version (int): Record version, incremented by every update (optimistic concurrency)
+    
+    Instances use __slots__ instead of a per-instance __dict__ to keep large
+    user lists compact in memory.
     """
     
-    def __init__(self, name: str, email: str, password: str, user_id: str = None):
+    __slots__ = ('user_id', 'name', 'email', 'password', 'version')
+    
+    def __init__(self, name: str, email: str, password: str, user_id: str = None, version: int = 1):
         """
         Initialize a new User instance.
         
@@ -22,11 +33,13 @@ class User:
             email (str): User's email address
             password (str): User's password
             user_id (str, optional): User's unique identifier (UUID). If not provided, a new UUID is generated.
+            version (int, optional): Record version (1 for a new user)
         """
         self.user_id = user_id or str(uuid.uuid4())
         self.name = name
         self.email = email
         self.password = password
+        self.version = version
     
     @staticmethod
     def validate_email(email: str) -> bool:
@@ -38,8 +51,7 @@ class User:
             bool: True if email is valid, False otherwise
         """
         # Simple pattern: at least one character before and after '@', and a dot in the domain
-        pattern = r'^[^@\s]+@[^@\s]+\.[^@\s]+$'
-        return bool(re.match(pattern, email))
+        return validation.validate_email(email)
     
     @staticmethod
     def validate_password(password: str) -> bool:
@@ -58,8 +70,7 @@ class User:
         Returns:
             bool: True if password is valid, False otherwise
         """
-        pattern = r'^(?=.*[0-9])(?=.*[a-z])(?=.*[A-Z])(?=.*[@#$%^&+=])(?=\S+$).{8,}$'
-        return bool(re.match(pattern, password))
+        return validation.validate_password(password)
     
     def to_dict(self) -> Dict[str, str]:
         """
@@ -72,7 +83,8 @@ class User:
             'user_id': self.user_id,
             'name': self.name,
             'email': self.email,
-            'password': self.password
+            'password': self.password,
+            'version': self.version
         }
     
     @classmethod
@@ -90,5 +102,160 @@ class User:
             name=data['name'],
             email=data['email'],
             password=data['password'],
-            user_id=data.get('user_id')
-        ) 
\ No newline at end of file
+            user_id=data.get('user_id'),
+            version=int(data.get('version') or 1)
+        ) 
+    
+    @classmethod
+    def list_from_json(cls, text: str) -> List['User']:
+        """
+        Decode a JSON array of user records straight into User instances.
+        
+        Each record is turned into a User as soon as it is decoded, so the
+        intermediate dictionaries are freed right away instead of being kept
+        as a full list of dicts.
+        
+        Args:
+            text (str): JSON array of user records
+            
+        Returns:
+            List[User]: New User instances
+        """
+        return json.loads(text, object_hook=cls.from_dict)
+
+
+class UserTable:
+    """
+    Columnar (struct-of-arrays) container for holding many users.
+    
+    Each field is stored in its own list, so a table of N users costs one
+    list of N references per field instead of N User objects. Users are
+    materialized only when accessed. A table can be saved as a binary
+    (marshal) snapshot, which loads several times faster than the JSON file.
+    
+    Attributes:
+        user_ids (List[str]): User identifiers
+        names (List[str]): User names
+        emails (List[str]): User email addresses
+        passwords (List[str]): User passwords
+        versions (List[int]): Record versions
+    """
+    
+    __slots__ = ('user_ids', 'names', 'emails', 'passwords', 'versions')
+    
+    def __init__(self, users: Iterable[User] = ()):
+        """
+        Initialize a UserTable.
+        
+        Args:
+            users (Iterable[User]): Users to add to the table
+        """
+        self.user_ids: List[str] = []
+        self.names: List[str] = []
+        self.emails: List[str] = []
+        self.passwords: List[str] = []
+        self.versions: List[int] = []
+        for user in users:
+            self.append(user)
+    
+    def append(self, user: User) -> None:
+        """
+        Add a user to the table.
+        
+        Args:
+            user (User): User to add
+        """
+        self.user_ids.append(user.user_id)
+        self.names.append(user.name)
+        self.emails.append(user.email)
+        self.passwords.append(user.password)
+        self.versions.append(user.version)
+    
+    def append_dict(self, data: Dict[str, str]) -> None:
+        """
+        Add a user record to the table without creating a User.
+        
+        Args:
+            data (Dict[str, str]): Dictionary containing user data
+        """
+        self.user_ids.append(data.get('user_id') or str(uuid.uuid4()))
+        self.names.append(data['name'])
+        self.emails.append(data['email'])
+        self.passwords.append(data['password'])
+        self.versions.append(int(data.get('version') or 1))
+    
+    def __len__(self) -> int:
+        return len(self.user_ids)
+    
+    def __getitem__(self, index: int) -> User:
+        return User(self.names[index], self.emails[index], self.passwords[index], self.user_ids[index],
+                    self.versions[index])
+    
+    def __iter__(self) -> Iterator[User]:
+        for user_id, name, email, password, version in zip(self.user_ids, self.names, self.emails,
+                                                            self.passwords, self.versions):
+            yield User(name, email, password, user_id, version)
+    
+    def to_users(self) -> List[User]:
+        """
+        Materialize every row at once (faster than iterating).
+        
+        Returns:
+            List[User]: One User per row, in table order
+        """
+        return list(map(User, self.names, self.emails, self.passwords, self.user_ids, self.versions))
+    
+    @classmethod
+    def from_json(cls, text: str) -> 'UserTable':
+        """
+        Decode a JSON array of user records straight into the columns.
+        
+        Args:
+            text (str): JSON array of user records
+            
+        Returns:
+            UserTable: Table with one row per record
+        """
+        table = cls()
+        json.loads(text, object_hook=table.append_dict)
+        return table
+    
+    def save(self, path: str, stamp: object) -> None:
+        """
+        Write the table to a binary snapshot file.
+        
+        Args:
+            path (str): Snapshot file path
+            stamp (object): Identity of the data the table was read from (marshal-able)
+        """
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            # The header is a separate record so a stale snapshot is rejected without reading the columns
+            marshal.dump((SNAPSHOT_FORMAT_VERSION, stamp), f)
+            marshal.dump((self.user_ids, self.names, self.emails, self.passwords, self.versions), f)
+        os.replace(tmp_path, path)
+    
+    @classmethod
+    def load(cls, path: str, stamp: object) -> Optional['UserTable']:
+        """
+        Load a snapshot file if it was written from the same data.
+        
+        Args:
+            path (str): Snapshot file path
+            stamp (object): Identity of the current data
+            
+        Returns:
+            Optional[UserTable]: The table, or None if missing, unreadable or stale
+        """
+        try:
+            with open(path, 'rb') as f:
+                if marshal.load(f) != (SNAPSHOT_FORMAT_VERSION, stamp):
+                    return None
+                columns = marshal.loads(f.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if not isinstance(columns, tuple) or len(columns) != 5 or len(set(map(len, columns))) != 1:
+            return None
+        table = cls()
+        table.user_ids, table.names, table.emails, table.passwords, table.versions = columns
+        return table
@@ -0,0 +1,261 @@
+import heapq
+import marshal
+import os
+from array import array
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+FORMAT_VERSION = 1
+
+def trigrams(text: str) -> Set[str]:
+    """
+    Get the distinct three-character substrings of a (lowercased) text.
+    Args:
+        text (str): Text to split
+    Returns:
+        Set[str]: Trigrams of the text (empty if shorter than 3 characters)
+    """
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class NameIndex:
+    """
+    Case-insensitive substring index over user names.
+
+    Names are indexed by trigram (inverted index from trigram to users) and
+    kept in a sorted list for prefix lookups. Searches return prefix matches
+    first, in name order, then the other substring matches in insertion order,
+    so a limited search stops as soon as it has enough prefix matches.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, str]] = ()):
+        """
+        Initialize the NameIndex.
+
+        Args:
+            entries (Iterable[Tuple[str, str]]): (user_id, name) pairs to index
+        """
+        self._next_seq = 0
+        self._seq_of: Dict[str, int] = {}
+        self._entries: Dict[int, Tuple[str, str]] = {}
+        # Postings loaded from disk stay packed (array bytes) until first used
+        self._grams: Dict[str, Union[Set[int], bytes]] = {}
+        self._sorted: List[Tuple[str, int]] = []
+        for user_id, name in entries:
+            self._insert(user_id, name.lower(), sort=False)
+        self._sorted.sort()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _insert(self, user_id: str, name: str, sort: bool = True) -> None:
+        """
+        Add a lowercased name for a user that is not indexed yet.
+        """
+        seq = self._next_seq
+        self._next_seq += 1
+        self._seq_of[user_id] = seq
+        self._entries[seq] = (user_id, name)
+        for gram in trigrams(name):
+            self._postings(gram, create=True).add(seq)
+        if sort:
+            insort(self._sorted, (name, seq))
+        else:
+            self._sorted.append((name, seq))
+
+    def add(self, user_id: str, name: str) -> None:
+        """
+        Index a user's name, replacing the previous name if the user is already indexed.
+
+        Args:
+            user_id (str): User identifier
+            name (str): User name
+        """
+        if user_id in self._seq_of:
+            self.remove(user_id)
+        self._insert(user_id, name.lower())
+
+    def remove(self, user_id: str) -> None:
+        """
+        Remove a user from the index. Unknown users are ignored.
+
+        Args:
+            user_id (str): User identifier
+        """
+        seq = self._seq_of.pop(user_id, None)
+        if seq is None:
+            return
+        _, name = self._entries.pop(seq)
+        for gram in trigrams(name):
+            postings = self._postings(gram)
+            postings.discard(seq)
+            if not postings:
+                del self._grams[gram]
+        position = bisect_left(self._sorted, (name, seq))
+        del self._sorted[position]
+
+    def _postings(self, gram: str, create: bool = False) -> Set[int]:
+        """
+        Get the set of users containing a trigram, unpacking it if it was loaded from disk.
+        """
+        postings = self._grams.get(gram)
+        if postings is None:
+            postings = set()
+            if create:
+                self._grams[gram] = postings
+        elif isinstance(postings, bytes):
+            postings = set(array('q', postings))
+            self._grams[gram] = postings
+        return postings
+
+    def _prefix_matches(self, query: str, limit: Optional[int]) -> List[int]:
+        """
+        Get up to limit users whose name starts with query, in name order.
+        """
+        matches = []
+        position = bisect_left(self._sorted, (query,))
+        while position < len(self._sorted) and self._sorted[position][0].startswith(query):
+            if limit is not None and len(matches) >= limit:
+                break
+            matches.append(self._sorted[position][1])
+            position += 1
+        return matches
+
+    def _other_matches(self, query: str, exclude: Set[int], limit: Optional[int]) -> List[int]:
+        """
+        Get up to limit users whose name contains query, not in exclude, in insertion order.
+
+        Queries of three or more characters only check the intersection of their
+        trigram postings; shorter ones scan the names in insertion order and stop
+        as soon as the limit is reached.
+        """
+        grams = trigrams(query)
+        if grams:
+            postings = sorted((self._postings(gram) for gram in grams), key=len)
+            candidates = set.intersection(*postings) if postings[0] else set()
+            matches = [seq for seq in candidates if seq not in exclude and query in self._entries[seq][1]]
+            return sorted(matches) if limit is None else heapq.nsmallest(limit, matches)
+        matches = []
+        for seq, (_, name) in self._entries.items():
+            if limit is not None and len(matches) >= limit:
+                break
+            if query in name and seq not in exclude:
+                matches.append(seq)
+        return matches
+
+    def _prefix_range(self, prefix: str) -> Tuple[int, int]:
+        """
+        Get the positions in the sorted list of the names starting with a lowercased prefix.
+        """
+        return bisect_left(self._sorted, (prefix,)), bisect_left(self._sorted, (prefix + '\U0010ffff',))
+
+    def prefix_count(self, prefix: str) -> int:
+        """
+        Count the users whose name starts with prefix (case-insensitive), in O(log n).
+        """
+        start, stop = self._prefix_range(prefix.lower())
+        return stop - start
+
+    def prefix(self, prefix: str, reverse: bool = False) -> List[str]:
+        """
+        Get the users whose name starts with prefix (case-insensitive).
+
+        Args:
+            prefix (str): Start of the name
+            reverse (bool): Whether to return them in descending name order
+
+        Returns:
+            List[str]: Matching user_ids in name order
+        """
+        start, stop = self._prefix_range(prefix.lower())
+        seqs = [seq for _, seq in self._sorted[start:stop]]
+        if reverse:
+            seqs.reverse()
+        return [self._entries[seq][0] for seq in seqs]
+
+    def contains_estimate(self, text: str) -> Optional[int]:
+        """
+        Estimate the number of users whose name contains text, from its rarest trigram.
+
+        Returns:
+            Optional[int]: An upper bound of the matches, or None if text is shorter than a trigram
+        """
+        grams = trigrams(text.lower())
+        return min(len(self._postings(gram)) for gram in grams) if grams else None
+
+    def contains(self, text: str) -> List[str]:
+        """
+        Get the users whose name contains text (case-insensitive), in insertion order.
+        """
+        return [self._entries[seq][0] for seq in self._other_matches(text.lower(), set(), None)]
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[str]:
+        """
+        Find users whose name contains query (case-insensitive).
+
+        Args:
+            query (str): Text to search for
+            limit (Optional[int]): Maximum number of results (all if None)
+
+        Returns:
+            List[str]: Matching user_ids; names starting with query come first
+                (alphabetically), then the other matches in insertion order
+        """
+        query = query.lower()
+        prefix = self._prefix_matches(query, limit)
+        if limit is not None and len(prefix) >= limit:
+            others = []
+        else:
+            remaining = None if limit is None else limit - len(prefix)
+            others = self._other_matches(query, set(prefix), remaining)
+        return [self._entries[seq][0] for seq in prefix + others]
+
+    def save(self, path: str, stamp: object) -> None:
+        """
+        Persist the index next to the data file.
+
+        Args:
+            path (str): Index file path
+            stamp (object): Identity of the data the index was built from (marshal-able)
+        """
+        data = {
+            'version': FORMAT_VERSION,
+            'stamp': stamp,
+            'next_seq': self._next_seq,
+            'entries': self._entries,
+            'grams': {
+                gram: postings if isinstance(postings, bytes) else array('q', postings).tobytes()
+                for gram, postings in self._grams.items()
+            },
+            'sorted': self._sorted,
+        }
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(marshal.dumps(data))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, stamp: object) -> Optional['NameIndex']:
+        """
+        Load a persisted index if it was built from the same data.
+
+        Args:
+            path (str): Index file path
+            stamp (object): Identity of the current data
+
+        Returns:
+            Optional[NameIndex]: The index, or None if missing, unreadable or stale
+        """
+        try:
+            with open(path, 'rb') as f:
+                data = marshal.loads(f.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if not isinstance(data, dict) or data.get('version') != FORMAT_VERSION or data.get('stamp') != stamp:
+            return None
+        index = cls()
+        index._next_seq = data['next_seq']
+        index._entries = data['entries']
+        index._seq_of = {user_id: seq for seq, (user_id, _) in index._entries.items()}
+        index._grams = data['grams']
+        index._sorted = data['sorted']
+        return index
@@ -0,0 +1,298 @@
+import base64
+import hashlib
+import hmac
+import os
+import re
+import sys
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Tuple
+from .models import User
+from .repository import UserRepository, VersionConflictError, batched, create_repository
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+# Encoded hashes look like "scrypt$14$<salt>$<hash>" or "pbkdf2_sha256$600000$<salt>$<hash>":
+# algorithm, cost, then the base64 salt and derived key, so every record
+# carries everything needed to verify it even after the defaults change.
+ALGORITHMS = ('scrypt', 'pbkdf2_sha256')
+DEFAULT_COSTS = {'scrypt': 14, 'pbkdf2_sha256': 600_000}
+# Accepted costs: a stored hash outside them would make each login allocate
+# gigabytes (scrypt) or spin for minutes (PBKDF2), so it is never run
+COST_RANGES = {'scrypt': (1, 18), 'pbkdf2_sha256': (1, 2_000_000)}
+SALT_BYTES = 16
+KEY_BYTES = 32
+SCRYPT_BLOCK_SIZE = 8
+SCRYPT_PARALLELISM = 1
+# Below this many passwords a process pool costs more than it saves
+MIN_PARALLEL_BATCH = 8
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode('ascii').rstrip('=')
+
+def _b64decode(text: str) -> bytes:
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+_COST = re.compile(r'[0-9]{1,10}')
+_SALT = re.compile(r'[A-Za-z0-9+/]{%d}' % len(_b64encode(bytes(SALT_BYTES))))
+_KEY = re.compile(r'[A-Za-z0-9+/]{%d}' % len(_b64encode(bytes(KEY_BYTES))))
+
+def _looks_hashed(value: str) -> bool:
+    """
+    Check whether a stored password has the shape of an encoded hash ("<algorithm>$...$...$..."), valid or not.
+    """
+    parts = value.split('$')
+    return len(parts) == 4 and parts[0] in ALGORITHMS
+
+def _parse_hash(value: str) -> Optional[Tuple[str, int, bytes, bytes]]:
+    """
+    Split an encoded hash into its algorithm, cost, salt and key.
+    Returns:
+        Optional[Tuple[str, int, bytes, bytes]]: The parts, or None unless the algorithm is supported,
+            the cost is in its COST_RANGES and the salt and key are base64 of the expected lengths
+    """
+    if not _looks_hashed(value):
+        return None
+    algorithm, cost, salt, key = value.split('$')
+    if not (_COST.fullmatch(cost) and _SALT.fullmatch(salt) and _KEY.fullmatch(key)):
+        return None
+    low, high = COST_RANGES[algorithm]
+    if not low <= int(cost) <= high:
+        return None
+    return algorithm, int(cost), _b64decode(salt), _b64decode(key)
+
+def _derive(algorithm: str, cost: int, password: str, salt: bytes) -> bytes:
+    """
+    Run the key derivation function.
+    """
+    if algorithm == 'scrypt':
+        n = 1 << cost
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=SCRYPT_BLOCK_SIZE, p=SCRYPT_PARALLELISM,
+                              maxmem=256 * n * SCRYPT_BLOCK_SIZE, dklen=KEY_BYTES)
+    return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, cost, dklen=KEY_BYTES)
+
+def is_hashed(value: str) -> bool:
+    """
+    Check whether a stored password is an encoded hash rather than plain text.
+    Only well-formed hashes count: a supported algorithm, a cost in its
+    COST_RANGES, and a base64 salt and key of the lengths PasswordHasher makes.
+    Args:
+        value (str): Stored password
+    Returns:
+        bool: True if value was produced by PasswordHasher.hash
+    """
+    return _parse_hash(value) is not None
+
+class PasswordHasher:
+    """
+    Salted password hashing with scrypt or PBKDF2-SHA256 (hashlib).
+
+    The cost is the scrypt work factor as a power of two (N = 2**cost) or the
+    PBKDF2 iteration count. It is stored in each hash, so raising it only
+    affects new hashes; needs_rehash() tells when an old hash should be
+    replaced, typically right after a successful login.
+    """
+
+    def __init__(self, algorithm: str = 'scrypt', cost: Optional[int] = None):
+        """
+        Initialize the PasswordHasher.
+
+        Args:
+            algorithm (str): "scrypt" or "pbkdf2_sha256"
+            cost (Optional[int]): Work factor (algorithm default if None)
+
+        Raises:
+            ValueError: If the algorithm is not supported or the cost is outside its COST_RANGES
+        """
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unsupported password hash algorithm: {algorithm}")
+        cost = cost or DEFAULT_COSTS[algorithm]
+        low, high = COST_RANGES[algorithm]
+        if not low <= cost <= high:
+            raise ValueError(f"{algorithm} cost must be between {low} and {high}")
+        self.algorithm = algorithm
+        self.cost = cost
+
+    def hash(self, password: str) -> str:
+        """
+        Hash a password with a new random salt.
+
+        Args:
+            password (str): Plain text password
+
+        Returns:
+            str: Encoded hash (algorithm, cost, salt and key)
+        """
+        salt = os.urandom(SALT_BYTES)
+        key = _derive(self.algorithm, self.cost, password, salt)
+        return f"{self.algorithm}${self.cost}${_b64encode(salt)}${_b64encode(key)}"
+
+    def verify(self, password: str, stored: str) -> bool:
+        """
+        Check a password against a stored value.
+        Records that were never migrated still hold the plain text password,
+        which is compared as is (needs_rehash() is True for them). A value
+        shaped like a hash but malformed, or with a cost outside COST_RANGES,
+        matches no password and its key derivation is never run.
+
+        Args:
+            password (str): Plain text password to check
+            stored (str): Encoded hash or legacy plain text password
+
+        Returns:
+            bool: True if the password matches
+        """
+        parsed = _parse_hash(stored)
+        if parsed is None:
+            if _looks_hashed(stored):
+                return False
+            return hmac.compare_digest(password.encode(), stored.encode())
+        algorithm, cost, salt, expected = parsed
+        try:
+            actual = _derive(algorithm, cost, password, salt)
+        except (ValueError, OverflowError, MemoryError):
+            return False
+        return hmac.compare_digest(actual, expected)
+
+    def needs_rehash(self, stored: str) -> bool:
+        """
+        Check whether a stored value should be replaced by a new hash.
+
+        Args:
+            stored (str): Encoded hash or legacy plain text password
+
+        Returns:
+            bool: True if it is plain text or uses another algorithm or cost
+        """
+        parsed = _parse_hash(stored)
+        if parsed is None:
+            return True
+        return parsed[0] != self.algorithm or parsed[1] != self.cost
+
+    def _hash_all(self, pool: Optional['Executor'], passwords: List[str], workers: int) -> List[str]:
+        """
+        Hash passwords with the pool, or in this process when there is none or too few passwords.
+        """
+        if pool is None or len(passwords) < MIN_PARALLEL_BATCH:
+            return [self.hash(password) for password in passwords]
+        return list(pool.map(self.hash, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+    def hash_many(self, passwords: Iterable[str], workers: Optional[int] = None) -> List[str]:
+        """
+        Hash many passwords in parallel, one process per core.
+
+        Args:
+            passwords (Iterable[str]): Plain text passwords
+            workers (Optional[int]): Number of worker processes (CPU count if None)
+
+        Returns:
+            List[str]: Encoded hashes, in input order
+        """
+        passwords = list(passwords)
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(passwords) < MIN_PARALLEL_BATCH:
+            return self._hash_all(None, passwords, workers)
+        from concurrent.futures import ProcessPoolExecutor  # pulls in multiprocessing: only when used
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return self._hash_all(pool, passwords, workers)
+
+    def hash_users(self, users: Iterable[User], batch_size: int = 1000,
+                   workers: Optional[int] = None) -> Iterator[User]:
+        """
+        Stream users with their plain text passwords replaced by hashes.
+        Users are hashed a batch at a time on a process pool kept for the whole
+        stream; passwords that are already hashed are left as they are.
+
+        Args:
+            users (Iterable[User]): Users to hash, consumed lazily
+            batch_size (int): Number of users hashed together
+            workers (Optional[int]): Number of worker processes (CPU count if None)
+
+        Returns:
+            Iterator[User]: New User objects with hashed passwords, in input order
+        """
+        workers = workers or os.cpu_count() or 1
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        with pool or nullcontext():
+            for batch in batched(users, batch_size):
+                plain = [user.password for user in batch if not is_hashed(user.password)]
+                hashes = iter(self._hash_all(pool, plain, workers))
+                for user in batch:
+                    if is_hashed(user.password):
+                        yield user
+                    else:
+                        yield User(user.name, user.email, next(hashes), user.user_id, user.version)
+
+def hasher_from_config() -> PasswordHasher:
+    """
+    Build the PasswordHasher configured with PASSWORD_HASH_ALGORITHM and PASSWORD_HASH_COST.
+    Returns:
+        PasswordHasher: Configured hasher
+    """
+    from decouple import config
+    return PasswordHasher(
+        config('PASSWORD_HASH_ALGORITHM', default='scrypt'),
+        config('PASSWORD_HASH_COST', default=0, cast=int) or None
+    )
+
+def migrate_passwords(repository: UserRepository, hasher: PasswordHasher, workers: Optional[int] = None,
+                      batch_size: int = 1000) -> int:
+    """
+    Replace the plain text passwords stored in a repository by hashes.
+    Passwords are hashed a batch at a time without holding the repository's
+    lock, and each batch is committed with the versions that were read, so
+    writers are only held up by the commits. A user changed by another writer
+    in the meantime is skipped (the next migration picks it up if needed).
+    Args:
+        repository (UserRepository): Repository to migrate
+        hasher (PasswordHasher): Hasher to use
+        workers (Optional[int]): Number of worker processes (CPU count if None)
+        batch_size (int): Number of users hashed and committed together
+    Returns:
+        int: Number of passwords hashed and stored
+    """
+    plain = [user for user in repository.get_all_users() if not is_hashed(user.password)]
+    migrated = 0
+    for batch in batched(zip(plain, hasher.hash_users(plain, batch_size, workers)), batch_size):
+        updates = [{'user_id': after.user_id, 'version': before.version, 'password': after.password}
+                   for before, after in batch]
+        try:
+            results = repository.update_many(updates)
+        except VersionConflictError:
+            # Some users changed since they were read: commit the others one by one
+            results = []
+            for update in updates:
+                try:
+                    results.append(repository.update_many([update])[0])
+                except VersionConflictError:
+                    pass
+        migrated += sum(1 for user in results if user is not None)
+    return migrated
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the password migration command line.
+    Args:
+        argv (Optional[List[str]]): Command line arguments (defaults to sys.argv)
+    Returns:
+        int: Process exit code
+    """
+    import argparse
+    parser = argparse.ArgumentParser(prog="python -m src.passwords",
+                                     description="Hash the plain text passwords of the stored users.")
+    parser.add_argument('command', choices=['migrate'])
+    parser.add_argument('--workers', type=int, help="Worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    from decouple import config
+    repository = create_repository(
+        config('DATA_FILE_PATH', default='data/users.json'),
+        config('STORAGE_BACKEND', default='')
+    )
+    migrated = migrate_passwords(repository, hasher_from_config(), args.workers)
+    print(f"Hashed {migrated} passwords", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+import heapq
+from itertools import islice
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from .models import User
+
+# Fields a query can be ordered by; prefix one with "-" for descending order
+ORDER_FIELDS = ('name', 'email', 'user_id', 'version')
+
+def email_domain(email: str) -> str:
+    """
+    Get the domain of an email address, lowercased.
+    Args:
+        email (str): Email address
+    Returns:
+        str: The part after the last "@"
+    """
+    return email.rpartition('@')[2].lower()
+
+def _name_key(user: User) -> str:
+    return user.name.lower()
+
+class UserQuery:
+    """
+    Criteria of a repository query.
+
+    The conditions are combined with AND; the ones left as None are not
+    checked. Name conditions are case-insensitive and so is the email domain;
+    email and user_id must match exactly. With order_by the users come in
+    the order of that field (names sort case-insensitively), and users that
+    compare equal on it in no particular order; without it they come in the
+    order of the index the query was planned on (storage order for a scan).
+    """
+
+    def __init__(self, name_prefix: Optional[str] = None, name_contains: Optional[str] = None,
+                 email_domain: Optional[str] = None, email: Optional[str] = None,
+                 user_id: Optional[str] = None, order_by: Optional[str] = None, limit: Optional[int] = None):
+        """
+        Initialize the UserQuery.
+
+        Args:
+            name_prefix (Optional[str]): Text the name starts with
+            name_contains (Optional[str]): Text the name contains
+            email_domain (Optional[str]): Domain of the email (the part after "@")
+            email (Optional[str]): Exact email
+            user_id (Optional[str]): Exact UserID
+            order_by (Optional[str]): One of ORDER_FIELDS, "-" prefixed for descending order
+            limit (Optional[int]): Maximum number of users to return (all if None)
+
+        Raises:
+            ValueError: If order_by is not a known field or limit is negative
+        """
+        field = order_by[1:] if order_by and order_by.startswith('-') else order_by
+        if field is not None and field not in ORDER_FIELDS:
+            raise ValueError(f"order_by must be one of {', '.join(ORDER_FIELDS)}, optionally prefixed with '-'")
+        if limit is not None and limit < 0:
+            raise ValueError("limit must not be negative")
+        self.name_prefix = None if name_prefix is None else name_prefix.lower()
+        self.name_contains = None if name_contains is None else name_contains.lower()
+        self.email_domain = None if email_domain is None else email_domain.lower()
+        self.email = email
+        self.user_id = user_id
+        self.order_by = order_by
+        self.order_field = field
+        self.descending = field is not None and field != order_by
+        self.limit = limit
+
+    def criteria(self) -> Dict[str, Any]:
+        """
+        Get the keyword arguments that build this query again.
+        """
+        names = ('name_prefix', 'name_contains', 'email_domain', 'email', 'user_id', 'order_by', 'limit')
+        return {name: getattr(self, name) for name in names}
+
+    def conditions(self) -> List[str]:
+        """
+        Describe the conditions of the query, e.g. "email_domain = 'example.com'".
+        """
+        conditions = []
+        for name in ('user_id', 'email', 'email_domain', 'name_prefix', 'name_contains'):
+            value = getattr(self, name)
+            if value is not None:
+                conditions.append(f"{name} = {value!r}")
+        return conditions
+
+    def matches(self, user: User) -> bool:
+        """
+        Check a user against all the conditions.
+        """
+        if self.user_id is not None and user.user_id != self.user_id:
+            return False
+        if self.email is not None and user.email != self.email:
+            return False
+        if self.email_domain is not None and email_domain(user.email) != self.email_domain:
+            return False
+        if self.name_prefix is not None or self.name_contains is not None:
+            name = user.name.lower()
+            if self.name_prefix is not None and not name.startswith(self.name_prefix):
+                return False
+            if self.name_contains is not None and self.name_contains not in name:
+                return False
+        return True
+
+    def sort_key(self) -> Callable[[User], Any]:
+        """
+        Get the key users are ordered by (the query must have an order_by).
+        """
+        return _name_key if self.order_field == 'name' else attrgetter(self.order_field)
+
+class QueryPlan:
+    """
+    How a repository runs a query, for diagnosing slow queries.
+
+    Attributes:
+        index (Optional[str]): Index the candidates come from ("user_id", "email",
+            "email_domain" or "name"), or None for a full scan
+        candidates (Optional[int]): Number of users read from the index or the scan (None if not known in advance)
+        filters (List[str]): Conditions checked on each candidate
+        order (str): "storage" (no order_by), "index" (the candidates already come in order),
+            "top-k heap" (bounded heap of limit users), "sort", or "merge" (of ordered shard results)
+        detail (str): Backend-specific detail, such as SQLite's EXPLAIN QUERY PLAN
+        parts (List[QueryPlan]): Plans of the shards of a sharded repository
+    """
+
+    def __init__(self, index: Optional[str], candidates: Optional[int], filters: List[str], order: str,
+                 detail: str = '', parts: Optional[List['QueryPlan']] = None):
+        self.index = index
+        self.candidates = candidates
+        self.filters = filters
+        self.order = order
+        self.detail = detail
+        self.parts = parts or []
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {'index': self.index, 'candidates': self.candidates, 'filters': self.filters, 'order': self.order}
+        if self.detail:
+            data['detail'] = self.detail
+        if self.parts:
+            data['parts'] = [part.to_dict() for part in self.parts]
+        return data
+
+    def __str__(self) -> str:
+        text = f"index {self.index}" if self.index else "full scan"
+        if self.candidates is not None:
+            text += f" ({self.candidates} candidate{'' if self.candidates == 1 else 's'})"
+        if self.filters:
+            text += f", filter {' AND '.join(self.filters)}"
+        text += f", order: {self.order}"
+        if self.detail:
+            text += f" [{self.detail}]"
+        return text
+
+    def __repr__(self) -> str:
+        return f"QueryPlan({self})"
+
+class QueryResult:
+    """
+    Iterator over the users matching a query, produced as they are consumed.
+    The plan is known before the first user is read, so it can be inspected
+    without running the query.
+    """
+
+    def __init__(self, plan: QueryPlan, users: Iterator[User]):
+        self.plan = plan
+        self._users = users
+
+    def __iter__(self) -> 'QueryResult':
+        return self
+
+    def __next__(self) -> User:
+        return next(self._users)
+
+def order_step(query: UserQuery, ordered: bool) -> str:
+    """
+    Describe how the results of a query get their order (see QueryPlan.order).
+    Args:
+        query (UserQuery): The query
+        ordered (bool): Whether the candidates already come in the requested order
+    Returns:
+        str: "storage", "index", "top-k heap" or "sort"
+    """
+    if query.order_field is None:
+        return 'storage'
+    if ordered:
+        return 'index'
+    return 'sort' if query.limit is None else 'top-k heap'
+
+def make_plan(query: UserQuery, index: Optional[str], served: Optional[str], candidates: Optional[int],
+              ordered: bool = False) -> QueryPlan:
+    """
+    Build the plan of a query answered from an index (or a full scan).
+    Args:
+        query (UserQuery): The query
+        index (Optional[str]): Index the candidates come from (None for a full scan)
+        served (Optional[str]): Condition the index answers exactly, which is not re-checked in the plan
+        candidates (Optional[int]): Number of candidates, if known
+        ordered (bool): Whether the candidates already come in the requested order
+    Returns:
+        QueryPlan: The plan
+    """
+    filters = [condition for condition in query.conditions()
+               if served is None or not condition.startswith(served + ' ')]
+    return QueryPlan(index, candidates, filters, order_step(query, ordered))
+
+def run_query(query: UserQuery, candidates: Iterable[User], ordered: bool = False) -> Iterator[User]:
+    """
+    Filter candidate users with every condition of a query, then order and limit them.
+    Users are filtered as they are read. Unordered results (or candidates
+    already in order) are streamed and stop at the limit; otherwise a heap
+    keeps the best limit users, and only a query without a limit sorts.
+    Args:
+        query (UserQuery): The query
+        candidates (Iterable[User]): Users to check (a superset of the matches)
+        ordered (bool): Whether the candidates already come in the requested order
+    Returns:
+        Iterator[User]: The matching users
+    """
+    matches = filter(query.matches, candidates) if query.conditions() else iter(candidates)
+    if query.order_field is None or ordered:
+        return islice(matches, query.limit)
+    key = query.sort_key()
+    if query.limit is None:
+        return _lazy(lambda: sorted(matches, key=key, reverse=query.descending))
+    select = heapq.nlargest if query.descending else heapq.nsmallest
+    return _lazy(lambda: select(query.limit, matches, key=key))
+
+def _lazy(produce: Callable[[], List[User]]) -> Iterator[User]:
+    """
+    Produce a list of users only when the first one is requested.
+    """
+    yield from produce()
@@ -0,0 +1,233 @@
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple, Union
+from . import metrics
+from .cache import LRUCache
+from .models import User
+from .repository import UserRepository
+
+_MISSING = object()
+# Rough per-entry cost of the cache's bookkeeping (LRU node, key tuple, index sets)
+_ENTRY_OVERHEAD = 300
+
+def _user_bytes(user: User) -> int:
+    return sys.getsizeof(user) + sum(map(sys.getsizeof, (user.user_id, user.name, user.email, user.password)))
+
+def _name_bucket(text: str) -> str:
+    """
+    Get the n-gram a cached name search is filed under: its first three characters (or all of it if shorter).
+    """
+    return text[:3]
+
+def _name_grams(name: str) -> Set[str]:
+    """
+    Get every substring of up to three characters of a lowercased name (and ""),
+    i.e. the buckets of all the name searches the name matches.
+    """
+    grams = {''}
+    for size in (1, 2, 3):
+        grams.update(name[i:i + size] for i in range(len(name) - size + 1))
+    return grams
+
+class ReadThroughCache:
+    """
+    Read-through cache of get_by_email, get_by_id and find_by_name results in front of a repository.
+
+    Lookups are answered from an LRUCache bounded by a number of entries and
+    by an estimate of their memory, each entry expiring after ttl seconds
+    (negative_ttl for "not found" results). Misses read the repository and
+    keep its answer. Every other attribute is the wrapped repository's (and
+    setting one sets it on the repository), so the cache can stand in for it.
+
+    The cache listens to the repository's commits and drops only the entries
+    a change can affect: the cached results holding the changed user (by
+    UserID), the lookups of its new email and UserID, and the name searches
+    whose text is part of its new name, found through the n-gram each search
+    is filed under. Writes made by other processes are not seen by the cache,
+    so there the entries can be up to ttl seconds stale.
+
+    Attributes:
+        invalidations (int): Entries dropped because of a change
+    """
+
+    def __init__(self, repository: UserRepository, maxsize: int = 10000, max_bytes: Optional[int] = 64 * 2 ** 20,
+                 ttl: Optional[float] = 60.0, negative_ttl: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the ReadThroughCache.
+
+        Args:
+            repository (UserRepository): Repository to read through
+            maxsize (int): Maximum number of cached results
+            max_bytes (Optional[int]): Approximate memory limit of the cached results (unbounded if None);
+                a single result larger than an eighth of it is not cached
+            ttl (Optional[float]): Seconds a result stays valid (forever if None)
+            negative_ttl (Optional[float]): Seconds a "not found" result stays valid (ttl if None)
+            clock (Callable[[], float]): Time source, in seconds
+        """
+        self.repository = repository
+        self.negative_ttl = negative_ttl
+        self._max_entry_bytes = None if max_bytes is None else max_bytes // 8
+        self._cache = LRUCache(maxsize, ttl, clock, max_bytes, on_discard=self._forget)
+        # Held to update the indexes below; entries are only added when no change came in during the read
+        self._lock = threading.RLock()
+        self._generation = 0
+        self._by_user: Dict[str, Set[Hashable]] = {}
+        self._by_gram: Dict[str, Set[Hashable]] = {}
+        self.invalidations = 0
+        repository.change_listeners.append(self.invalidate)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.repository, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        # Public attributes of the repository, such as change_feed, are set on it
+        if (not name.startswith('_') and 'repository' in self.__dict__ and name not in self.__dict__
+                and hasattr(self.repository, name)):
+            setattr(self.repository, name, value)
+        else:
+            super().__setattr__(name, value)
+
+    def get_by_email(self, email: str) -> Optional[User]:
+        """
+        Get a user by email, from the cache if possible (see UserRepository.get_by_email).
+        """
+        return self._read(('email', email), lambda: self.repository.get_by_email(email))
+
+    def get_by_id(self, user_id: str) -> Optional[User]:
+        """
+        Get a user by UserID, from the cache if possible (see UserRepository.get_by_id).
+        """
+        return self._read(('id', user_id), lambda: self.repository.get_by_id(user_id))
+
+    def find_by_name(self, name: str, limit: Optional[int] = None) -> List[User]:
+        """
+        Find users by name, from the cache if possible (see UserRepository.find_by_name).
+        The list is a copy, so callers can change it.
+        """
+        return list(self._read(('name', name, limit), lambda: self.repository.find_by_name(name, limit)))
+
+    def _read(self, key: Tuple, load: Callable[[], Any]) -> Any:
+        """
+        Look up a result, loading and caching it on a miss.
+        """
+        value = self._cache.get(key, _MISSING)
+        if metrics.REGISTRY.enabled:
+            metrics.inc('read_cache_lookups_total', kind=key[0], result='miss' if value is _MISSING else 'hit')
+        if value is not _MISSING:
+            return value
+        generation = self._generation
+        value = load()
+        users = [] if value is None else value if isinstance(value, list) else [value]
+        nbytes = _ENTRY_OVERHEAD + sum(map(_user_bytes, users))
+        if self._max_entry_bytes is not None and nbytes > self._max_entry_bytes:
+            return value
+        with self._lock:
+            # A change committed while loading may have made the value stale
+            if generation == self._generation:
+                self._cache.put(key, value, None if users else self.negative_ttl, nbytes)
+                for user in users:
+                    self._by_user.setdefault(user.user_id, set()).add(key)
+                if key[0] == 'name':
+                    self._by_gram.setdefault(_name_bucket(key[1].lower()), set()).add(key)
+        return value
+
+    def _forget(self, key: Hashable, value: Any) -> None:
+        """
+        Remove a dropped entry from the indexes.
+        """
+        with self._lock:
+            for user in [] if value is None else value if isinstance(value, list) else [value]:
+                keys = self._by_user.get(user.user_id)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._by_user[user.user_id]
+            if key[0] == 'name':
+                bucket = _name_bucket(key[1].lower())
+                keys = self._by_gram.get(bucket)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._by_gram[bucket]
+
+    def _drop(self, key: Hashable) -> None:
+        value = self._cache.pop(key, _MISSING)
+        if value is not _MISSING:
+            self.invalidations += 1
+            self._forget(key, value)
+
+    def invalidate(self, changes: List[Tuple[str, User]]) -> None:
+        """
+        Drop the entries affected by committed changes (the repository calls this after each commit).
+
+        Args:
+            changes (List[Tuple[str, User]]): ("add" | "update" | "delete", user) pairs
+        """
+        with self._lock:
+            self._generation += 1
+            for op, user in changes:
+                for key in list(self._by_user.get(user.user_id, ())):
+                    self._drop(key)
+                if op == 'delete':
+                    # A deleted user is only in the results that were found holding it
+                    continue
+                self._drop(('email', user.email))
+                self._drop(('id', user.user_id))
+                name = user.name.lower()
+                for gram in _name_grams(name) & self._by_gram.keys():
+                    for key in [key for key in self._by_gram[gram] if key[1].lower() in name]:
+                        self._drop(key)
+
+    def clear(self) -> None:
+        """
+        Drop every entry (counters are kept).
+        """
+        with self._lock:
+            self._generation += 1
+            self._cache.clear()
+            self._by_user.clear()
+            self._by_gram.clear()
+
+    def restore_users(self, users: List[User]) -> None:
+        """
+        Replace every user (see UserRepository.restore_users) and drop every entry.
+        """
+        try:
+            self.repository.restore_users(users)
+        finally:
+            self.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the cache counters.
+
+        Returns:
+            Dict[str, Any]: size, bytes (estimated), hits, misses, hit_ratio, evictions, expirations
+                and invalidations
+        """
+        stats = self._cache.stats()
+        stats['bytes'] = self._cache.nbytes
+        stats['invalidations'] = self.invalidations
+        return stats
+
+def read_cache_from_config(repository: UserRepository) -> Union[UserRepository, ReadThroughCache]:
+    """
+    Put a ReadThroughCache in front of a repository when READ_CACHE_SIZE is set.
+    READ_CACHE_SIZE is the maximum number of cached results (0, the default,
+    disables the cache), READ_CACHE_MEMORY_MB their approximate memory limit
+    (default 64), READ_CACHE_TTL the seconds a result stays valid (default 60)
+    and READ_CACHE_NEGATIVE_TTL the same for "not found" results (default 5).
+    Args:
+        repository (UserRepository): Repository to read through
+    Returns:
+        Union[UserRepository, ReadThroughCache]: The cache, or the repository itself when it is disabled
+    """
+    from decouple import config
+    size = config('READ_CACHE_SIZE', default=0, cast=int)
+    if size <= 0:
+        return repository
+    return ReadThroughCache(repository, size, config('READ_CACHE_MEMORY_MB', default=64, cast=int) * 2 ** 20,
+                            config('READ_CACHE_TTL', default=60.0, cast=float),
+                            config('READ_CACHE_NEGATIVE_TTL', default=5.0, cast=float))
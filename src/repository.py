@@ -1,13 +1,241 @@
+import functools
 import json
 import os
-from typing import List, Optional
-from .models import User
+from contextlib import contextmanager
+from json.encoder import encode_basestring_ascii
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, TextIO, Tuple
+from . import metrics
+from .locking import FileLock, RWLock, atomic_write
+from .changes import ChangeFeed
+from .models import User, UserTable
+from .name_index import NameIndex
+from .query import QueryResult, UserQuery, email_domain, make_plan, run_query
+
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+BINARY_EXTENSIONS = ('.bin',)
+# Fields that update_user/update_many may change
+UPDATABLE_FIELDS = ('name', 'email', 'password')
+
+class VersionConflictError(Exception):
+    """
+    Raised when an update expects a version other than the stored one
+    (the record was changed by another writer since it was read).
+    """
+
+class CorruptDataError(Exception):
+    """
+    Raised when the data file exists but cannot be decoded. Reading it as
+    empty would let the next write replace every user; restore it from a
+    backup instead (see src/backup.py).
+    """
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    """
+    Split an iterable into lists of at most size items without materializing it.
+    Args:
+        items (Iterable): Items to split
+        size (int): Maximum number of items per batch
+    Returns:
+        Iterator[list]: Batches of items
+    """
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def iter_json_array(stream: TextIO, chunk_size: int = 64 * 1024) -> Iterator[Any]:
+    """
+    Decode the items of a top-level JSON array one at a time.
+    Only one chunk of the file plus the item being decoded is held in memory.
+    Args:
+        stream (TextIO): Open file containing a JSON array
+        chunk_size (int): Number of characters read at a time
+    Returns:
+        Iterator[Any]: Decoded array items
+    Raises:
+        json.JSONDecodeError: If the content is not a JSON array
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+    
+    def next_char() -> str:
+        nonlocal buffer, pos, eof
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\n\r':
+                pos += 1
+            if pos < len(buffer) or eof:
+                return buffer[pos] if pos < len(buffer) else ''
+            chunk = stream.read(chunk_size)
+            buffer, pos, eof = chunk, 0, not chunk
+    
+    if next_char() != '[':
+        raise json.JSONDecodeError("Expecting '['", buffer, pos)
+    pos += 1
+    if next_char() == ']':
+        return
+    while True:
+        next_char()
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+            complete = end < len(buffer) or eof
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            complete = False
+        if not complete:
+            chunk = stream.read(chunk_size)
+            buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+            continue
+        yield item
+        pos = end
+        separator = next_char()
+        if separator == ']':
+            return
+        if separator != ',':
+            raise json.JSONDecodeError("Expecting ',' delimiter", buffer, pos)
+        pos += 1
+
+def _encode_value(value: Any) -> str:
+    """
+    Encode a scalar field value the same way json.dump does.
+    """
+    if isinstance(value, str):
+        return encode_basestring_ascii(value)
+    return json.dumps(value)
+
+def dump_users(users: Iterable[User], stream: TextIO) -> None:
+    """
+    Write users as a JSON array with the same layout as json.dump(..., indent=4).
+    
+    json.dump falls back to the pure-Python encoder when indent is set; the flat
+    user records are instead written with the C string encoder, one user at a time.
+    Args:
+        users (Iterable[User]): Users to write
+        stream (TextIO): Open output file
+    """
+    separator = '[\n'
+    for user in users:
+        fields = ',\n'.join(
+            f'        {encode_basestring_ascii(key)}: {_encode_value(value)}'
+            for key, value in user.to_dict().items()
+        )
+        stream.write(f'{separator}    {{\n{fields}\n    }}')
+        separator = ',\n'
+    stream.write('[]' if separator == '[\n' else '\n]')
+
+def updated_user(user: User, update: Dict[str, Any]) -> User:
+    """
+    Build the next version of a user from an update.
+    Args:
+        user (User): Current version of the user
+        update (Dict[str, Any]): New field values, plus the expected "version" (optional)
+            and the "user_id" (ignored here)
+    Returns:
+        User: New User with the changed fields and the version incremented
+    Raises:
+        ValueError: If the update contains a field that cannot be changed
+        VersionConflictError: If the expected version is not the user's version
+    """
+    unknown = set(update) - set(UPDATABLE_FIELDS) - {'user_id', 'version'}
+    if unknown:
+        raise ValueError(f"Fields cannot be updated: {', '.join(sorted(unknown))}")
+    expected = update.get('version')
+    if expected is not None and expected != user.version:
+        raise VersionConflictError(f"User {user.user_id} is at version {user.version}, not {expected}")
+    return User(update.get('name', user.name), update.get('email', user.email),
+                update.get('password', user.password), user.user_id, user.version + 1)
+
+def stage_updates(by_id: Dict[str, User], by_email: Dict[str, User],
+                  updates: Iterable[Dict[str, Any]]) -> Tuple[List[Optional[User]], Dict[str, User]]:
+    """
+    Check a batch of updates against the current users without changing them.
+    Updates are applied in order, so a later update of the same user sees the
+    earlier one. Any error is raised before the caller writes anything.
+    Args:
+        by_id (Dict[str, User]): Current users by UserID
+        by_email (Dict[str, User]): Current users by email
+        updates (Iterable[Dict[str, Any]]): Updates as accepted by update_many
+    Returns:
+        Tuple[List[Optional[User]], Dict[str, User]]: The updated user for each update (None if
+            the UserID is unknown), and the final version of every changed user by UserID
+    Raises:
+        ValueError: If a field cannot be updated or a new email belongs to another user
+        VersionConflictError: If an expected version is stale
+    """
+    changed: Dict[str, User] = {}
+    # Email -> UserID owning it after the updates staged so far (None once released)
+    claimed: Dict[str, Optional[str]] = {}
+    results = []
+    for update in updates:
+        user_id = update['user_id']
+        current = changed.get(user_id) or by_id.get(user_id)
+        if current is None:
+            results.append(None)
+            continue
+        user = updated_user(current, update)
+        if user.email != current.email:
+            owner = by_email[user.email].user_id if user.email in by_email else None
+            owner = claimed.get(user.email, owner)
+            if owner is not None and owner != user_id:
+                raise ValueError(f"Email already in use: {user.email}")
+            claimed[current.email] = None
+            claimed[user.email] = user_id
+        changed[user_id] = user
+        results.append(user)
+    return results, changed
+
+def update_changes(results: List[Optional[User]]) -> List[Tuple[str, User]]:
+    """
+    Turn the results of update_many into change feed entries (one per applied update).
+    Args:
+        results (List[Optional[User]]): Updated users, None for unknown UserIDs
+    Returns:
+        List[Tuple[str, User]]: ("update", user) pairs in commit order
+    """
+    return [('update', user) for user in results if user is not None]
+
+def read_operation(method: Callable) -> Callable:
+    """
+    Run a repository method under the in-process read lock.
+    The repository gets a chance to refresh its state before the lock is taken.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self._before_read()
+        with self._rwlock.read_locked():
+            return method(self, *args, **kwargs)
+    return metrics.timed(f"repository.{method.__name__}")(wrapper)
+
+def write_operation(method: Callable) -> Callable:
+    """
+    Run a repository method under the in-process write lock and the
+    cross-process file lock, so its read-modify-write cycle is not interleaved
+    with other writers.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._exclusive():
+            return method(self, *args, **kwargs)
+    return metrics.timed(f"repository.{method.__name__}")(wrapper)
 
 class UserRepository:
     """
     Repository class for handling user data persistence.
     
     This class manages the storage and retrieval of user data using JSON files.
+    
+    Several threads and processes can share one data file: writes hold an
+    in-process RW lock and an advisory lock on "<file_path>.lock" for their
+    whole read-modify-write cycle, and the file is replaced atomically, so
+    readers never see a partial file and no update is lost.
+    
+    Creating a repository does not touch the filesystem: the data directory
+    and file are created by the first write (a missing file reads as empty).
     """
     
     def __init__(self, file_path: str = "data/users.json"):
@@ -18,7 +246,65 @@ class UserRepository:
             file_path (str): Path to the JSON file for storing user data
         """
         self.file_path = file_path
-        self._ensure_data_directory()
+        self._rwlock = RWLock()
+        self._file_lock = FileLock()
+        self._prepared_path: Optional[str] = None
+        # Set to publish every committed change (see create_repository(change_feed=True))
+        self.change_feed: Optional[ChangeFeed] = None
+        # Called with the changes of every commit of this process (e.g. to invalidate a ReadThroughCache)
+        self.change_listeners: List[Callable[[List[Tuple[str, User]]], None]] = []
+    
+    @property
+    def lock_path(self) -> str:
+        """
+        Path of the lock file shared by all processes using the data file.
+        """
+        return self.file_path + ".lock"
+    
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """
+        Hold the in-process write lock and the cross-process file lock.
+        """
+        self._prepare()
+        with self._rwlock.write_locked(), self._file_lock.locked(self.lock_path):
+            yield
+    
+    def _prepare(self) -> None:
+        """
+        Create the data directory and file on first use of the current file_path.
+        """
+        if self._prepared_path != self.file_path:
+            self._prepared_path = self.file_path
+            self._ensure_data_directory()
+    
+    def _before_read(self) -> None:
+        """
+        Hook run before a read operation takes the read lock.
+        """
+    
+    def _publish_changes(self, changes: List[Tuple[str, User]]) -> None:
+        """
+        Publish the changes of a committed write to the change feed, if there is
+        one, and to the change listeners. Every write method calls this once,
+        after its commit.
+        
+        Args:
+            changes (List[Tuple[str, User]]): ("add" | "update" | "delete", user) pairs in commit order
+        """
+        if not changes:
+            return
+        if self.change_feed is not None:
+            self.change_feed.publish(changes)
+        for listener in self.change_listeners:
+            listener(changes)
+    
+    @property
+    def _publishes_changes(self) -> bool:
+        """
+        Whether anything receives the published changes, so writes need to know exactly what they changed.
+        """
+        return self.change_feed is not None or bool(self.change_listeners)
     
     def _ensure_data_directory(self) -> None:
         """
@@ -27,7 +313,9 @@ class UserRepository:
         """
         os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
         if not os.path.exists(self.file_path):
-            self._save_users([])
+            with self._exclusive():
+                if not os.path.exists(self.file_path):
+                    self._save_users([])
     
     def _load_users(self) -> List[User]:
         """
@@ -35,24 +323,39 @@ class UserRepository:
         
         Returns:
             List[User]: List of User objects
+            
+        Raises:
+            CorruptDataError: If the file is not a JSON array of user records
         """
         try:
             with open(self.file_path, 'r') as f:
-                data = json.load(f)
-                return [User.from_dict(user_data) for user_data in data]
-        except (json.JSONDecodeError, FileNotFoundError):
+                text = f.read()
+            users = User.list_from_json(text)
+            if not isinstance(users, list):
+                raise ValueError("expected a JSON array")
+        except FileNotFoundError:
             return []
+        except (ValueError, KeyError, TypeError) as error:
+            raise CorruptDataError(f"{self.file_path} is corrupt: {error}") from error
+        if metrics.REGISTRY.enabled:
+            metrics.inc('json_bytes_read_total', len(text))
+            metrics.observe('repository_load_records', len(users), metrics.SIZE_BUCKETS)
+        return users
     
     def _save_users(self, users: List[User]) -> None:
         """
         Save users to the JSON file.
+        The file is written to a temporary file first and then moved over the old one.
         
         Args:
             users (List[User]): List of User objects to save
         """
-        with open(self.file_path, 'w') as f:
-            json.dump([user.to_dict() for user in users], f, indent=4)
+        with atomic_write(self.file_path) as f:
+            dump_users(users, f)
+            if metrics.REGISTRY.enabled:
+                metrics.inc('json_bytes_written_total', f.tell())
     
+    @write_operation
     def add_user(self, user: User) -> bool:
         """
         Add a new user to the repository.
@@ -61,15 +364,155 @@ class UserRepository:
             user (User): User object to add
             
         Returns:
-            bool: True if user was added successfully, False if email already exists
+            bool: True if user was added successfully, False if the email or UserID already exists
         """
         users = self._load_users()
-        if any(u.email == user.email for u in users):
+        if any(u.email == user.email or u.user_id == user.user_id for u in users):
             return False
         users.append(user)
         self._save_users(users)
+        self._publish_changes([('add', user)])
         return True
     
+    @write_operation
+    def bulk_add_users(self, users: Iterable[User], batch_size: int = 10000) -> int:
+        """
+        Add many users in one pass.
+        
+        Emails and UserIDs are checked against sets built once, so duplicates
+        (already stored or repeated in the input) are skipped without rescanning.
+        The JSON file is rewritten once at the end; batch_size is used by backends
+        that can commit incrementally.
+        
+        Args:
+            users (Iterable[User]): Users to add, consumed lazily
+            batch_size (int): Number of users per commit for incremental backends
+            
+        Returns:
+            int: Number of users added
+        """
+        stored = self._load_users()
+        emails = {user.email for user in stored}
+        user_ids = {user.user_id for user in stored}
+        initial_length = len(stored)
+        for user in users:
+            if user.email in emails or user.user_id in user_ids:
+                continue
+            emails.add(user.email)
+            user_ids.add(user.user_id)
+            stored.append(user)
+        added = len(stored) - initial_length
+        if added:
+            self._save_users(stored)
+            self._publish_changes([('add', user) for user in stored[initial_length:]])
+        return added
+    
+    @write_operation
+    def apply_batch(self, operations: List[Tuple[str, Any]]) -> List[bool]:
+        """
+        Apply several changes in order and commit them together.
+        
+        Args:
+            operations (List[Tuple[str, Any]]): ("add", User), ("delete", email) or ("delete_id", user_id) pairs
+            
+        Returns:
+            List[bool]: Result of each operation, as add_user/delete_user/delete_by_id would return it
+            
+        Raises:
+            ValueError: If an operation name is unknown
+        """
+        by_email = {user.email: user for user in self._load_users()}
+        email_of = {user.user_id: email for email, user in by_email.items()}
+        results, changes = [], []
+        for operation, argument in operations:
+            if operation == "add":
+                added = argument.email not in by_email and argument.user_id not in email_of
+                if added:
+                    by_email[argument.email] = argument
+                    email_of[argument.user_id] = argument.email
+                    changes.append(('add', argument))
+                results.append(added)
+            elif operation == "delete":
+                user = by_email.pop(argument, None)
+                if user is not None:
+                    email_of.pop(user.user_id, None)
+                    changes.append(('delete', user))
+                results.append(user is not None)
+            elif operation == "delete_id":
+                email = email_of.pop(argument, None)
+                if email is not None:
+                    changes.append(('delete', by_email.pop(email)))
+                results.append(email is not None)
+            else:
+                raise ValueError(f"Unknown operation: {operation}")
+        if changes:
+            self._save_users(list(by_email.values()))
+            self._publish_changes(changes)
+        return results
+    
+    def iter_users(self) -> Iterator[User]:
+        """
+        Iterate over all users, parsing the JSON file incrementally.
+        
+        Returns:
+            Iterator[User]: Iterator over User objects
+            
+        Raises:
+            CorruptDataError: If the file is not a JSON array of user records
+        """
+        try:
+            f = open(self.file_path, 'r')
+        except FileNotFoundError:
+            return
+        with f:
+            try:
+                for user_data in iter_json_array(f):
+                    yield User.from_dict(user_data)
+            except (ValueError, KeyError, TypeError) as error:
+                raise CorruptDataError(f"{self.file_path} is corrupt: {error}") from error
+    
+    @read_operation
+    def list_users(self, offset: int = 0, limit: Optional[int] = None) -> List[User]:
+        """
+        Get one page of users.
+        
+        Args:
+            offset (int): Number of users to skip
+            limit (Optional[int]): Maximum number of users to return (all if None)
+            
+        Returns:
+            List[User]: Users in the requested page
+        """
+        stop = None if limit is None else offset + limit
+        return list(islice(self.iter_users(), offset, stop))
+    
+    @read_operation
+    def get_by_email(self, email: str) -> Optional[User]:
+        """
+        Get a user by email.
+        
+        Args:
+            email (str): Email of the user to look up
+            
+        Returns:
+            Optional[User]: The matching User, or None if not found
+        """
+        return next((user for user in self._load_users() if user.email == email), None)
+    
+    @read_operation
+    def get_by_id(self, user_id: str) -> Optional[User]:
+        """
+        Get a user by UserID.
+        
+        Args:
+            user_id (str): UserID (UUID) of the user to look up
+            
+        Returns:
+            Optional[User]: The matching User, or None if not found
+        """
+        return next((user for user in self._load_users() if user.user_id == user_id), None)
+    
+    @read_operation
     def get_all_users(self) -> List[User]:
         """
         Get all users from the repository.
@@ -79,20 +522,102 @@ class UserRepository:
         """
         return self._load_users()
     
-    def find_by_name(self, name: str) -> List[User]:
+    def snapshot_users(self) -> List[User]:
+        """
+        Get a consistent point-in-time copy of all users, for backups.
+        
+        Writers are not held up for the length of the read: the data file is
+        replaced atomically, so one read of it is consistent, and the in-memory
+        backends copy their state under the read lock, which only waits for
+        the write in progress.
+        
+        Returns:
+            List[User]: All users as of one commit
+        """
+        return self.get_all_users()
+    
+    @write_operation
+    def restore_users(self, users: List[User]) -> None:
+        """
+        Replace the whole content of the data store, e.g. from a backup, and
+        rebuild its indexes. Nothing is published to the change feed.
+        
+        Args:
+            users (List[User]): The new content
+        """
+        self._save_users(users)
+    
+    @read_operation
+    def find_by_name(self, name: str, limit: Optional[int] = None) -> List[User]:
         """
         Find users by name (case-insensitive partial match).
+        Names starting with the search text are returned first, in name order,
+        followed by the other matches in storage order.
         
         Args:
             name (str): Name to search for
+            limit (Optional[int]): Maximum number of results (all if None)
             
         Returns:
             List[User]: List of matching User objects
         """
         users = self._load_users()
         name_lower = name.lower()
-        return [user for user in users if name_lower in user.name.lower()]
+        matches = [user for user in users if name_lower in user.name.lower()]
+        matches.sort(key=lambda user: (0, user.name.lower()) if user.name.lower().startswith(name_lower) else (1, ''))
+        return matches[:limit]
+    
+    @read_operation
+    def query(self, name_prefix: Optional[str] = None, name_contains: Optional[str] = None,
+              email_domain: Optional[str] = None, email: Optional[str] = None, user_id: Optional[str] = None,
+              order_by: Optional[str] = None, limit: Optional[int] = None) -> QueryResult:
+        """
+        Find users matching several conditions, optionally ordered and limited.
+        
+        The query is planned against the indexes of the backend: the most
+        selective one supplies the candidates and the other conditions are
+        checked on each of them. Results are streamed; an ordered query with a
+        limit keeps only the best limit users in a heap instead of sorting all
+        the matches. The plan is available as result.plan before the first
+        user is read, e.g. print(repository.query(email_domain="example.com").plan).
+        
+        Args:
+            name_prefix (Optional[str]): Text the name starts with (case-insensitive)
+            name_contains (Optional[str]): Text the name contains (case-insensitive)
+            email_domain (Optional[str]): Domain of the email (case-insensitive)
+            email (Optional[str]): Exact email
+            user_id (Optional[str]): Exact UserID
+            order_by (Optional[str]): "name", "email", "user_id" or "version", "-" prefixed for descending order
+            limit (Optional[int]): Maximum number of users to return (all if None)
+            
+        Returns:
+            QueryResult: Iterator over the matching users, with the plan used
+            
+        Raises:
+            ValueError: If order_by is not a known field or limit is negative
+        """
+        return self._run_query(UserQuery(name_prefix, name_contains, email_domain, email, user_id, order_by, limit))
     
+    def _run_query(self, query: UserQuery) -> QueryResult:
+        """
+        Plan and start a query. The JSON file has no index besides the
+        lookups by UserID and email, so anything else is a streaming scan.
+        
+        Args:
+            query (UserQuery): The query
+            
+        Returns:
+            QueryResult: The lazily produced results
+        """
+        if query.user_id is not None or query.email is not None:
+            index = 'user_id' if query.user_id is not None else 'email'
+            user = self.get_by_id(query.user_id) if index == 'user_id' else self.get_by_email(query.email)
+            candidates = [user] if user else []
+            plan = make_plan(query, index, index, len(candidates))
+            return QueryResult(plan, run_query(query, candidates))
+        return QueryResult(make_plan(query, None, None, None), run_query(query, self.iter_users()))
+    
+    @write_operation
     def delete_user(self, email: str) -> bool:
         """
         Delete a user by email.
@@ -104,9 +629,639 @@ class UserRepository:
             bool: True if user was deleted, False if user not found
         """
         users = self._load_users()
-        initial_length = len(users)
-        users = [user for user in users if user.email != email]
-        if len(users) < initial_length:
-            self._save_users(users)
-            return True
-        return False 
\ No newline at end of file
+        deleted = next((user for user in users if user.email == email), None)
+        if deleted is None:
+            return False
+        self._save_users([user for user in users if user is not deleted])
+        self._publish_changes([('delete', deleted)])
+        return True
+    
+    @write_operation
+    def update_user(self, user_id: str, expected_version: Optional[int] = None, **fields: str) -> Optional[User]:
+        """
+        Change some fields of a user.
+        
+        With expected_version the write is a compare-and-set: it only happens if
+        the user is still at the version the caller read, so a stale writer is
+        rejected instead of silently overwriting a newer change. Callers hold no
+        lock between reading and updating.
+        
+        Args:
+            user_id (str): UserID (UUID) of the user to update
+            expected_version (Optional[int]): Version the caller read (no check if None)
+            **fields (str): New values for name, email and/or password
+            
+        Returns:
+            Optional[User]: The updated user (with its new version), or None if user not found
+            
+        Raises:
+            ValueError: If a field cannot be updated or the new email belongs to another user
+            VersionConflictError: If the user is no longer at expected_version
+        """
+        return self.update_many([dict(fields, user_id=user_id, version=expected_version)])[0]
+    
+    @write_operation
+    def update_many(self, updates: Iterable[Dict[str, Any]]) -> List[Optional[User]]:
+        """
+        Apply several updates with a single commit.
+        
+        Each update is a dict with the "user_id", the new field values and
+        optionally the expected "version". The batch is all-or-nothing: if one
+        update is stale or invalid nothing is written.
+        
+        Args:
+            updates (Iterable[Dict[str, Any]]): Updates to apply in order
+            
+        Returns:
+            List[Optional[User]]: The updated user for each update, None for unknown UserIDs
+            
+        Raises:
+            ValueError: If a field cannot be updated or a new email belongs to another user
+            VersionConflictError: If an expected version is stale
+        """
+        users = self._load_users()
+        results, changed = stage_updates({user.user_id: user for user in users},
+                                         {user.email: user for user in users}, updates)
+        if changed:
+            self._save_users([changed.get(user.user_id, user) for user in users])
+            self._publish_changes(update_changes(results))
+        return results
+    
+    @write_operation
+    def delete_by_id(self, user_id: str) -> bool:
+        """
+        Delete a user by UserID.
+        
+        Args:
+            user_id (str): UserID (UUID) of the user to delete
+            
+        Returns:
+            bool: True if user was deleted, False if user not found
+        """
+        return self.delete_many([user_id]) == 1
+    
+    @write_operation
+    def delete_many(self, user_ids: Iterable[str]) -> int:
+        """
+        Delete several users by UserID with a single commit.
+        Unknown UserIDs are ignored.
+        
+        Args:
+            user_ids (Iterable[str]): UserIDs of the users to delete
+            
+        Returns:
+            int: Number of users deleted
+        """
+        ids = set(user_ids)
+        users = self._load_users()
+        kept = [user for user in users if user.user_id not in ids]
+        if len(kept) < len(users):
+            self._save_users(kept)
+            self._publish_changes([('delete', user) for user in users if user.user_id in ids])
+        return len(users) - len(kept)
+
+
+class CachedUserRepository(UserRepository):
+    """
+    UserRepository that keeps users in memory between calls.
+    
+    The JSON file is parsed once and kept together with hash indexes by email
+    and user_id, so point lookups are O(1), and a NameIndex for find_by_name.
+    query() also uses an email domain index, built by the first query on a
+    domain and kept up to date by the writes after it. The cache is reloaded only when the file's modification time or size
+    changes (e.g. another process wrote it).
+    
+    The name index is persisted to "<file_path>.names" when it is first built
+    from the file (and by save_name_index()), so the next start with an
+    unchanged file can skip rebuilding it. Likewise the users are saved as a
+    binary snapshot in "<file_path>.snapshot" (see save_snapshot()), so a
+    warm start with an unchanged file skips parsing the JSON. These files are
+    only written under the cross-process write lock: a load made by a read
+    leaves them for the next write or save_snapshot().
+    """
+    
+    def __init__(self, file_path: str = "data/users.json"):
+        """
+        Initialize the CachedUserRepository.
+        
+        Args:
+            file_path (str): Path to the JSON file for storing user data
+        """
+        self._by_email: Dict[str, User] = {}
+        self._by_id: Dict[str, User] = {}
+        self._name_index = NameIndex()
+        # email domain -> user_ids (a dict used as an ordered set), built by the first query on a domain
+        self._by_domain: Optional[Dict[str, Dict[str, None]]] = None
+        self._stamp: Optional[Tuple[str, int, int, int]] = None
+        # Warm-start files ("snapshot", "names") a first load found missing or stale, see _save_side_files()
+        self._pending_side_files: Set[str] = set()
+        super().__init__(file_path)
+    
+    @property
+    def name_index_path(self) -> str:
+        """
+        Path of the persisted name index next to the data file.
+        """
+        return self.file_path + ".names"
+    
+    @property
+    def snapshot_path(self) -> str:
+        """
+        Path of the binary users snapshot next to the data file.
+        """
+        return self.file_path + ".snapshot"
+    
+    def _file_stamp(self) -> Optional[Tuple[str, int, int, int]]:
+        """
+        Get the identity of the data file as it is on disk.
+        
+        Returns:
+            Optional[Tuple[str, int, int, int]]: (path, inode, mtime in ns, size), or None if the file is missing
+        """
+        try:
+            stat = os.stat(self.file_path)
+        except FileNotFoundError:
+            return None
+        # The inode tells a file replaced by a rename apart even when mtime and size match
+        return (self.file_path, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    
+    def _set_users(self, users: List[User], stamp: Optional[Tuple[str, int, int, int]]) -> None:
+        """
+        Replace the cached users and rebuild the indexes.
+        The user_id index keeps file order and doubles as the cached user list.
+        
+        Args:
+            users (List[User]): Users currently stored in the file
+            stamp (Optional[Tuple[str, int, int, int]]): File stamp the users were read from
+        """
+        first_load = self._stamp is None
+        self._by_email = {user.email: user for user in users}
+        self._by_id = {user.user_id: user for user in users}
+        self._by_domain = None
+        self._stamp = stamp
+        name_index = NameIndex.load(self.name_index_path, stamp) if stamp and first_load else None
+        if name_index is None or len(name_index) != len(self._by_id):
+            name_index = NameIndex((user.user_id, user.name) for user in self._by_id.values())
+            if stamp and first_load:
+                self._pending_side_files.add('names')
+        self._name_index = name_index
+    
+    def _save_side_files(self) -> None:
+        """
+        Write the warm-start files left pending by a first load, if this process
+        holds the cross-process write lock (so no writer can replace the data
+        file meanwhile); reads leave them pending.
+        """
+        if not self._pending_side_files or not self._file_lock.held:
+            return
+        if self._stamp:
+            if 'snapshot' in self._pending_side_files:
+                UserTable(self._by_id.values()).save(self.snapshot_path, self._stamp)
+            if 'names' in self._pending_side_files:
+                self._name_index.save(self.name_index_path, self._stamp)
+        self._pending_side_files.clear()
+    
+    def _replace_users(self, users: List[User]) -> None:
+        """
+        Replace the cached users, updating the name index only for changed users.
+        
+        Args:
+            users (List[User]): New content of the repository
+        """
+        by_id = {user.user_id: user for user in users}
+        for user_id in self._by_id:
+            if user_id not in by_id:
+                self._name_index.remove(user_id)
+        for user in users:
+            previous = self._by_id.get(user.user_id)
+            if previous is None or previous.name != user.name:
+                self._name_index.add(user.user_id, user.name)
+        self._by_id = by_id
+        self._by_email = {user.email: user for user in users}
+        self._by_domain = None
+    
+    def _index_add(self, user: User) -> None:
+        """
+        Add or replace one user in the indexes.
+        
+        Args:
+            user (User): User to index
+        """
+        previous = self._by_id.get(user.user_id)
+        if previous is not None and self._by_email.get(previous.email) is previous:
+            del self._by_email[previous.email]
+        self._by_id[user.user_id] = user
+        self._by_email[user.email] = user
+        if previous is None or previous.name != user.name:
+            self._name_index.add(user.user_id, user.name)
+        if self._by_domain is not None:
+            if previous is not None:
+                self._domain_discard(previous)
+            self._by_domain.setdefault(email_domain(user.email), {})[user.user_id] = None
+    
+    def _index_remove(self, user_id: str) -> Optional[User]:
+        """
+        Remove one user from the indexes.
+        
+        Args:
+            user_id (str): UserID of the user to remove
+            
+        Returns:
+            Optional[User]: The removed user, or None if it was not indexed
+        """
+        user = self._by_id.pop(user_id, None)
+        if user is not None:
+            if self._by_email.get(user.email) is user:
+                del self._by_email[user.email]
+            self._name_index.remove(user_id)
+            if self._by_domain is not None:
+                self._domain_discard(user)
+        return user
+    
+    def _domain_discard(self, user: User) -> None:
+        """
+        Remove one user from the email domain index.
+        
+        Args:
+            user (User): User as it was indexed
+        """
+        domain = email_domain(user.email)
+        user_ids = self._by_domain.get(domain)
+        if user_ids is not None:
+            user_ids.pop(user.user_id, None)
+            if not user_ids:
+                del self._by_domain[domain]
+    
+    def _domain_index(self) -> Dict[str, Dict[str, None]]:
+        """
+        Get the email domain index, building it on first use.
+        
+        Returns:
+            Dict[str, Dict[str, None]]: Lowercased domain -> user_ids in storage order
+        """
+        if self._by_domain is None:
+            by_domain: Dict[str, Dict[str, None]] = {}
+            for user in self._by_id.values():
+                by_domain.setdefault(email_domain(user.email), {})[user.user_id] = None
+            self._by_domain = by_domain
+        return self._by_domain
+    
+    def save_name_index(self) -> None:
+        """
+        Persist the current name index next to the data file (under the write lock).
+        """
+        if self._file_stamp() is None:
+            return
+        with self._exclusive():
+            self._refresh()
+            if self._stamp:
+                self._name_index.save(self.name_index_path, self._stamp)
+    
+    def save_snapshot(self) -> None:
+        """
+        Persist the current users and name index next to the data file (under the write lock),
+        so the next start skips parsing the JSON and rebuilding the index.
+        Nothing is written while there is no data file.
+        """
+        if self._file_stamp() is None:
+            return
+        with self._exclusive():
+            self._refresh()
+            self._pending_side_files.update(('snapshot', 'names'))
+            self._save_side_files()
+    
+    @write_operation
+    def restore_users(self, users: List[User]) -> None:
+        """
+        Replace the whole content of the data store and rebuild its indexes.
+        The indexes are built in one pass, as on a first load, and saved with
+        the warm-start snapshot, so the next start does not parse the file.
+        
+        Args:
+            users (List[User]): The new content
+        """
+        UserRepository._save_users(self, users)
+        stamp = self._file_stamp()
+        self._stamp = None
+        self._set_users(users, stamp)
+        self._pending_side_files.update(('snapshot', 'names'))
+        self._save_side_files()
+    
+    def _needs_sync(self) -> bool:
+        """
+        Check whether the data file changed since it was last read.
+        """
+        return self._file_stamp() != self._stamp
+    
+    def _refresh(self) -> None:
+        """
+        Bring the cache up to date with the data file.
+        
+        Writers sync under the write lock they already hold. Readers are synced
+        by _before_read() before they take the read lock, so inside a read the
+        cache is left as is. Callers holding no lock sync under the write lock.
+        """
+        if self._rwlock.owned_for_write():
+            self._sync()
+        elif not self._rwlock.owned_for_read() and self._needs_sync():
+            with self._rwlock.write_locked():
+                self._sync()
+    
+    def _before_read(self) -> None:
+        """
+        Sync the cache before a read operation takes the read lock.
+        """
+        if metrics.REGISTRY.enabled:
+            metrics.inc('repository_cache_lookups_total', result='miss' if self._needs_sync() else 'hit')
+        self._refresh()
+    
+    def _sync(self) -> None:
+        """
+        Reload the cache if the data file changed since it was last read.
+        Must be called with the write lock held.
+        """
+        stamp = self._file_stamp()
+        if stamp is None:
+            self._set_users([], None)
+        elif stamp != self._stamp:
+            self._set_users(self._read_users(stamp), stamp)
+        self._save_side_files()
+    
+    def _read_users(self, stamp: Tuple[str, int, int, int]) -> List[User]:
+        """
+        Read the users of the data file, from the binary snapshot if it matches the file.
+        On the first load a missing or stale snapshot is marked to be rewritten for the next start.
+        
+        Args:
+            stamp (Tuple[str, int, int, int]): Current stamp of the data file
+            
+        Returns:
+            List[User]: Users stored in the file
+        """
+        first_load = self._stamp is None
+        table = UserTable.load(self.snapshot_path, stamp) if first_load else None
+        if table is not None:
+            return table.to_users()
+        users = super()._load_users()
+        if first_load:
+            self._pending_side_files.add('snapshot')
+        return users
+    
+    def _load_users(self) -> List[User]:
+        """
+        Load users from the cache, reloading the JSON file only if it changed.
+        
+        Returns:
+            List[User]: List of User objects (a copy of the cached list)
+        """
+        self._refresh()
+        return list(self._by_id.values())
+    
+    def _save_users(self, users: List[User]) -> None:
+        """
+        Save users to the JSON file and update the cache.
+        
+        Args:
+            users (List[User]): List of User objects to save
+        """
+        with self._exclusive():
+            super()._save_users(users)
+            self._replace_users(users)
+            self._stamp = self._file_stamp()
+    
+    @write_operation
+    def add_user(self, user: User) -> bool:
+        """
+        Add a new user to the repository.
+        
+        Args:
+            user (User): User object to add
+            
+        Returns:
+            bool: True if user was added successfully, False if the email or UserID already exists
+        """
+        self._refresh()
+        if user.email in self._by_email or user.user_id in self._by_id:
+            return False
+        self._save_users(list(self._by_id.values()) + [user])
+        self._publish_changes([('add', user)])
+        return True
+    
+    def iter_users(self) -> Iterator[User]:
+        """
+        Iterate over the cached users.
+        
+        Returns:
+            Iterator[User]: Iterator over User objects
+        """
+        self._refresh()
+        return iter(tuple(self._by_id.values()))
+    
+    @read_operation
+    def get_by_email(self, email: str) -> Optional[User]:
+        """
+        Get a user by email using the email index.
+        
+        Args:
+            email (str): Email of the user to look up
+            
+        Returns:
+            Optional[User]: The matching User, or None if not found
+        """
+        self._refresh()
+        return self._by_email.get(email)
+    
+    @read_operation
+    def get_by_id(self, user_id: str) -> Optional[User]:
+        """
+        Get a user by UserID using the user_id index.
+        
+        Args:
+            user_id (str): UserID (UUID) of the user to look up
+            
+        Returns:
+            Optional[User]: The matching User, or None if not found
+        """
+        self._refresh()
+        return self._by_id.get(user_id)
+    
+    @read_operation
+    def find_by_name(self, name: str, limit: Optional[int] = None) -> List[User]:
+        """
+        Find users by name (case-insensitive partial match) using the name index.
+        Names starting with the search text are returned first, in name order,
+        followed by the other matches in storage order.
+        
+        Args:
+            name (str): Name to search for
+            limit (Optional[int]): Maximum number of results (all if None)
+            
+        Returns:
+            List[User]: List of matching User objects
+        """
+        self._refresh()
+        return [self._by_id[user_id] for user_id in self._name_index.search(name, limit)]
+    
+    def _run_query(self, query: UserQuery) -> QueryResult:
+        """
+        Plan and start a query against the in-memory indexes.
+        
+        Every index that can answer one of the conditions is costed by the
+        number of candidates it yields (exact for UserID, email, domain and
+        name prefix; the rarest trigram for a name substring), and the
+        cheapest one wins; on a tie, the one already in the requested order.
+        The candidates are copied under the read lock, so later writes don't
+        affect the results.
+        
+        Args:
+            query (UserQuery): The query
+            
+        Returns:
+            QueryResult: The lazily produced results
+        """
+        self._refresh()
+        # (candidate count, not ordered, index, condition it answers, candidates)
+        paths: List[Tuple[int, bool, Optional[str], Optional[str], Callable[[], List[User]]]] = []
+        paths.append((len(self._by_id), True, None, None, lambda: list(self._by_id.values())))
+        if query.user_id is not None:
+            by_id = self._by_id.get(query.user_id)
+            paths.append((int(by_id is not None), True, 'user_id', 'user_id', lambda: [by_id] if by_id else []))
+        if query.email is not None:
+            by_email = self._by_email.get(query.email)
+            paths.append((int(by_email is not None), True, 'email', 'email', lambda: [by_email] if by_email else []))
+        if query.email_domain is not None:
+            user_ids = self._domain_index().get(query.email_domain, {})
+            paths.append((len(user_ids), True, 'email_domain', 'email_domain',
+                          lambda: [self._by_id[user_id] for user_id in user_ids]))
+        if query.name_prefix is not None:
+            by_name = query.order_field == 'name'
+            paths.append((self._name_index.prefix_count(query.name_prefix), not by_name, 'name', 'name_prefix',
+                          lambda: [self._by_id[user_id]
+                                   for user_id in self._name_index.prefix(query.name_prefix, query.descending)]))
+        if query.name_contains is not None:
+            estimate = self._name_index.contains_estimate(query.name_contains)
+            if estimate is not None:
+                paths.append((estimate, True, 'name', 'name_contains',
+                              lambda: [self._by_id[user_id]
+                                       for user_id in self._name_index.contains(query.name_contains)]))
+        count, unordered, index, served, candidates = min(paths, key=lambda path: path[:2])
+        ordered = not unordered and index is not None
+        plan = make_plan(query, index, served, count, ordered)
+        return QueryResult(plan, run_query(query, candidates(), ordered))
+    
+    @write_operation
+    def delete_user(self, email: str) -> bool:
+        """
+        Delete a user by email.
+        
+        Args:
+            email (str): Email of the user to delete
+            
+        Returns:
+            bool: True if user was deleted, False if user not found
+        """
+        self._refresh()
+        deleted = self._by_email.get(email)
+        if deleted is None:
+            return False
+        self._save_users([user for user in self._by_id.values() if user.email != email])
+        self._publish_changes([('delete', deleted)])
+        return True
+    
+    @write_operation
+    def update_many(self, updates: Iterable[Dict[str, Any]]) -> List[Optional[User]]:
+        """
+        Apply several updates with a single rewrite of the JSON file.
+        Users are found and emails checked with the cached indexes.
+        
+        Args:
+            updates (Iterable[Dict[str, Any]]): Updates to apply in order (see UserRepository.update_many)
+            
+        Returns:
+            List[Optional[User]]: The updated user for each update, None for unknown UserIDs
+            
+        Raises:
+            ValueError: If a field cannot be updated or a new email belongs to another user
+            VersionConflictError: If an expected version is stale
+        """
+        self._refresh()
+        results, changed = stage_updates(self._by_id, self._by_email, updates)
+        if changed:
+            self._save_users([changed.get(user_id, user) for user_id, user in self._by_id.items()])
+            self._publish_changes(update_changes(results))
+        return results
+    
+    @write_operation
+    def delete_many(self, user_ids: Iterable[str]) -> int:
+        """
+        Delete several users by UserID with a single rewrite of the JSON file.
+        The user_id index finds them, and nothing is written if none exists.
+        
+        Args:
+            user_ids (Iterable[str]): UserIDs of the users to delete
+            
+        Returns:
+            int: Number of users deleted
+        """
+        self._refresh()
+        ids = {user_id for user_id in user_ids if user_id in self._by_id}
+        if ids:
+            deleted = [self._by_id[user_id] for user_id in ids]
+            self._save_users([user for user_id, user in self._by_id.items() if user_id not in ids])
+            self._publish_changes([('delete', user) for user in deleted])
+        return len(ids)
+
+
+def create_repository(file_path: str = "data/users.json", backend: Optional[str] = None,
+                      migrate_from: Optional[str] = None, change_feed: bool = False) -> UserRepository:
+    """
+    Create a repository for the configured storage backend.
+    
+    Args:
+        file_path (str): Path to the data file
+        backend (Optional[str]): Storage backend name ("json", "cached", "log", "sqlite", "binary" or
+            "sharded"). If not given, files ending in .db/.sqlite/.sqlite3 use "sqlite", files ending in
+            .bin use "binary" and anything else "cached".
+        migrate_from (Optional[str]): JSON file to import into an empty SQLite or sharded data store
+        change_feed (bool): Publish every committed change to the "<file_path>.changes" feed
+        
+    Returns:
+        UserRepository: Repository instance for the backend
+        
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    repository = _open_backend(file_path, backend, migrate_from)
+    if change_feed:
+        repository.change_feed = ChangeFeed(file_path + ".changes")
+    return repository
+
+def _open_backend(file_path: str, backend: Optional[str], migrate_from: Optional[str]) -> UserRepository:
+    """
+    Instantiate the repository class of a storage backend (see create_repository).
+    """
+    if not backend:
+        if file_path.lower().endswith(SQLITE_EXTENSIONS):
+            backend = "sqlite"
+        elif file_path.lower().endswith(BINARY_EXTENSIONS):
+            backend = "binary"
+        else:
+            backend = "cached"
+    backend = backend.lower()
+    if backend == "json":
+        return UserRepository(file_path)
+    if backend == "cached":
+        return CachedUserRepository(file_path)
+    if backend == "log":
+        from .log_repository import LogUserRepository
+        return LogUserRepository(file_path)
+    if backend == "sqlite":
+        from .sqlite_repository import SqliteUserRepository
+        return SqliteUserRepository(file_path, migrate_from=migrate_from)
+    if backend == "binary":
+        from .binary_repository import BinaryUserRepository
+        return BinaryUserRepository(file_path)
+    if backend == "sharded":
+        from .sharded_repository import ShardedUserRepository
+        return ShardedUserRepository(file_path, migrate_from=migrate_from)
+    raise ValueError(f"Unknown storage backend: {backend}")
\ No newline at end of file
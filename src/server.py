@@ -0,0 +1,436 @@
+import argparse
+import json
+import os
+import signal
+import socket
+import sys
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+from decouple import config
+from . import metrics, validation
+from .auth import Authenticator, RateLimitError
+from .models import User
+from .passwords import PasswordHasher, hasher_from_config
+from .read_cache import read_cache_from_config
+from .repository import UPDATABLE_FIELDS, UserRepository, VersionConflictError, create_repository
+
+MAX_BODY_BYTES = 64 * 1024
+MAX_PAGE_SIZE = 1000
+# Query parameters of GET /users/search handed to UserRepository.query()
+QUERY_PARAMS = ('name_prefix', 'name_contains', 'email_domain')
+
+class HTTPError(Exception):
+    """
+    Error returned to the client as a JSON {"error": message} response.
+    """
+
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+def public_user(user: User) -> Dict[str, str]:
+    """
+    Get the fields of a user that the API returns (never the password hash).
+    Args:
+        user (User): User to convert
+    Returns:
+        Dict[str, str]: user_id, name, email and version
+    """
+    return {'user_id': user.user_id, 'name': user.name, 'email': user.email, 'version': user.version}
+
+def _int_param(params: Dict[str, List[str]], name: str, default: int, maximum: Optional[int] = None) -> int:
+    """
+    Read a non-negative integer query parameter.
+    """
+    try:
+        value = int(params.get(name, [default])[0])
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"{name} must be an integer")
+    if value < 0:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"{name} must not be negative")
+    return value if maximum is None else min(value, maximum)
+
+class UserService:
+    """
+    The HTTP API operations on top of one repository.
+
+    One instance is created per process and shared by all request threads, so
+    the repository (and its in-memory indexes) stays warm between requests.
+    Each method returns (status, JSON-serializable body) or raises HTTPError.
+    """
+
+    def __init__(self, repository: UserRepository, hasher: Optional[PasswordHasher] = None,
+                 page_size: int = 20, search_limit: int = 10, login_rate: float = 1.0, login_burst: int = 5):
+        """
+        Initialize the UserService.
+
+        Args:
+            repository (UserRepository): Repository to serve
+            hasher (Optional[PasswordHasher]): Hasher for new passwords and logins
+            page_size (int): Default number of users per list page
+            search_limit (int): Default maximum number of name search results
+            login_rate (float): Login attempts per second allowed per email and per client address
+            login_burst (int): Login attempts allowed at once per email and per client address
+        """
+        self.repository = repository
+        self.hasher = hasher or PasswordHasher()
+        self.authenticator = Authenticator(repository, self.hasher, rate=login_rate, burst=login_burst)
+        self.page_size = page_size
+        self.search_limit = search_limit
+
+    def register(self, body: Dict[str, Any]) -> Tuple[HTTPStatus, Any]:
+        """
+        Register a user from a {"name", "email", "password"} body.
+        """
+        record = {key: body.get(key) if isinstance(body.get(key), str) else '' for key in ('name', 'email', 'password')}
+        error = validation.validate_record(record)
+        if error:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, error)
+        if self.repository.get_by_email(record['email']) is not None:
+            raise HTTPError(HTTPStatus.CONFLICT, "email already registered")
+        user = User(record['name'], record['email'], self.hasher.hash(record['password']))
+        if not self.repository.add_user(user):
+            raise HTTPError(HTTPStatus.CONFLICT, "email already registered")
+        return HTTPStatus.CREATED, public_user(user)
+
+    def list(self, params: Dict[str, List[str]]) -> Tuple[HTTPStatus, Any]:
+        """
+        Get one page of users (offset and limit query parameters).
+        """
+        offset = _int_param(params, 'offset', 0)
+        limit = _int_param(params, 'limit', self.page_size, MAX_PAGE_SIZE)
+        users = self.repository.list_users(offset=offset, limit=limit)
+        return HTTPStatus.OK, {'offset': offset, 'limit': limit, 'users': [public_user(user) for user in users]}
+
+    def search(self, params: Dict[str, List[str]]) -> Tuple[HTTPStatus, Any]:
+        """
+        Find users by email, by name (with an optional limit), or with a query
+        combining name_prefix, name_contains and email_domain, ordered by
+        order_by and limited by limit. With explain=1 a query also returns its plan.
+        """
+        conditions = {key: params[key][0] for key in QUERY_PARAMS if key in params}
+        if conditions:
+            limit = _int_param(params, 'limit', self.search_limit, MAX_PAGE_SIZE)
+            try:
+                result = self.repository.query(order_by=params.get('order_by', [None])[0], limit=limit, **conditions)
+            except ValueError as error:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, str(error))
+            body = {'users': [public_user(user) for user in result]}
+            if params.get('explain', ['0'])[0] not in ('', '0'):
+                body['plan'] = result.plan.to_dict()
+            return HTTPStatus.OK, body
+        if 'email' in params:
+            user = self.repository.get_by_email(params['email'][0])
+            users = [user] if user else []
+        elif 'name' in params:
+            limit = _int_param(params, 'limit', self.search_limit, MAX_PAGE_SIZE)
+            users = self.repository.find_by_name(params['name'][0], limit=limit)
+        else:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "search by name, email, name_prefix, name_contains or email_domain")
+        return HTTPStatus.OK, {'users': [public_user(user) for user in users]}
+
+    def get(self, user_id: str) -> Tuple[HTTPStatus, Any]:
+        """
+        Get a user by UserID.
+        """
+        user = self.repository.get_by_id(user_id)
+        if user is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, "user not found")
+        return HTTPStatus.OK, public_user(user)
+
+    def update(self, user_id: str, body: Dict[str, Any]) -> Tuple[HTTPStatus, Any]:
+        """
+        Change the name, email and/or password of a user.
+        With a "version" in the body the update only applies if the user is
+        still at that version; otherwise 409 is returned with the current user.
+        """
+        fields = {key: body[key] for key in UPDATABLE_FIELDS if key in body}
+        if not fields or not all(isinstance(value, str) for value in fields.values()):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "name, email or password is required")
+        version = body.get('version')
+        if version is not None and (not isinstance(version, int) or isinstance(version, bool)):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "version must be an integer")
+        if 'name' in fields and not fields['name']:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "missing name")
+        if 'email' in fields and not validation.validate_email(fields['email']):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "invalid email")
+        if 'password' in fields:
+            if not validation.validate_password(fields['password']):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "invalid password")
+            fields['password'] = self.hasher.hash(fields['password'])
+        try:
+            user = self.repository.update_user(user_id, version, **fields)
+        except VersionConflictError:
+            current = self.repository.get_by_id(user_id)
+            return HTTPStatus.CONFLICT, {'error': "version conflict",
+                                         'current': public_user(current) if current else None}
+        except ValueError:
+            raise HTTPError(HTTPStatus.CONFLICT, "email already registered")
+        if user is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, "user not found")
+        return HTTPStatus.OK, public_user(user)
+
+    def delete(self, user_id: str) -> Tuple[HTTPStatus, Any]:
+        """
+        Delete a user by UserID.
+        """
+        if not self.repository.delete_by_id(user_id):
+            raise HTTPError(HTTPStatus.NOT_FOUND, "user not found")
+        return HTTPStatus.NO_CONTENT, None
+
+    def changes(self, params: Dict[str, List[str]]) -> Tuple[HTTPStatus, Any]:
+        """
+        Get the change events after a sequence number (since and limit query parameters).
+        """
+        feed = self.repository.change_feed
+        if feed is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, "the change feed is disabled")
+        since = _int_param(params, 'since', 0)
+        events = feed.changes_since(since, limit=_int_param(params, 'limit', MAX_PAGE_SIZE, MAX_PAGE_SIZE))
+        return HTTPStatus.OK, {
+            'changes': [dict(event.to_dict(), user=public_user(User.from_dict(event.user))) for event in events],
+            'last_seq': events[-1].seq if events else since,
+        }
+
+    def login(self, body: Dict[str, Any], client: str) -> Tuple[HTTPStatus, Any]:
+        """
+        Check {"email", "password"} credentials, rate limited per email and client address.
+        """
+        email, password = body.get('email'), body.get('password')
+        if not isinstance(email, str) or not isinstance(password, str):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "email and password are required")
+        try:
+            user = self.authenticator.authenticate(email, password, ip=client)
+        except RateLimitError:
+            raise HTTPError(HTTPStatus.TOO_MANY_REQUESTS, "too many login attempts")
+        if user is None:
+            raise HTTPError(HTTPStatus.UNAUTHORIZED, "invalid credentials")
+        return HTTPStatus.OK, public_user(user)
+
+class UserRequestHandler(BaseHTTPRequestHandler):
+    """
+    Routes requests to the server's UserService.
+
+    Routes:
+        POST   /users              register ({"name", "email", "password"})
+        GET    /users              list (?offset=&limit=)
+        GET    /users/search       search (?name=&limit=, ?email=, or ?name_prefix=&name_contains=&email_domain=
+                                   &order_by=&limit=&explain=1)
+        GET    /users/<user_id>    get by UserID
+        PATCH  /users/<user_id>    update ({"name", "email", "password"}, optional "version")
+        DELETE /users/<user_id>    delete by UserID
+        POST   /login              check credentials ({"email", "password"})
+        GET    /changes            change events after a sequence number (?since=&limit=)
+        GET    /metrics            recorded metrics (Prometheus text, or JSON with ?format=json)
+
+    HTTP/1.1 is used so clients can keep connections open between requests.
+    """
+
+    protocol_version = "HTTP/1.1"
+    server_version = "UserManagement/1.0"
+    # Headers and body are separate writes; with Nagle on, keep-alive responses stall on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _read_json(self) -> Dict[str, Any]:
+        header = (self.headers.get('Content-Length') or '0').strip()
+        if not header.isdigit() or not header.isascii():
+            self.close_connection = True  # the body's end is unknown, so the stream cannot be resynchronized
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "invalid Content-Length")
+        length = int(header)
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True  # the unread body would be parsed as the next request
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "request body too large")
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "invalid JSON body")
+        if not isinstance(body, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "JSON body must be an object")
+        return body
+
+    def _send(self, status: HTTPStatus, body: Any, content_type: str = 'application/json') -> None:
+        if isinstance(body, str):
+            data = body.encode()
+        else:
+            data = b'' if body is None else json.dumps(body).encode()
+        self.send_response(status)
+        if data:
+            self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _dispatch(self, method: str) -> None:
+        service = self.server.service
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        params = parse_qs(url.query)
+        if method == 'GET' and parts == ['metrics']:
+            if params.get('format') == ['json']:
+                self._send(HTTPStatus.OK, metrics.REGISTRY.snapshot())
+            else:
+                self._send(HTTPStatus.OK, metrics.REGISTRY.to_prometheus(), 'text/plain; version=0.0.4')
+            return
+        start = time.perf_counter()
+        route = 'unmatched'
+        try:
+            if method == 'POST' and parts == ['users']:
+                route = '/users'
+                status, body = service.register(self._read_json())
+            elif method == 'POST' and parts == ['login']:
+                route = '/login'
+                status, body = service.login(self._read_json(), self.client_address[0])
+            elif method == 'GET' and parts == ['users']:
+                route = '/users'
+                status, body = service.list(params)
+            elif method == 'GET' and parts == ['changes']:
+                route = '/changes'
+                status, body = service.changes(params)
+            elif method == 'GET' and parts == ['users', 'search']:
+                route = '/users/search'
+                status, body = service.search(params)
+            elif method == 'GET' and len(parts) == 2 and parts[0] == 'users':
+                route = '/users/<id>'
+                status, body = service.get(parts[1])
+            elif method == 'PATCH' and len(parts) == 2 and parts[0] == 'users':
+                route = '/users/<id>'
+                status, body = service.update(parts[1], self._read_json())
+            elif method == 'DELETE' and len(parts) == 2 and parts[0] == 'users':
+                route = '/users/<id>'
+                status, body = service.delete(parts[1])
+            else:
+                raise HTTPError(HTTPStatus.NOT_FOUND, "no such endpoint")
+        except HTTPError as error:
+            status, body = error.status, {'error': error.message}
+        self._send(status, body)
+        if metrics.REGISTRY.enabled:
+            metrics.observe('http_request_duration_seconds', time.perf_counter() - start,
+                            method=method, route=route, status=str(int(status)))
+
+    def do_GET(self) -> None:
+        self._dispatch('GET')
+
+    def do_POST(self) -> None:
+        self._dispatch('POST')
+
+    def do_PATCH(self) -> None:
+        self._dispatch('PATCH')
+
+    def do_DELETE(self) -> None:
+        self._dispatch('DELETE')
+
+class UserHTTPServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server holding the UserService shared by its request threads.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], service: UserService, verbose: bool = False,
+                 bind_and_activate: bool = True):
+        super().__init__(address, UserRequestHandler, bind_and_activate=bind_and_activate)
+        self.service = service
+        self.verbose = verbose
+
+def service_from_config() -> UserService:
+    """
+    Build a UserService for the configured data store (same settings as the console app).
+    Returns:
+        UserService: Service with a freshly opened repository
+    """
+    metrics.configure()
+    repository = read_cache_from_config(create_repository(
+        config('DATA_FILE_PATH', default='data/users.json'),
+        config('STORAGE_BACKEND', default=''),
+        config('MIGRATE_FROM_JSON', default=''),
+        config('CHANGE_FEED', default=False, cast=bool)
+    ))
+    return UserService(repository, hasher_from_config(),
+                       config('PAGE_SIZE', default=20, cast=int), config('SEARCH_LIMIT', default=10, cast=int),
+                       config('LOGIN_RATE', default=1.0, cast=float), config('LOGIN_BURST', default=5, cast=int))
+
+def serve(host: str, port: int, workers: int = 1, verbose: bool = False) -> None:
+    """
+    Serve the API until interrupted.
+
+    With several workers the listening socket is opened once and the process
+    forks that many children, each accepting connections on the shared socket
+    with its own warm repository. The repositories' file locks keep the shared
+    data store consistent and each one reloads what the others write.
+
+    Args:
+        host (str): Address to listen on
+        port (int): Port to listen on
+        workers (int): Number of worker processes (1 serves in this process)
+        verbose (bool): Log every request to stderr
+    """
+    if workers <= 1:
+        with UserHTTPServer((host, port), service_from_config(), verbose) as server:
+            print(f"Serving on http://{host}:{server.server_address[1]}", file=sys.stderr)
+            server.serve_forever()
+        return
+    listener = socket.create_server((host, port), backlog=128)
+    # Every worker is woken for each connection; non-blocking accept() lets the losers go back to waiting
+    listener.setblocking(False)
+    print(f"Serving on http://{host}:{listener.getsockname()[1]} with {workers} workers", file=sys.stderr)
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            server = UserHTTPServer(listener.getsockname()[:2], service_from_config(), verbose,
+                                    bind_and_activate=False)
+            server.socket.close()
+            server.socket = listener
+            try:
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        children.append(pid)
+    try:
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        for pid in children:
+            os.waitpid(pid, 0)
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        listener.close()
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the HTTP service command line.
+    Args:
+        argv (Optional[List[str]]): Command line arguments (defaults to sys.argv)
+    Returns:
+        int: Process exit code
+    """
+    parser = argparse.ArgumentParser(prog="python -m src.server", description="Serve the user API over HTTP.")
+    parser.add_argument('--host', default=config('HTTP_HOST', default='127.0.0.1'))
+    parser.add_argument('--port', type=int, default=config('HTTP_PORT', default=8000, cast=int))
+    parser.add_argument('--workers', type=int, default=config('HTTP_WORKERS', default=1, cast=int),
+                        help="Pre-forked worker processes")
+    parser.add_argument('--verbose', action='store_true', help="Log every request")
+    args = parser.parse_args(argv)
+    if args.workers > 1 and not hasattr(os, 'fork'):
+        parser.error("--workers needs os.fork (not available on this platform)")
+    try:
+        serve(args.host, args.port, args.workers, args.verbose)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,755 @@
+import argparse
+import heapq
+import json
+import os
+import sys
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from decouple import config
+from .changes import ChangeFeed
+from .locking import atomic_write
+from .models import User
+from .query import QueryPlan, QueryResult, UserQuery
+from .repository import (SQLITE_EXTENSIONS, UserRepository, batched, create_repository, read_operation,
+                         stage_updates, write_operation)
+
+DEFAULT_SHARDS = 4
+# Files a shard backend may keep next to its data file
+SHARD_SIDE_FILES = ('', '.lock', '.names', '.snapshot', '.log', '-wal', '-shm')
+
+def shard_of(user_id: str, shards: int) -> int:
+    """
+    Get the shard a UserID belongs to.
+    A CRC32 of the UserID is used rather than hash(), which changes between processes.
+    Args:
+        user_id (str): UserID (UUID)
+        shards (int): Number of shards
+    Returns:
+        int: Shard number, from 0 to shards - 1
+    """
+    return zlib.crc32(user_id.encode()) % shards
+
+class ShardedUserRepository(UserRepository):
+    """
+    Repository that hash-partitions users by user_id across several data stores.
+
+    Each shard is an ordinary repository of the configured backend (cached
+    JSON files by default, or SQLite databases) stored at
+    "<name>.shard-<N>-<i><ext>" next to file_path. The layout (shard count and
+    backend) is kept in the "<file_path>.shards" manifest.
+
+    Operations by UserID go to a single shard. A global email -> UserID index
+    (built from the shards and rebuilt per shard when a shard changes on
+    disk) routes email lookups to a single shard too. Full reads
+    (get_all_users, find_by_name) fan out to every shard on a thread pool and
+    merge the results. Writes hold the repository-wide lock, so email
+    uniqueness holds across shards, but each one rewrites only its shard.
+    """
+
+    def __init__(self, file_path: str = "data/users.json", shards: Optional[int] = None,
+                 shard_backend: Optional[str] = None, workers: Optional[int] = None,
+                 migrate_from: Optional[str] = None):
+        """
+        Initialize the ShardedUserRepository.
+
+        Args:
+            file_path (str): Base path of the data store (the shard files are created next to it)
+            shards (Optional[int]): Number of shards for a new data store (SHARD_COUNT, default 4);
+                an existing data store keeps its layout, see reshard()
+            shard_backend (Optional[str]): Backend of each shard for a new data store
+                ("json", "cached", "log" or "sqlite"; SHARD_BACKEND, default "cached")
+            workers (Optional[int]): Threads used to fan out to the shards (one per shard if None)
+            migrate_from (Optional[str]): JSON file to import users from when the data store is empty
+        """
+        self._initial_layout = (shards, shard_backend)
+        self.workers = workers
+        self.shards: List[UserRepository] = []
+        self.shard_backend = ''
+        self._layout_stamp: Optional[Tuple[int, int]] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._index_lock = threading.RLock()
+        self._email_index: Dict[str, str] = {}
+        self._id_index: Dict[str, str] = {}
+        self._shard_emails: List[Set[str]] = []
+        self._index_stamps: List[Optional[tuple]] = []
+        super().__init__(file_path)
+        self._prepare()
+        if migrate_from and os.path.exists(migrate_from) and not any(True for _ in self.iter_users()):
+            self.bulk_add_users(UserRepository(migrate_from).iter_users())
+
+    @property
+    def change_feed(self) -> Optional[ChangeFeed]:
+        """
+        Change feed shared by all shards: each shard publishes the changes it commits.
+        """
+        return self._change_feed
+
+    @change_feed.setter
+    def change_feed(self, feed: Optional[ChangeFeed]) -> None:
+        self._change_feed = feed
+        for shard in self.shards:
+            shard.change_feed = feed
+
+    @property
+    def manifest_path(self) -> str:
+        """
+        Path of the manifest describing the shard layout.
+        """
+        return self.file_path + ".shards"
+
+    def shard_path(self, index: int, count: Optional[int] = None, backend: Optional[str] = None) -> str:
+        """
+        Get the data file of one shard.
+
+        Args:
+            index (int): Shard number
+            count (Optional[int]): Number of shards in the layout (the current one if None)
+            backend (Optional[str]): Shard backend (the current one if None)
+
+        Returns:
+            str: Path of the shard's data file
+        """
+        root, ext = os.path.splitext(self.file_path)
+        if (backend or self.shard_backend) == "sqlite" and ext.lower() not in SQLITE_EXTENSIONS:
+            ext = ".db"
+        return f"{root}.shard-{count or len(self.shards)}-{index}{ext or '.json'}"
+
+    def _ensure_data_directory(self) -> None:
+        """
+        Ensure the data directory and the manifest exist, and open the shards.
+        """
+        os.makedirs(os.path.dirname(self.file_path) or '.', exist_ok=True)
+        with self._exclusive():
+            if not os.path.exists(self.manifest_path):
+                shards, backend = self._initial_layout
+                self._write_manifest(shards or config('SHARD_COUNT', default=DEFAULT_SHARDS, cast=int),
+                                     backend or config('SHARD_BACKEND', default='cached'))
+            self._open_layout()
+
+    def _write_manifest(self, shards: int, backend: str) -> None:
+        """
+        Atomically write the manifest for a layout.
+        """
+        if shards < 1:
+            raise ValueError("The number of shards must be at least 1")
+        with atomic_write(self.manifest_path) as f:
+            json.dump({'shards': shards, 'backend': backend}, f)
+
+    def _manifest_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _open_layout(self) -> None:
+        """
+        Open the shards listed in the manifest and reset the email index.
+        """
+        stamp = self._manifest_stamp()
+        with open(self.manifest_path) as f:
+            manifest = json.load(f)
+        self.close()
+        count, self.shard_backend = manifest['shards'], manifest['backend']
+        self.shards = [create_repository(self.shard_path(index, count), self.shard_backend) for index in range(count)]
+        for shard in self.shards:
+            shard.change_feed = self._change_feed
+            shard.change_listeners = self.change_listeners
+        self._pool = ThreadPoolExecutor(max_workers=self.workers or count, thread_name_prefix="shard")
+        with self._index_lock:
+            self._email_index, self._id_index = {}, {}
+            self._shard_emails = [set() for _ in range(count)]
+            self._index_stamps = [None] * count
+        self._layout_stamp = stamp
+
+    def _check_layout(self) -> None:
+        """
+        Reopen the shards if the manifest changed (e.g. another process resharded).
+        """
+        if self._manifest_stamp() == self._layout_stamp:
+            return
+        if self._rwlock.owned_for_write():
+            self._open_layout()
+        elif not self._rwlock.owned_for_read():
+            with self._rwlock.write_locked():
+                if self._manifest_stamp() != self._layout_stamp:
+                    self._open_layout()
+
+    def _before_read(self) -> None:
+        """
+        Pick up a new shard layout before a read operation takes the read lock.
+        """
+        self._check_layout()
+
+    def close(self) -> None:
+        """
+        Stop the fan-out threads and close the shards that hold connections.
+        """
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        for shard in self.shards:
+            if hasattr(shard, 'close'):
+                shard.close()
+
+    def save_snapshot(self) -> None:
+        """
+        Save the warm-start files of the shards whose backend keeps any.
+        """
+        self._check_layout()
+        self._fan_out(lambda i: getattr(self.shards[i], 'save_snapshot', lambda: None)())
+
+    def _shard(self, user_id: str) -> int:
+        return shard_of(user_id, len(self.shards))
+
+    def _fan_out(self, fn: Callable[[int], Any], shards: Optional[Iterable[int]] = None) -> List[Any]:
+        """
+        Run fn for several shards in parallel.
+
+        Args:
+            fn (Callable[[int], Any]): Function called with each shard number
+            shards (Optional[Iterable[int]]): Shard numbers (all if None)
+
+        Returns:
+            List[Any]: fn's results, in the order of shards
+        """
+        indexes = list(range(len(self.shards)) if shards is None else shards)
+        if len(indexes) == 1:
+            return [fn(indexes[0])]
+        return list(self._pool.map(fn, indexes))
+
+    def _shard_stamp(self, index: int) -> tuple:
+        """
+        Get the on-disk identity of a shard (its data file, log and SQLite WAL).
+        """
+        path = self.shards[index].file_path
+        stamps = []
+        for suffix in ('', '.log', '-wal'):
+            try:
+                stat = os.stat(path + suffix)
+                stamps.append((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def _index_set(self, email: str, user_id: str) -> None:
+        self._email_index[email] = user_id
+        self._id_index[user_id] = email
+        self._shard_emails[self._shard(user_id)].add(email)
+
+    def _index_discard(self, user_id: str) -> None:
+        email = self._id_index.pop(user_id, None)
+        if email is not None:
+            if self._email_index.get(email) == user_id:
+                del self._email_index[email]
+            self._shard_emails[self._shard(user_id)].discard(email)
+
+    def _refresh_index(self) -> None:
+        """
+        Re-index the emails of the shards that changed on disk since they were indexed.
+        """
+        with self._index_lock:
+            stamps = [self._shard_stamp(index) for index in range(len(self.shards))]
+            stale = [index for index, stamp in enumerate(stamps) if stamp != self._index_stamps[index]]
+            if not stale:
+                return
+            entries = self._fan_out(lambda i: [(user.email, user.user_id) for user in self.shards[i].iter_users()], stale)
+            for index, pairs in zip(stale, entries):
+                for email in self._shard_emails[index]:
+                    user_id = self._email_index.pop(email, None)
+                    self._id_index.pop(user_id, None)
+                self._shard_emails[index] = set()
+                for email, user_id in pairs:
+                    self._index_set(email, user_id)
+                self._index_stamps[index] = stamps[index]
+
+    def _on_shard(self, index: int, method: Callable, *args) -> Any:
+        """
+        Run a write on one shard, keeping its index stamp current.
+        The caller updates the email index itself; if the shard had changed
+        since it was indexed, it is left marked for re-indexing.
+        """
+        fresh = self._index_stamps[index] == self._shard_stamp(index)
+        result = method(*args)
+        self._index_stamps[index] = self._shard_stamp(index) if fresh else None
+        return result
+
+    def _load_users(self) -> List[User]:
+        """
+        Load the users of every shard, in shard order.
+
+        Returns:
+            List[User]: List of User objects
+        """
+        self._check_layout()
+        return list(chain.from_iterable(self._fan_out(lambda i: self.shards[i].get_all_users())))
+
+    def _save_users(self, users: List[User]) -> None:
+        """
+        Replace the content of every shard with its part of the given users.
+
+        Args:
+            users (List[User]): List of User objects to save
+        """
+        with self._exclusive():
+            self._check_layout()
+            parts: List[List[User]] = [[] for _ in self.shards]
+            for user in users:
+                parts[self._shard(user.user_id)].append(user)
+            self._fan_out(lambda i: self.shards[i]._save_users(parts[i]))
+            with self._index_lock:
+                self._index_stamps = [None] * len(self.shards)
+
+    @write_operation
+    def restore_users(self, users: List[User]) -> None:
+        """
+        Replace the whole content of the data store, restoring the shards in parallel.
+
+        Args:
+            users (List[User]): The new content
+        """
+        self._check_layout()
+        parts: List[List[User]] = [[] for _ in self.shards]
+        for user in users:
+            parts[self._shard(user.user_id)].append(user)
+        self._fan_out(lambda i: self.shards[i].restore_users(parts[i]))
+        with self._index_lock:
+            self._index_stamps = [None] * len(self.shards)
+
+    @write_operation
+    def add_user(self, user: User) -> bool:
+        """
+        Add a new user to its shard.
+
+        Args:
+            user (User): User object to add
+
+        Returns:
+            bool: True if user was added successfully, False if the email or UserID already exists
+        """
+        self._check_layout()
+        self._refresh_index()
+        if user.email in self._email_index or user.user_id in self._id_index:
+            return False
+        index = self._shard(user.user_id)
+        added = self._on_shard(index, self.shards[index].add_user, user)
+        if added:
+            with self._index_lock:
+                self._index_set(user.email, user.user_id)
+        return added
+
+    @write_operation
+    def bulk_add_users(self, users: Iterable[User], batch_size: int = 10000) -> int:
+        """
+        Add many users, writing each batch to the shards in parallel.
+
+        Args:
+            users (Iterable[User]): Users to add, consumed lazily
+            batch_size (int): Number of users per batch (split across the shards)
+
+        Returns:
+            int: Number of users added
+        """
+        self._check_layout()
+        self._refresh_index()
+        added = 0
+        for batch in batched(users, batch_size):
+            parts: Dict[int, List[User]] = {}
+            emails: Set[str] = set()
+            user_ids: Set[str] = set()
+            for user in batch:
+                if (user.email in self._email_index or user.email in emails or user.user_id in self._id_index
+                        or user.user_id in user_ids):
+                    continue
+                emails.add(user.email)
+                user_ids.add(user.user_id)
+                parts.setdefault(self._shard(user.user_id), []).append(user)
+            indexes = list(parts)
+            counts = self._fan_out(lambda i: self._on_shard(i, self.shards[i].bulk_add_users, parts[i], batch_size),
+                                   indexes)
+            with self._index_lock:
+                for index, count in zip(indexes, counts):
+                    for user in parts[index]:
+                        self._index_set(user.email, user.user_id)
+                    if count != len(parts[index]):
+                        self._index_stamps[index] = None
+            added += sum(counts)
+        return added
+
+    @write_operation
+    def apply_batch(self, operations: List[Tuple[str, Any]]) -> List[bool]:
+        """
+        Apply several changes in order, with one commit per shard involved.
+
+        The operations are first resolved against the email index, so each
+        shard only receives the operations that apply to it.
+
+        Args:
+            operations (List[Tuple[str, Any]]): ("add", User), ("delete", email) or ("delete_id", user_id) pairs
+
+        Returns:
+            List[bool]: Result of each operation, as add_user/delete_user/delete_by_id would return it
+
+        Raises:
+            ValueError: If an operation name is unknown
+        """
+        self._check_layout()
+        self._refresh_index()
+        # Email -> UserID and UserID -> email as they will be after the operations so far (None: removed)
+        owners: Dict[str, Optional[str]] = {}
+        emails: Dict[str, Optional[str]] = {}
+        routed: Dict[int, List[Tuple[int, Tuple[str, Any]]]] = {}
+        results = [False] * len(operations)
+        for position, (operation, argument) in enumerate(operations):
+            if operation == "add":
+                if (owners.get(argument.email, self._email_index.get(argument.email)) is not None
+                        or emails.get(argument.user_id, self._id_index.get(argument.user_id)) is not None):
+                    continue
+                owners[argument.email], emails[argument.user_id] = argument.user_id, argument.email
+                routed.setdefault(self._shard(argument.user_id), []).append((position, (operation, argument)))
+            elif operation in ("delete", "delete_id"):
+                if operation == "delete":
+                    user_id = owners.get(argument, self._email_index.get(argument))
+                else:
+                    user_id = argument
+                email = emails.get(user_id, self._id_index.get(user_id)) if user_id is not None else None
+                if email is None:
+                    continue
+                owners[email], emails[user_id] = None, None
+                routed.setdefault(self._shard(user_id), []).append((position, ("delete_id", user_id)))
+            else:
+                raise ValueError(f"Unknown operation: {operation}")
+        indexes = list(routed)
+        outcomes = self._fan_out(lambda i: self._on_shard(i, self.shards[i].apply_batch, [op for _, op in routed[i]]),
+                                 indexes)
+        with self._index_lock:
+            for index, shard_results in zip(indexes, outcomes):
+                for (position, (operation, argument)), result in zip(routed[index], shard_results):
+                    results[position] = result
+                    if not result:
+                        continue
+                    if operation == "add":
+                        self._index_set(argument.email, argument.user_id)
+                    else:
+                        self._index_discard(argument)
+        return results
+
+    @write_operation
+    def update_many(self, updates: Iterable[Dict[str, Any]]) -> List[Optional[User]]:
+        """
+        Apply several updates, with one commit per shard involved.
+
+        Versions and emails are checked against all shards before any shard is
+        written, so a stale or colliding update leaves every shard unchanged.
+
+        Args:
+            updates (Iterable[Dict[str, Any]]): Updates to apply in order (see UserRepository.update_many)
+
+        Returns:
+            List[Optional[User]]: The updated user for each update, None for unknown UserIDs
+
+        Raises:
+            ValueError: If a field cannot be updated or a new email belongs to another user
+            VersionConflictError: If an expected version is stale
+        """
+        self._check_layout()
+        updates = list(updates)
+        self._refresh_index()
+        # Only the users being updated and the current owners of the new emails are needed
+        wanted = {update['user_id'] for update in updates}
+        wanted.update(self._email_index[update['email']] for update in updates
+                      if 'email' in update and update['email'] in self._email_index)
+        by_shard: Dict[int, List[str]] = {}
+        for user_id in wanted:
+            by_shard.setdefault(self._shard(user_id), []).append(user_id)
+        found = self._fan_out(lambda i: [self.shards[i].get_by_id(user_id) for user_id in by_shard[i]], list(by_shard))
+        by_id = {user.user_id: user for user in chain.from_iterable(found) if user is not None}
+        results, changed = stage_updates(by_id, {user.email: user for user in by_id.values()}, updates)
+        if not changed:
+            return results
+        routed: Dict[int, List[Dict[str, Any]]] = {}
+        for update in updates:
+            if update['user_id'] in changed:
+                routed.setdefault(self._shard(update['user_id']), []).append(update)
+        indexes = list(routed)
+        self._fan_out(lambda i: self._on_shard(i, self.shards[i].update_many, routed[i]), indexes)
+        with self._index_lock:
+            for user_id in changed:
+                self._index_discard(user_id)
+            for user_id, user in changed.items():
+                self._index_set(user.email, user_id)
+        return results
+
+    def iter_users(self) -> Iterator[User]:
+        """
+        Iterate over the users of every shard, one shard after the other.
+
+        Returns:
+            Iterator[User]: Iterator over User objects
+        """
+        self._check_layout()
+        return chain.from_iterable(shard.iter_users() for shard in list(self.shards))
+
+    @read_operation
+    def get_by_email(self, email: str) -> Optional[User]:
+        """
+        Get a user by email, reading only the shard the email index points to.
+
+        Args:
+            email (str): Email of the user to look up
+
+        Returns:
+            Optional[User]: The matching User, or None if not found
+        """
+        for attempt in range(2):
+            user_id = self._email_index.get(email)
+            if user_id is not None:
+                user = self.shards[self._shard(user_id)].get_by_email(email)
+                if user is not None and user.user_id == user_id:
+                    return user
+            if attempt == 0:
+                # A miss may come from a change made by another process: re-index the changed shards once
+                self._refresh_index()
+        return None
+
+    @read_operation
+    def get_by_id(self, user_id: str) -> Optional[User]:
+        """
+        Get a user by UserID from its shard.
+
+        Args:
+            user_id (str): UserID (UUID) of the user to look up
+
+        Returns:
+            Optional[User]: The matching User, or None if not found
+        """
+        return self.shards[self._shard(user_id)].get_by_id(user_id)
+
+    @read_operation
+    def get_all_users(self) -> List[User]:
+        """
+        Get all users, reading the shards in parallel.
+
+        Returns:
+            List[User]: List of all User objects, in shard order
+        """
+        return list(chain.from_iterable(self._fan_out(lambda i: self.shards[i].get_all_users())))
+
+    @read_operation
+    def find_by_name(self, name: str, limit: Optional[int] = None) -> List[User]:
+        """
+        Find users by name (case-insensitive partial match) on all shards in parallel.
+        Names starting with the search text are returned first, in name order,
+        followed by the other matches in shard order.
+
+        Args:
+            name (str): Name to search for
+            limit (Optional[int]): Maximum number of results (all if None)
+
+        Returns:
+            List[User]: List of matching User objects
+        """
+        name_lower = name.lower()
+        # Each shard returns its best matches already ranked, so its first limit results are enough
+        per_shard = self._fan_out(lambda i: self.shards[i].find_by_name(name, limit))
+        prefixed, others = [], []
+        for matches in per_shard:
+            split = next((i for i, user in enumerate(matches) if not user.name.lower().startswith(name_lower)),
+                         len(matches))
+            prefixed.append(matches[:split])
+            others.append(matches[split:])
+        merged = chain(heapq.merge(*prefixed, key=lambda user: user.name.lower()), chain.from_iterable(others))
+        return list(islice(merged, limit))
+
+    def _run_query(self, query: UserQuery) -> QueryResult:
+        """
+        Run a query on the shards that can hold matches (one for a UserID,
+        all otherwise) and combine their results.
+        Unordered results are streamed one shard after the other. For an
+        ordered query each shard returns its own top limit users in order, in
+        parallel, and the lists are merged. The plan lists the shard plans as parts.
+
+        Args:
+            query (UserQuery): The query
+
+        Returns:
+            QueryResult: The combined results
+        """
+        self._check_layout()
+        criteria = query.criteria()
+        shards = [self._shard(query.user_id)] if query.user_id is not None else range(len(self.shards))
+        if query.order_field is None:
+            results = [self.shards[i].query(**criteria) for i in shards]
+            plans = [result.plan for result in results]
+            users = islice(chain.from_iterable(results), query.limit)
+            order = 'storage'
+        else:
+            def run(i: int) -> Tuple[QueryPlan, List[User]]:
+                result = self.shards[i].query(**criteria)
+                return result.plan, list(result)
+            plans, per_shard = zip(*self._fan_out(run, shards))
+            users = islice(heapq.merge(*per_shard, key=query.sort_key(), reverse=query.descending), query.limit)
+            order = 'merge'
+        indexes = {plan.index for plan in plans}
+        counts = [plan.candidates for plan in plans]
+        same_index = len(indexes) == 1
+        plan = QueryPlan(indexes.pop() if same_index else None, None if None in counts else sum(counts),
+                         plans[0].filters if same_index else query.conditions(), order,
+                         f"{len(plans)} of {len(self.shards)} shards", list(plans))
+        return QueryResult(plan, users)
+
+    @write_operation
+    def delete_user(self, email: str) -> bool:
+        """
+        Delete a user by email from the shard the email index points to.
+
+        Args:
+            email (str): Email of the user to delete
+
+        Returns:
+            bool: True if user was deleted, False if user not found
+        """
+        self._check_layout()
+        self._refresh_index()
+        user_id = self._email_index.get(email)
+        return user_id is not None and self.delete_by_id(user_id)
+
+    @write_operation
+    def delete_by_id(self, user_id: str) -> bool:
+        """
+        Delete a user by UserID from its shard.
+
+        Args:
+            user_id (str): UserID (UUID) of the user to delete
+
+        Returns:
+            bool: True if user was deleted, False if user not found
+        """
+        self._check_layout()
+        index = self._shard(user_id)
+        deleted = self._on_shard(index, self.shards[index].delete_by_id, user_id)
+        if deleted:
+            with self._index_lock:
+                self._index_discard(user_id)
+        return deleted
+
+    @write_operation
+    def delete_many(self, user_ids: Iterable[str]) -> int:
+        """
+        Delete several users by UserID, with one commit per shard involved.
+
+        Args:
+            user_ids (Iterable[str]): UserIDs of the users to delete
+
+        Returns:
+            int: Number of users deleted
+        """
+        self._check_layout()
+        by_shard: Dict[int, Set[str]] = {}
+        for user_id in user_ids:
+            by_shard.setdefault(self._shard(user_id), set()).add(user_id)
+        indexes = list(by_shard)
+        counts = self._fan_out(lambda i: self._on_shard(i, self.shards[i].delete_many, by_shard[i]), indexes)
+        with self._index_lock:
+            for index, count in zip(indexes, counts):
+                if count:
+                    for user_id in by_shard[index]:
+                        self._index_discard(user_id)
+        return sum(counts)
+
+    def reshard(self, shards: int) -> int:
+        """
+        Move the users to a layout with more shards, while the repository stays in use.
+
+        The users are first copied to the new shards without blocking anyone.
+        Then, under the write lock, the changes made meanwhile are carried over,
+        the manifest is switched and the old shard files are removed. Other
+        processes pick up the new layout on their next operation.
+
+        Args:
+            shards (int): New number of shards (more than the current number)
+
+        Returns:
+            int: Number of users moved
+
+        Raises:
+            ValueError: If shards is not more than the current number of shards
+        """
+        self._check_layout()
+        old_paths = [shard.file_path for shard in self.shards]
+        if shards <= len(old_paths):
+            raise ValueError(f"Resharding can only grow the layout (currently {len(old_paths)} shards)")
+        backend = self.shard_backend
+        new_paths = [self.shard_path(index, shards, backend) for index in range(shards)]
+        self._remove_files(new_paths)  # leftovers of an interrupted run
+        targets = [create_repository(path, backend) for path in new_paths]
+
+        def copy(users: Iterable[User]) -> None:
+            parts: List[List[User]] = [[] for _ in targets]
+            for user in users:
+                parts[shard_of(user.user_id, shards)].append(user)
+            for target, part in zip(targets, parts):
+                if part:
+                    target.bulk_add_users(part)
+
+        snapshot = {user.user_id: user.to_dict() for user in self.get_all_users()}
+        copy(User.from_dict(data) for data in snapshot.values())
+        with self._exclusive():
+            self._check_layout()
+            current = {user.user_id: user for user in self._load_users()}
+            removed = [user_id for user_id in snapshot if user_id not in current]
+            changed = [user for user_id, user in current.items() if snapshot.get(user_id) != user.to_dict()]
+            for target in targets:
+                target.delete_many(removed + [user.user_id for user in changed])
+            copy(changed)
+            for target in targets:
+                if hasattr(target, 'close'):
+                    target.close()
+            self._write_manifest(shards, backend)
+            self._open_layout()
+            self._remove_files(old_paths)
+        return len(current)
+
+    @staticmethod
+    def _remove_files(paths: List[str]) -> None:
+        """
+        Remove shard data files and the files their backend keeps next to them.
+        """
+        for path in paths:
+            for suffix in SHARD_SIDE_FILES:
+                try:
+                    os.remove(path + suffix)
+                except FileNotFoundError:
+                    pass
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the shard maintenance command line.
+    Args:
+        argv (Optional[List[str]]): Command line arguments (defaults to sys.argv)
+    Returns:
+        int: Process exit code
+    """
+    parser = argparse.ArgumentParser(prog="python -m src.sharded_repository",
+                                     description="Inspect or grow the shard layout of DATA_FILE_PATH.")
+    parser.add_argument('command', choices=['status', 'reshard'])
+    parser.add_argument('--shards', type=int, help="New number of shards (reshard)")
+    args = parser.parse_args(argv)
+
+    repository = ShardedUserRepository(config('DATA_FILE_PATH', default='data/users.json'))
+    if args.command == 'reshard':
+        if not args.shards:
+            parser.error("reshard needs --shards")
+        moved = repository.reshard(args.shards)
+        print(f"Moved {moved} users to {args.shards} shards", file=sys.stderr)
+    for index, shard in enumerate(repository.shards):
+        count = sum(1 for _ in shard.iter_users())
+        print(f"shard {index}: {count} users ({shard.file_path})")
+    repository.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
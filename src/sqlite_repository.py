@@ -0,0 +1,602 @@
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from . import metrics
+from .models import User
+from .query import QueryPlan, QueryResult, UserQuery
+from .repository import UserRepository, VersionConflictError, batched, update_changes, updated_user
+
+# SQL statements are kept as constants so sqlite3's per-connection statement
+# cache hands back the already prepared statement on every call.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    password TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1,
+    name_lower TEXT NOT NULL DEFAULT ''
+);
+"""
+# Created after the older schemas are upgraded (see SqliteUserRepository._connection)
+_INDEXES = """
+DROP INDEX IF EXISTS users_name;
+CREATE UNIQUE INDEX IF NOT EXISTS users_email ON users (email);
+CREATE INDEX IF NOT EXISTS users_name_lower ON users (name_lower);
+CREATE INDEX IF NOT EXISTS users_email_domain ON users (lower(substr(email, instr(email, '@') + 1)));
+"""
+_COLUMNS = "user_id, name, email, password, version"
+# name_lower is the name lowercased by Python (SQLite's LIKE and NOCASE only fold ASCII letters),
+# so name conditions and order match UserQuery on every backend
+_INSERT = f"INSERT INTO users ({_COLUMNS}, name_lower) VALUES (?, ?, ?, ?, ?, ?)"
+_INSERT_OR_IGNORE = f"INSERT OR IGNORE INTO users ({_COLUMNS}, name_lower) VALUES (?, ?, ?, ?, ?, ?)"
+_SELECT_ALL = f"SELECT {_COLUMNS} FROM users ORDER BY rowid"
+_SELECT_PAGE = f"SELECT {_COLUMNS} FROM users ORDER BY rowid LIMIT ? OFFSET ?"
+_SELECT_BY_EMAIL = f"SELECT {_COLUMNS} FROM users WHERE email = ?"
+_SELECT_BY_ID = f"SELECT {_COLUMNS} FROM users WHERE user_id = ?"
+_SELECT_BY_NAME = (f"SELECT {_COLUMNS} FROM users WHERE instr(name_lower, ?1) > 0 "
+                   "ORDER BY instr(name_lower, ?1) <> 1, "
+                   "CASE WHEN instr(name_lower, ?1) = 1 THEN name_lower END, rowid LIMIT ?2")
+# Query conditions; each one can be answered by an index (see _QUERY_INDEXES)
+_QUERY_CONDITIONS = {
+    'user_id': "user_id = ?",
+    'email': "email = ?",
+    'email_domain': "lower(substr(email, instr(email, '@') + 1)) = ?",
+    'name_prefix': "name_lower >= ? AND name_lower < ?",
+    'name_contains': "instr(name_lower, ?) > 0",
+}
+_QUERY_ORDER = {'name': "name_lower", 'email': "email", 'user_id': "user_id", 'version': "version"}
+_QUERY_INDEXES = {'sqlite_autoindex_users_1': 'user_id', 'users_email': 'email',
+                  'users_email_domain': 'email_domain', 'users_name_lower': 'name'}
+_DELETE_BY_ID = "DELETE FROM users WHERE user_id = ?"
+_DELETE_ALL = "DELETE FROM users"
+_COUNT = "SELECT COUNT(*) FROM users"
+_TABLE_INFO = "PRAGMA table_info(users)"
+_ADD_VERSION = "ALTER TABLE users ADD COLUMN version INTEGER NOT NULL DEFAULT 1"
+_ADD_NAME_LOWER = "ALTER TABLE users ADD COLUMN name_lower TEXT NOT NULL DEFAULT ''"
+_FILL_NAME_LOWER = "UPDATE users SET name_lower = py_lower(name)"
+# Compare-and-set: the row is only written if it is still at the version that was read
+_UPDATE = ("UPDATE users SET name = ?, email = ?, password = ?, name_lower = ?, version = version + 1 "
+           "WHERE user_id = ? AND version = ?")
+
+def _row_to_user(row: tuple) -> User:
+    """
+    Build a User from a (user_id, name, email, password, version) row.
+    """
+    return User(name=row[1], email=row[2], password=row[3], user_id=row[0], version=row[4])
+
+def _user_to_row(user: User) -> tuple:
+    """
+    Convert a User to a (user_id, name, email, password, version, name_lower) row.
+    """
+    return (user.user_id, user.name, user.email, user.password, user.version, user.name.lower())
+
+def _query_sql(query: UserQuery) -> Tuple[str, List[Any]]:
+    """
+    Translate a query to a SELECT statement and its parameters.
+    """
+    where, params = [], []
+    for name, condition in _QUERY_CONDITIONS.items():
+        value = getattr(query, name)
+        if value is not None:
+            where.append(condition)
+            if name == 'name_prefix':
+                # Every name starting with the prefix sorts between it and it followed by the last code point
+                params.extend((value, value + '\U0010ffff'))
+            else:
+                params.append(value)
+    sql = f"SELECT {_COLUMNS} FROM users"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    if query.order_field is not None:
+        sql += f" ORDER BY {_QUERY_ORDER[query.order_field]}{' DESC' if query.descending else ''}"
+    if query.limit is not None:
+        sql += " LIMIT ?"
+        params.append(query.limit)
+    return sql, params
+
+def _delete_row(conn: sqlite3.Connection, select: str, key: str) -> Optional[User]:
+    """
+    Delete the row found by a select statement and return it as a User (None if not found).
+    """
+    row = conn.execute(select, (key,)).fetchone()
+    if row is None:
+        return None
+    conn.execute(_DELETE_BY_ID, (row[0],))
+    return _row_to_user(row)
+
+class SqliteUserRepository(UserRepository):
+    """
+    Repository that stores users in a SQLite database.
+
+    It has the same interface as UserRepository. user_id is the primary key and
+    email has a UNIQUE index, so duplicate checks, lookups and deletes are index
+    operations. The database runs in WAL mode so readers don't block the writer.
+
+    Changes are published after their transaction commits, so the change feed
+    never records a write that was rolled back. With a change feed, writes
+    hold the cross-process file lock from the transaction to the publication,
+    so sequence numbers follow commit order across processes.
+    """
+
+    def __init__(self, file_path: str = "data/users.db", migrate_from: Optional[str] = None):
+        """
+        Initialize the SqliteUserRepository.
+
+        Args:
+            file_path (str): Path to the SQLite database file
+            migrate_from (Optional[str]): JSON file to import users from when the database is empty
+        """
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_path: Optional[str] = None
+        self._lock = threading.RLock()
+        super().__init__(file_path)
+        if migrate_from and os.path.exists(migrate_from) and self.count() == 0:
+            self.migrate_from_json(migrate_from)
+
+    def _ensure_data_directory(self) -> None:
+        """
+        Ensure the data directory exists and the database schema is created.
+        """
+        self._connection()
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Get the connection for the current file_path, opening it if needed.
+
+        Returns:
+            sqlite3.Connection: Open database connection
+        """
+        if self._conn is None or self._conn_path != self.file_path:
+            if self._conn is not None:
+                self._conn.close()
+            os.makedirs(os.path.dirname(self.file_path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.file_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.create_function("py_lower", 1, str.lower, deterministic=True)
+            conn.executescript(_SCHEMA)
+            columns = {row[1] for row in conn.execute(_TABLE_INFO)}
+            if 'version' not in columns:
+                # Database created before records carried a version
+                with conn:
+                    conn.execute(_ADD_VERSION)
+            if 'name_lower' not in columns:
+                # Database created before names had a lowercased column
+                with conn:
+                    conn.execute(_ADD_NAME_LOWER)
+                    conn.execute(_FILL_NAME_LOWER)
+            conn.executescript(_INDEXES)
+            self._conn = conn
+            self._conn_path = self.file_path
+        return self._conn
+
+    @contextmanager
+    def _writing(self) -> Iterator[sqlite3.Connection]:
+        """
+        Hold the locks of a write whose changes are published after its commit.
+        """
+        with self._lock:
+            conn = self._connection()
+            with self._file_lock.locked(self.lock_path) if self.change_feed is not None else nullcontext():
+                yield conn
+
+    def close(self) -> None:
+        """
+        Close the database connection.
+        """
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _load_users(self) -> List[User]:
+        """
+        Load all users from the database.
+
+        Returns:
+            List[User]: List of User objects in insertion order
+        """
+        with self._lock:
+            users = [_row_to_user(row) for row in self._connection().execute(_SELECT_ALL)]
+        metrics.observe('repository_load_records', len(users), metrics.SIZE_BUCKETS)
+        return users
+
+    def snapshot_users(self) -> List[User]:
+        """
+        Get a consistent point-in-time copy of all users, for backups.
+        The rows are read on a connection of their own, whose read transaction
+        sees one WAL snapshot while this repository's connection keeps writing.
+
+        Returns:
+            List[User]: All users as of one commit
+        """
+        if not os.path.exists(self.file_path):
+            return []
+        conn = sqlite3.connect(self.file_path)
+        try:
+            rows = conn.execute(_SELECT_ALL).fetchall()
+        finally:
+            conn.close()
+        return [_row_to_user(row) for row in rows]
+
+    def _save_users(self, users: List[User]) -> None:
+        """
+        Replace the content of the database with the given users in one transaction.
+
+        Args:
+            users (List[User]): List of User objects to save
+        """
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(_DELETE_ALL)
+                conn.executemany(_INSERT, [_user_to_row(user) for user in users])
+
+    def count(self) -> int:
+        """
+        Count the users stored in the database.
+
+        Returns:
+            int: Number of users
+        """
+        with self._lock:
+            return self._connection().execute(_COUNT).fetchone()[0]
+
+    @metrics.timed("repository.add_user")
+    def add_user(self, user: User) -> bool:
+        """
+        Add a new user to the repository.
+
+        Args:
+            user (User): User object to add
+
+        Returns:
+            bool: True if user was added successfully, False if the email or UserID already exists
+        """
+        with self._writing() as conn:
+            try:
+                with conn:
+                    conn.execute(_INSERT, _user_to_row(user))
+            except sqlite3.IntegrityError:
+                return False
+            self._publish_changes([('add', user)])
+            return True
+
+    @metrics.timed("repository.bulk_add_users")
+    def bulk_add_users(self, users: Iterable[User], batch_size: int = 10000) -> int:
+        """
+        Add many users, committing one transaction per batch.
+        Duplicate emails are rejected by the UNIQUE index.
+
+        Args:
+            users (Iterable[User]): Users to add, consumed lazily
+            batch_size (int): Number of users per transaction
+
+        Returns:
+            int: Number of users added
+        """
+        with self._writing() as conn:
+            before = conn.total_changes
+            for batch in batched(users, batch_size):
+                if not self._publishes_changes:
+                    with conn:
+                        conn.executemany(_INSERT_OR_IGNORE, [_user_to_row(user) for user in batch])
+                    continue
+                with conn:
+                    # Row by row, to know which users were not ignored
+                    added = [user for user in batch if conn.execute(_INSERT_OR_IGNORE, _user_to_row(user)).rowcount]
+                self._publish_changes([('add', user) for user in added])
+            return conn.total_changes - before
+
+    @metrics.timed("repository.apply_batch")
+    def apply_batch(self, operations: List[Tuple[str, Any]]) -> List[bool]:
+        """
+        Apply several changes in order in one transaction.
+
+        Args:
+            operations (List[Tuple[str, Any]]): ("add", User), ("delete", email) or ("delete_id", user_id) pairs
+
+        Returns:
+            List[bool]: Result of each operation, as add_user/delete_user/delete_by_id would return it
+
+        Raises:
+            ValueError: If an operation name is unknown
+        """
+        results, changes = [], []
+        with self._writing() as conn:
+            with conn:
+                for operation, argument in operations:
+                    if operation == "add":
+                        try:
+                            conn.execute(_INSERT, _user_to_row(argument))
+                            changes.append(('add', argument))
+                            results.append(True)
+                        except sqlite3.IntegrityError:
+                            results.append(False)
+                    elif operation in ("delete", "delete_id"):
+                        deleted = _delete_row(conn, _SELECT_BY_EMAIL if operation == "delete" else _SELECT_BY_ID,
+                                              argument)
+                        if deleted is not None:
+                            changes.append(('delete', deleted))
+                        results.append(deleted is not None)
+                    else:
+                        raise ValueError(f"Unknown operation: {operation}")
+            self._publish_changes(changes)
+        return results
+
+    def iter_users(self, chunk_size: int = 1000) -> Iterator[User]:
+        """
+        Stream all users from the database without building the full list.
+
+        Args:
+            chunk_size (int): Number of rows fetched at a time
+
+        Returns:
+            Iterator[User]: Iterator over User objects in insertion order
+        """
+        return self._stream(_SELECT_ALL, (), chunk_size)
+
+    def _stream(self, sql: str, params: Iterable[Any], chunk_size: int = 1000) -> Iterator[User]:
+        """
+        Run a SELECT and yield its rows as users, fetching chunk_size rows at a time.
+        """
+        with self._lock:
+            cursor = self._connection().execute(sql, params)
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            for row in rows:
+                yield _row_to_user(row)
+
+    @metrics.timed("repository.list_users")
+    def list_users(self, offset: int = 0, limit: Optional[int] = None) -> List[User]:
+        """
+        Get one page of users.
+
+        Args:
+            offset (int): Number of users to skip
+            limit (Optional[int]): Maximum number of users to return (all if None)
+
+        Returns:
+            List[User]: Users in the requested page
+        """
+        with self._lock:
+            rows = self._connection().execute(_SELECT_PAGE, (-1 if limit is None else limit, offset)).fetchall()
+        return [_row_to_user(row) for row in rows]
+
+    @metrics.timed("repository.get_by_email")
+    def get_by_email(self, email: str) -> Optional[User]:
+        """
+        Get a user by email using the email index.
+
+        Args:
+            email (str): Email of the user to look up
+
+        Returns:
+            Optional[User]: The matching User, or None if not found
+        """
+        with self._lock:
+            row = self._connection().execute(_SELECT_BY_EMAIL, (email,)).fetchone()
+        return _row_to_user(row) if row else None
+
+    @metrics.timed("repository.get_by_id")
+    def get_by_id(self, user_id: str) -> Optional[User]:
+        """
+        Get a user by UserID using the primary key.
+
+        Args:
+            user_id (str): UserID (UUID) of the user to look up
+
+        Returns:
+            Optional[User]: The matching User, or None if not found
+        """
+        with self._lock:
+            row = self._connection().execute(_SELECT_BY_ID, (user_id,)).fetchone()
+        return _row_to_user(row) if row else None
+
+    @metrics.timed("repository.find_by_name")
+    def find_by_name(self, name: str, limit: Optional[int] = None) -> List[User]:
+        """
+        Find users by name (case-insensitive partial match).
+        Names starting with the search text are returned first, in name order,
+        followed by the other matches in insertion order.
+
+        Args:
+            name (str): Name to search for
+            limit (Optional[int]): Maximum number of results (all if None)
+
+        Returns:
+            List[User]: List of matching User objects
+        """
+        with self._lock:
+            rows = self._connection().execute(_SELECT_BY_NAME, (name.lower(), -1 if limit is None else limit)).fetchall()
+        return [_row_to_user(row) for row in rows]
+
+    def _run_query(self, query: UserQuery) -> QueryResult:
+        """
+        Run a query as one SELECT, so SQLite plans it against the table indexes:
+        the email domain has an expression index and the name prefix becomes a
+        range on the index of the lowercased names. The plan reports the index
+        SQLite chose (its EXPLAIN QUERY PLAN is kept in plan.detail), and
+        "sort" when it orders the rows with a temporary B-tree, which keeps
+        only limit rows when there is a limit.
+
+        Args:
+            query (UserQuery): The query
+
+        Returns:
+            QueryResult: The rows, streamed in chunks
+        """
+        sql, params = _query_sql(query)
+        with self._lock:
+            steps = [row[3] for row in self._connection().execute("EXPLAIN QUERY PLAN " + sql, params)]
+        detail = "; ".join(steps)
+        used = re.search(r"USING (?:COVERING )?INDEX (\w+)", detail)
+        index = _QUERY_INDEXES.get(used.group(1)) if used else None
+        if query.order_field is None:
+            order = 'storage'
+        else:
+            order = 'sort' if 'FOR ORDER BY' in detail else 'index'
+        plan = QueryPlan(index, None, query.conditions(), order, detail)
+        return QueryResult(plan, self._stream(sql, params))
+
+    @metrics.timed("repository.delete_user")
+    def delete_user(self, email: str) -> bool:
+        """
+        Delete a user by email.
+
+        Args:
+            email (str): Email of the user to delete
+
+        Returns:
+            bool: True if user was deleted, False if user not found
+        """
+        with self._writing() as conn:
+            with conn:
+                deleted = _delete_row(conn, _SELECT_BY_EMAIL, email)
+            if deleted is not None:
+                self._publish_changes([('delete', deleted)])
+        return deleted is not None
+
+    def update_user(self, user_id: str, expected_version: Optional[int] = None, **fields: str) -> Optional[User]:
+        """
+        Change some fields of a user, optionally only if it is still at expected_version.
+
+        Args:
+            user_id (str): UserID (UUID) of the user to update
+            expected_version (Optional[int]): Version the caller read (no check if None)
+            **fields (str): New values for name, email and/or password
+
+        Returns:
+            Optional[User]: The updated user (with its new version), or None if user not found
+
+        Raises:
+            ValueError: If a field cannot be updated or the new email belongs to another user
+            VersionConflictError: If the user is no longer at expected_version
+        """
+        return self.update_many([dict(fields, user_id=user_id, version=expected_version)])[0]
+
+    def _update_row(self, conn: sqlite3.Connection, update: Dict[str, Any]) -> Optional[User]:
+        """
+        Apply one update inside the current transaction.
+        Without an expected version, a row changed by another process between
+        the read and the UPDATE is simply read again.
+        """
+        while True:
+            row = conn.execute(_SELECT_BY_ID, (update['user_id'],)).fetchone()
+            if row is None:
+                return None
+            current = _row_to_user(row)
+            user = updated_user(current, update)
+            try:
+                cursor = conn.execute(_UPDATE, (user.name, user.email, user.password, user.name.lower(), user.user_id,
+                                               current.version))
+            except sqlite3.IntegrityError:
+                raise ValueError(f"Email already in use: {user.email}") from None
+            if cursor.rowcount:
+                return user
+            if update.get('version') is not None:
+                raise VersionConflictError(f"User {user.user_id} changed while it was being updated")
+
+    @metrics.timed("repository.update_many")
+    def update_many(self, updates: Iterable[Dict[str, Any]]) -> List[Optional[User]]:
+        """
+        Apply several updates in one transaction.
+
+        Every row is written with a compare-and-set UPDATE on its version, so
+        concurrent writers (other threads or processes) cannot overwrite each
+        other's changes. Any stale version or email collision rolls the whole
+        transaction back.
+
+        Args:
+            updates (Iterable[Dict[str, Any]]): Updates to apply in order (see UserRepository.update_many)
+
+        Returns:
+            List[Optional[User]]: The updated user for each update, None for unknown UserIDs
+
+        Raises:
+            ValueError: If a field cannot be updated or a new email belongs to another user
+            VersionConflictError: If an expected version is stale
+        """
+        results = []
+        with self._writing() as conn:
+            with conn:
+                for update in updates:
+                    results.append(self._update_row(conn, update))
+            self._publish_changes(update_changes(results))
+        return results
+
+    @metrics.timed("repository.delete_by_id")
+    def delete_by_id(self, user_id: str) -> bool:
+        """
+        Delete a user by UserID using the primary key.
+
+        Args:
+            user_id (str): UserID (UUID) of the user to delete
+
+        Returns:
+            bool: True if user was deleted, False if user not found
+        """
+        with self._writing() as conn:
+            with conn:
+                deleted = _delete_row(conn, _SELECT_BY_ID, user_id)
+            if deleted is not None:
+                self._publish_changes([('delete', deleted)])
+        return deleted is not None
+
+    @metrics.timed("repository.delete_many")
+    def delete_many(self, user_ids: Iterable[str]) -> int:
+        """
+        Delete several users by UserID in one transaction.
+
+        Args:
+            user_ids (Iterable[str]): UserIDs of the users to delete
+
+        Returns:
+            int: Number of users deleted
+        """
+        deleted: List[Optional[User]] = []
+        with self._writing() as conn:
+            before = conn.total_changes
+            with conn:
+                if not self._publishes_changes:
+                    conn.executemany(_DELETE_BY_ID, ((user_id,) for user_id in set(user_ids)))
+                else:
+                    deleted = [_delete_row(conn, _SELECT_BY_ID, user_id) for user_id in set(user_ids)]
+            self._publish_changes([('delete', user) for user in deleted if user is not None])
+            return conn.total_changes - before
+
+    def migrate_from_json(self, json_path: str) -> int:
+        """
+        Import users from a JSON file written by UserRepository.
+        Users whose email or user_id is already stored are skipped.
+
+        Args:
+            json_path (str): Path to the JSON file
+
+        Returns:
+            int: Number of users imported
+        """
+        with open(json_path, 'r') as f:
+            rows = [_user_to_row(User.from_dict(data)) for data in json.load(f)]
+        with self._lock:
+            conn = self._connection()
+            before = conn.total_changes
+            with conn:
+                conn.executemany(_INSERT_OR_IGNORE, rows)
+            return conn.total_changes - before
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python -m src.sqlite_repository <users.json> <users.db>")
+        sys.exit(1)
+    imported = SqliteUserRepository(sys.argv[2]).migrate_from_json(sys.argv[1])
+    print(f"Imported {imported} users into {sys.argv[2]}")
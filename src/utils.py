@@ -1,5 +1,25 @@
+import importlib
 import os
-from colorama import Fore, Style
+
+class LazyAttribute:
+    """
+    Stand-in for a module attribute that imports the module on first use.
+    Used for the console-only colorama constants, so importing the app (e.g.
+    from tests or other entry points) does not load colorama.
+    """
+
+    def __init__(self, module: str, name: str):
+        self._module = module
+        self._name = name
+
+    def __getattr__(self, attr: str):
+        target = getattr(importlib.import_module(self._module), self._name)
+        value = getattr(target, attr)
+        setattr(self, attr, value)
+        return value
+
+Fore = LazyAttribute('colorama', 'Fore')
+Style = LazyAttribute('colorama', 'Style')
 
 def clear_screen() -> None:
     """
@@ -0,0 +1,94 @@
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+MIN_PASSWORD_LENGTH = 8
+DIGITS = frozenset('0123456789')
+LOWERCASE = frozenset('abcdefghijklmnopqrstuvwxyz')
+UPPERCASE = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+SPECIAL = frozenset('@#$%^&+=')
+# Every str.isspace() character is below U+3001 (the last one is U+3000)
+WHITESPACE = frozenset(chr(code) for code in range(0x3001) if chr(code).isspace())
+
+def validate_email(email: str) -> bool:
+    """
+    Validate if the provided email contains an '@' and a valid domain part.
+    Args:
+        email (str): Email address to validate
+    Returns:
+        bool: True if email is valid, False otherwise
+    """
+    return EMAIL_PATTERN.match(email) is not None
+
+def validate_password(password: str) -> bool:
+    """
+    Validate if the password meets the security requirements (see User.validate_password).
+    The characters are collected into a set in one pass, then each required
+    character class is a set-disjointness test on that set.
+    Args:
+        password (str): Password to validate
+    Returns:
+        bool: True if password is valid, False otherwise
+    """
+    if len(password) < MIN_PASSWORD_LENGTH:
+        return False
+    chars = set(password)
+    return (chars.isdisjoint(WHITESPACE) and not chars.isdisjoint(DIGITS)
+            and not chars.isdisjoint(LOWERCASE) and not chars.isdisjoint(UPPERCASE)
+            and not chars.isdisjoint(SPECIAL))
+
+def validate_record(record: Dict[str, str], check_password: bool = True) -> Optional[str]:
+    """
+    Validate one user record.
+    Args:
+        record (Dict[str, str]): Record with name, email and password
+        check_password (bool): Whether to apply the password rules
+    Returns:
+        Optional[str]: Error message, or None if the record is valid
+    """
+    if not record.get('name'):
+        return "missing name"
+    if not validate_email(record.get('email') or ''):
+        return "invalid email"
+    if check_password and not validate_password(record.get('password') or ''):
+        return "invalid password"
+    return None
+
+def validate_many(records: Iterable[Dict[str, str]],
+                  existing_emails: Optional[Iterable[str]] = None) -> List[Tuple[int, str]]:
+    """
+    Validate many user records in one pass.
+    With existing_emails, records whose email is already taken (by an existing
+    user or an earlier record of the batch) are reported as duplicates; the
+    check uses a set, so it costs O(1) per record.
+    Args:
+        records (Iterable[Dict[str, str]]): Records to validate
+        existing_emails (Optional[Iterable[str]]): Emails already in use (no duplicate check if None)
+    Returns:
+        List[Tuple[int, str]]: (record index, error message) for each invalid record
+    """
+    seen: Optional[Set[str]] = set(existing_emails) if existing_emails is not None else None
+    errors = []
+    # validate_record() inlined, with globals bound to locals: this loop is the hot path
+    match_email = EMAIL_PATTERN.match
+    whitespace, digits, lowercase, uppercase, special = WHITESPACE, DIGITS, LOWERCASE, UPPERCASE, SPECIAL
+    for index, record in enumerate(records):
+        email = record.get('email') or ''
+        password = record.get('password') or ''
+        if not record.get('name'):
+            errors.append((index, "missing name"))
+        elif match_email(email) is None:
+            errors.append((index, "invalid email"))
+        elif len(password) < MIN_PASSWORD_LENGTH:
+            errors.append((index, "invalid password"))
+        else:
+            chars = set(password)
+            if (not chars.isdisjoint(whitespace) or chars.isdisjoint(digits) or chars.isdisjoint(lowercase)
+                    or chars.isdisjoint(uppercase) or chars.isdisjoint(special)):
+                errors.append((index, "invalid password"))
+            elif seen is not None:
+                if email in seen:
+                    errors.append((index, "duplicate email"))
+                else:
+                    seen.add(email)
+    return errors
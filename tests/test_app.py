@@ -1,19 +1,54 @@
+import subprocess
+import sys
 from src.app import UserManagementApp
 from src.models import User
 import pytest
 
 # Test de registro de usuario exitoso
-def test_register_user_success(monkeypatch, tmp_path):
+def test_register_user_success(monkeypatch, tmp_path, capsys):
     app = UserManagementApp()
     app.repository.file_path = str(tmp_path / "users.json")
     # Simula entradas válidas para nombre, email y password
     inputs = iter(["Alice", "alice@example.com", "Password1@"])
     monkeypatch.setattr("builtins.input", lambda _: next(inputs))
     app.register_user()
+    assert "queued" in capsys.readouterr().out
+    app.wait_for_registrations()
+    assert "alice@example.com registered successfully" in capsys.readouterr().out
     users = app.repository.get_all_users()
     assert len(users) == 1
     assert users[0].name == "Alice"
     assert users[0].email == "alice@example.com"
+    # La contraseña se guarda hasheada
+    assert users[0].password != "Password1@"
+    assert app.hasher.verify("Password1@", users[0].password)
+
+# Test de registro cuando otro usuario toma el email entre la validación y el guardado
+def test_register_user_reports_email_taken_meanwhile(monkeypatch, tmp_path, capsys):
+    app = UserManagementApp()
+    app.repository.file_path = str(tmp_path / "users.json")
+    real_hash = app.hasher.hash
+
+    # Otro usuario se registra con el mismo email mientras se hashea la contraseña
+    def hash_after_race(password):
+        app.repository.add_user(User("Mallory", "alice@example.com", "Password1@"))
+        return real_hash(password)
+
+    monkeypatch.setattr(app.hasher, "hash", hash_after_race)
+    inputs = iter(["Alice", "alice@example.com", "Password1@"])
+    monkeypatch.setattr("builtins.input", lambda _: next(inputs))
+    app.register_user()
+    app.wait_for_registrations()
+    captured = capsys.readouterr()
+    assert "alice@example.com could not be registered: the email is already in use" in captured.out
+    assert "registered successfully" not in captured.out
+    assert [user.name for user in app.repository.get_all_users()] == ["Mallory"]
+    # Un error al hashear o guardar también se informa
+    monkeypatch.setattr(app.hasher, "hash", lambda password: 1 / 0)
+    inputs = iter(["Bobby", "bob@example.com", "Password1@"])
+    app.register_user()
+    app.wait_for_registrations()
+    assert "bob@example.com could not be registered: division by zero" in capsys.readouterr().out
 
 # Test de búsqueda de usuario por email
 def test_search_user_by_email(monkeypatch, tmp_path, capsys):
@@ -42,4 +77,57 @@ def test_delete_user_by_userid(monkeypatch, tmp_path, capsys):
     users = app.repository.get_all_users()
     assert len(users) == 0
     captured = capsys.readouterr()
-    assert "User deleted successfully" in captured.out 
\ No newline at end of file
+    assert "User deleted successfully" in captured.out
+
+# Test de listado paginado de usuarios
+def test_list_users_paginates(monkeypatch, tmp_path, capsys):
+    app = UserManagementApp()
+    app.repository.file_path = str(tmp_path / "users.json")
+    app.page_size = 2
+    for name in ["Alice", "Bob", "Carol"]:
+        app.repository.add_user(User(name, f"{name.lower()}@example.com", "Password1@"))
+    # Simula "q" al final de la primera página
+    inputs = iter(["q"])
+    monkeypatch.setattr("builtins.input", lambda _: next(inputs))
+    app.list_users()
+    captured = capsys.readouterr()
+    assert "alice@example.com" in captured.out
+    assert "bob@example.com" in captured.out
+    assert "carol@example.com" not in captured.out
+
+# Test de búsqueda de usuarios por nombre
+def test_search_user_by_name(monkeypatch, tmp_path, capsys):
+    app = UserManagementApp()
+    app.repository.file_path = str(tmp_path / "users.json")
+    app.repository.add_user(User("Dana", "dana@example.com", "Password1@"))
+    inputs = iter(["3", "an"])
+    monkeypatch.setattr("builtins.input", lambda _: next(inputs))
+    app.search_users()
+    captured = capsys.readouterr()
+    assert "dana@example.com" in captured.out
+
+# Test de búsqueda por prefijo de nombre y dominio de email, ordenada por nombre
+def test_search_user_by_name_prefix_and_domain(monkeypatch, tmp_path, capsys):
+    app = UserManagementApp()
+    app.repository.file_path = str(tmp_path / "users.json")
+    for name, email in [("Erin", "erin@example.com"), ("Eli", "eli@example.com"), ("Eve", "eve@test.org")]:
+        app.repository.add_user(User(name, email, "Password1@"))
+    # Simula opción 4, el prefijo "e" y el dominio "example.com"
+    inputs = iter(["4", "e", "example.com"])
+    monkeypatch.setattr("builtins.input", lambda _: next(inputs))
+    app.search_users()
+    captured = capsys.readouterr()
+    assert "eve@test.org" not in captured.out
+    assert captured.out.index("eli@example.com") < captured.out.index("erin@example.com")
+
+# Test de arranque perezoso: crear la app no abre el repositorio ni importa la UI
+def test_app_startup_is_lazy(monkeypatch, tmp_path):
+    monkeypatch.setenv("DATA_FILE_PATH", str(tmp_path / "data" / "users.json"))
+    app = UserManagementApp()
+    assert "repository" not in vars(app)
+    assert app.repository.get_all_users() == []
+    assert not (tmp_path / "data").exists()
+    script = "import sys; from src.app import UserManagementApp; UserManagementApp(); " \
+             "print(sorted({'colorama', 'concurrent.futures', 'decouple'} & set(sys.modules)))"
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "[]"
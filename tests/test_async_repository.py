@@ -0,0 +1,60 @@
+import asyncio
+import pytest
+from src.async_repository import AsyncUserRepository
+from src.models import User
+from src.repository import create_repository
+
+@pytest.mark.parametrize("backend, filename", [
+    ("json", "users.json"), ("cached", "users.json"), ("log", "users.json"), ("sqlite", "users.db")
+])
+def test_apply_batch(tmp_path, backend, filename):
+    """
+    Test that apply_batch applies adds and deletes in order and reports each result.
+    """
+    repo = create_repository(str(tmp_path / filename), backend)
+    repo.add_user(User("Alice", "alice@example.com", "Password1@"))
+    results = repo.apply_batch([
+        ("add", User("Bob", "bob@example.com", "Password1@")),
+        ("add", User("Alice Again", "alice@example.com", "Password1@")),
+        ("delete", "alice@example.com"),
+        ("add", User("Alice New", "alice@example.com", "Password1@")),
+        ("delete", "nobody@example.com"),
+    ])
+    assert results == [True, False, True, True, False]
+    reopened = create_repository(str(tmp_path / filename), backend)
+    assert sorted(u.name for u in reopened.get_all_users()) == ["Alice New", "Bob"]
+    with pytest.raises(ValueError):
+        repo.apply_batch([("rename", "bob@example.com")])
+
+def test_async_writes_are_group_committed(tmp_path):
+    """
+    Test that concurrent writes are coalesced into few commits with per-write results.
+    """
+    async def scenario():
+        async with AsyncUserRepository(create_repository(str(tmp_path / "users.json")), commit_delay=0.05) as repo:
+            users = [User(f"User{i}", f"user{i}@example.com", "Password1@") for i in range(50)]
+            results = await asyncio.gather(
+                *(repo.add_user(user) for user in users),
+                repo.add_user(User("Dup", "user0@example.com", "Password1@"))
+            )
+            assert results == [True] * 50 + [False]
+            assert repo.commits == 1
+            assert await repo.delete_user("user1@example.com") is True
+            assert await repo.delete_user("user1@example.com") is False
+            assert await repo.delete_by_id(users[2].user_id) is True
+            assert len(await repo.get_all_users()) == 48
+            assert [u.name for u in await repo.find_by_name("user4", limit=2)] == ["User4", "User40"]
+            assert (await repo.get_by_email("user3@example.com")).name == "User3"
+    asyncio.run(scenario())
+
+def test_async_batches_respect_max_batch(tmp_path):
+    """
+    Test that a full batch is committed without waiting and the rest follows.
+    """
+    async def scenario():
+        repo = AsyncUserRepository(create_repository(str(tmp_path / "users.json")), commit_delay=10, max_batch=5)
+        users = [User(f"User{i}", f"user{i}@example.com", "Password1@") for i in range(10)]
+        assert await asyncio.wait_for(asyncio.gather(*(repo.add_user(u) for u in users)), 5) == [True] * 10
+        assert repo.commits == 2
+        await repo.close()
+    asyncio.run(scenario())
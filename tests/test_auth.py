@@ -0,0 +1,128 @@
+from src.auth import Authenticator, RateLimitError, TokenBucketLimiter
+from src.cache import LRUCache
+from src.models import User
+from src.passwords import PasswordHasher
+from src.repository import CachedUserRepository
+import pytest
+
+HASHER = PasswordHasher("scrypt", cost=4)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class CountingHasher(PasswordHasher):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.verifications = 0
+
+    def verify(self, password, stored):
+        self.verifications += 1
+        return super().verify(password, stored)
+
+def make_repo(tmp_path, password):
+    repo = CachedUserRepository(str(tmp_path / "users.json"))
+    repo.add_user(User("Alice", "alice@example.com", password))
+    return repo
+
+def test_lru_cache_evicts_and_expires():
+    """
+    Test that the cache drops the least recently used entry and expired entries.
+    """
+    clock = FakeClock()
+    cache = LRUCache(maxsize=2, ttl=10, clock=clock)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    clock.now = 11
+    assert cache.get("a") is None
+    assert cache.stats() == {'size': 1, 'hits': 1, 'misses': 2, 'hit_ratio': 1 / 3,
+                             'evictions': 1, 'expirations': 1}
+
+def test_token_bucket_refills_and_evicts():
+    """
+    Test that a bucket allows a burst, refills over time and that old buckets are dropped.
+    """
+    clock = FakeClock()
+    limiter = TokenBucketLimiter(rate=1, burst=2, max_keys=2, clock=clock)
+    assert [limiter.allow("a") for _ in range(3)] == [True, True, False]
+    clock.now = 1
+    assert limiter.allow("a") is True
+    assert limiter.allow("a") is False
+    limiter.allow("b")
+    limiter.allow("c")
+    assert (limiter.rejected, limiter.evictions) == (2, 1)
+
+def test_authenticate_caches_successful_verifications(tmp_path):
+    """
+    Test that repeated logins skip the KDF and wrong passwords are still rejected.
+    """
+    hasher = CountingHasher("scrypt", cost=4)
+    auth = Authenticator(make_repo(tmp_path, HASHER.hash("Password1@")), hasher, burst=100)
+    assert auth.authenticate("alice@example.com", "Password1@").name == "Alice"
+    assert auth.authenticate("alice@example.com", "Password1@").name == "Alice"
+    assert hasher.verifications == 1
+    assert auth.authenticate("alice@example.com", "Wrong1@x") is None
+    assert auth.authenticate("nobody@example.com", "Password1@") is None
+    stats = auth.stats()
+    assert (stats['successes'], stats['failures'], stats['cache_hits'], stats['cache_misses']) == (2, 2, 1, 2)
+
+def test_authenticate_unknown_email_costs_a_verification(tmp_path):
+    """
+    Test that an unknown email is verified against a dummy hash made with the current settings.
+    """
+    hasher = CountingHasher("pbkdf2_sha256", cost=1000)
+    auth = Authenticator(make_repo(tmp_path, HASHER.hash("Password1@")), hasher, burst=100)
+    assert auth.authenticate("nobody@example.com", "Password1@") is None
+    assert auth.authenticate("nobody@example.com", "Password1@") is None
+    assert hasher.verifications == 2
+    assert auth._dummy_hash.startswith("pbkdf2_sha256$1000$")
+    assert not hasher.needs_rehash(auth._dummy_hash)
+
+def test_authenticate_cache_entry_expires(tmp_path):
+    """
+    Test that a cached verification is only reused within its TTL.
+    """
+    clock = FakeClock()
+    hasher = CountingHasher("scrypt", cost=4)
+    auth = Authenticator(make_repo(tmp_path, HASHER.hash("Password1@")), hasher, cache_ttl=60, burst=100, clock=clock)
+    auth.authenticate("alice@example.com", "Password1@")
+    clock.now = 61
+    auth.authenticate("alice@example.com", "Password1@")
+    assert hasher.verifications == 2
+
+def test_authenticate_rate_limits_by_email_and_ip(tmp_path):
+    """
+    Test that attempts beyond the burst are rejected per email and per IP.
+    """
+    clock = FakeClock()
+    auth = Authenticator(make_repo(tmp_path, HASHER.hash("Password1@")), HASHER, rate=1, burst=2, clock=clock)
+    auth.authenticate("alice@example.com", "Wrong1@x", ip="10.0.0.1")
+    auth.authenticate("alice@example.com", "Wrong1@x", ip="10.0.0.1")
+    with pytest.raises(RateLimitError):
+        auth.authenticate("alice@example.com", "Password1@", ip="10.0.0.2")
+    with pytest.raises(RateLimitError):
+        auth.authenticate("bob@example.com", "Password1@", ip="10.0.0.1")
+    clock.now = 1
+    assert auth.authenticate("alice@example.com", "Password1@", ip="10.0.0.2") is not None
+    assert auth.stats()['rate_limited'] == 2
+
+def test_authenticate_rehashes_outdated_hashes(tmp_path):
+    """
+    Test that a plain text or weaker hash is replaced after a successful login.
+    """
+    repo = make_repo(tmp_path, "Password1@")
+    auth = Authenticator(repo, HASHER, burst=100)
+    assert auth.authenticate("alice@example.com", "Password1@") is not None
+    stored = repo.get_by_email("alice@example.com").password
+    assert not HASHER.needs_rehash(stored)
+    assert HASHER.verify("Password1@", stored)
+    stronger = Authenticator(repo, PasswordHasher("scrypt", cost=5), burst=100)
+    stronger.authenticate("alice@example.com", "Password1@")
+    assert repo.get_by_email("alice@example.com").password.startswith("scrypt$5$")
+    assert stronger.stats()['rehashed'] == 1
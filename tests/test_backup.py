@@ -0,0 +1,117 @@
+import json
+import threading
+from src.backup import BackupError, BackupStore, main
+from src.models import User
+from src.repository import CorruptDataError, UserRepository, create_repository
+import pytest
+
+def make_users(start, count):
+    return [User(f"User{i}", f"user{i}@example.com", "Password1@") for i in range(start, start + count)]
+
+def as_dicts(users):
+    return [user.to_dict() for user in users]
+
+@pytest.mark.parametrize("backend, filename", [
+    ("json", "users.json"), ("cached", "users.json"), ("log", "users.json"), ("sqlite", "users.db"),
+    ("binary", "users.bin"), ("sharded", "users.json")
+])
+def test_full_and_incremental_backups_restore(tmp_path, backend, filename):
+    """
+    Test that a delta only stores the changes, and that every snapshot restores exactly.
+    """
+    repo = create_repository(str(tmp_path / filename), backend)
+    users = make_users(0, 50)
+    repo.bulk_add_users(users)
+    store = BackupStore(str(tmp_path / "backups"), workers=2)
+    assert store.backup(repo)["kind"] == "full"
+    first = as_dicts(repo.get_all_users())
+    repo.update_user(users[3].user_id, name="Renamed")
+    repo.delete_user("user4@example.com")
+    repo.add_user(User("Late", "late@example.com", "Password1@"))
+    entry = store.backup(repo)
+    assert (entry["kind"], entry["parent"], entry["changed"], entry["deleted"]) == ("delta", "000001", 2, 1)
+    assert store.verify() == ["000001", "000002"]
+    restored = store.restore(str(tmp_path / "restored" / filename), backend)
+    assert sorted(as_dicts(restored.get_all_users()), key=str) == sorted(as_dicts(repo.get_all_users()), key=str)
+    assert restored.get_by_email("late@example.com").name == "Late"
+    assert [user.name for user in restored.find_by_name("renamed")] == ["Renamed"]
+    older = store.restore(str(tmp_path / "older" / filename), backend, name="000001")
+    assert sorted(as_dicts(older.get_all_users()), key=str) == sorted(first, key=str)
+
+def test_restore_rebuilds_warm_start_files(tmp_path):
+    """
+    Test that restoring a cached store leaves its snapshot and name index ready for the next start.
+    """
+    source = create_repository(str(tmp_path / "users.json"))
+    source.bulk_add_users(make_users(0, 30))
+    store = BackupStore(str(tmp_path / "backups"))
+    store.backup(source)
+    target = str(tmp_path / "restored.json")
+    store.restore(target)
+    with open(target) as f:
+        assert len(json.load(f)) == 30
+    reopened = create_repository(target)
+    assert reopened.get_by_email("user7@example.com").name == "User7"
+    assert (tmp_path / "restored.json.snapshot").exists() and (tmp_path / "restored.json.names").exists()
+
+def test_damaged_backups_are_detected(tmp_path, monkeypatch):
+    """
+    Test that a flipped byte or a missing file fails verify and restore, leaving the target untouched,
+    and that lost digests make the next backup a full one.
+    """
+    repo = create_repository(str(tmp_path / "users.json"))
+    repo.bulk_add_users(make_users(0, 20))
+    store = BackupStore(str(tmp_path / "backups"))
+    store.backup(repo)
+    repo.add_user(User("Late", "late@example.com", "Password1@"))
+    store.backup(repo)
+    target = create_repository(str(tmp_path / "target.json"))
+    target.add_user(User("Keep", "keep@example.com", "Password1@"))
+    full = tmp_path / "backups" / "000001.full"
+    original = full.read_bytes()
+    data = bytearray(original)
+    data[len(data) // 2] ^= 0xFF
+    full.write_bytes(bytes(data))
+    with pytest.raises(BackupError, match="000001"):
+        store.verify()
+    with pytest.raises(BackupError):
+        store.restore(str(tmp_path / "target.json"))
+    assert [user.name for user in target.get_all_users()] == ["Keep"]
+    full.write_bytes(original)
+    (tmp_path / "backups" / "000002.delta").unlink()
+    with pytest.raises(BackupError, match="missing"):
+        store.verify("000002")
+    (tmp_path / "backups" / "head.digests").unlink()
+    assert store.backup(repo)["kind"] == "full"
+    monkeypatch.setenv("BACKUP_DIR", str(tmp_path / "backups"))
+    assert main(["verify", "--snapshot", "000003"]) == 0
+    assert main(["verify", "--snapshot", "000002"]) == 1
+
+def test_backup_is_a_point_in_time_copy_while_writers_run(tmp_path):
+    """
+    Test that a backup taken during a stream of adds holds exactly the users added before some point.
+    """
+    repo = create_repository(str(tmp_path / "users.json"))
+    users = make_users(0, 300)
+    writer = threading.Thread(target=lambda: [repo.add_user(user) for user in users])
+    writer.start()
+    store = BackupStore(str(tmp_path / "backups"))
+    store.backup(repo)
+    writer.join()
+    snapshot = store.read()
+    assert as_dicts(snapshot) == as_dicts(users[:len(snapshot)])
+
+def test_corrupt_data_file_raises(tmp_path):
+    """
+    Test that a damaged JSON file is reported instead of being read (and then saved) as empty.
+    """
+    path = tmp_path / "users.json"
+    path.write_text('[{"name": "Ann", "email": "ann@example.com"')
+    for repo in [UserRepository(str(path)), create_repository(str(path))]:
+        with pytest.raises(CorruptDataError):
+            repo.get_all_users()
+        with pytest.raises(CorruptDataError):
+            repo.add_user(User("Bob", "bob@example.com", "Password1@"))
+    with pytest.raises(CorruptDataError):
+        list(UserRepository(str(path)).iter_users())
+    assert path.read_text().startswith('[{"name": "Ann"')
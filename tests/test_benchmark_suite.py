@@ -0,0 +1,25 @@
+from benchmarks.suite import compare, main
+
+def result(operation, seconds, peak):
+    return {"backend": "json", "size": 1000, "operation": operation, "seconds": seconds, "peak_bytes": peak}
+
+def test_compare_flags_slower_and_hungrier_operations():
+    """
+    Test that only changes beyond the threshold are reported as regressions.
+    """
+    baseline = [result("load", 0.100, 10_000_000), result("save", 0.100, 10_000_000), result("add_user", 0.0001, 100)]
+    current = [result("load", 0.150, 10_000_000), result("save", 0.110, 20_000_000),
+               result("add_user", 0.0005, 100), result("delete_user", 1.0, 100)]
+    regressions = compare(current, baseline, threshold=0.25)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("json 1000 load: time")
+    assert regressions[1].startswith("json 1000 save: peak memory")
+
+def test_suite_writes_results_and_compares(tmp_path):
+    """
+    Test a tiny end-to-end run: results file written, no regression against itself with a loose threshold.
+    """
+    output = tmp_path / "results.json"
+    assert main(["--sizes", "50", "--backends", "cached", "--repeat", "1", "--output", str(output)]) == 0
+    assert main(["--sizes", "50", "--backends", "cached", "--repeat", "1", "--baseline", str(output),
+                 "--threshold", "100"]) == 0
@@ -0,0 +1,79 @@
+import json
+import struct
+from src.binary_repository import (HEADER, BinaryUserFile, BinaryUserRepository, binary_to_json, json_to_binary,
+                                  main)
+from src.models import User
+from src.repository import CorruptDataError, UserRepository, create_repository
+import pytest
+
+def make_users(count):
+    return [User(f"User{i}", f"user{i}@example.com", f"Passwörd{i}@", version=i % 3 + 1) for i in range(count)]
+
+def test_binary_lookups_use_the_sorted_indexes(tmp_path):
+    """
+    Test lookups by UserID and email, including misses before, between and after the stored keys.
+    """
+    path = str(tmp_path / "users.bin")
+    repo = create_repository(path)
+    assert isinstance(repo, BinaryUserRepository)
+    users = make_users(50)
+    assert repo.bulk_add_users(users) == 50
+    for user in users:
+        assert repo.get_by_id(user.user_id).to_dict() == user.to_dict()
+        assert repo.get_by_email(user.email).user_id == user.user_id
+    for email in ["a@example.com", "user10@example.co", "user5@example.comm", "zz@example.com"]:
+        assert repo.get_by_email(email) is None
+    assert repo.get_by_id("missing") is None
+    assert [u.name for u in repo.list_users(offset=48, limit=5)] == ["User48", "User49"]
+    assert [u.name for u in repo.find_by_name("user4", limit=3)] == ["User4", "User40", "User41"]
+
+def test_binary_repository_sees_replaced_file(tmp_path):
+    """
+    Test that a repository remaps the file after another instance rewrote it.
+    """
+    path = str(tmp_path / "users.bin")
+    reader, writer = BinaryUserRepository(path), BinaryUserRepository(path)
+    writer.add_user(User("Ann", "ann@example.com", "Password1@"))
+    assert reader.get_by_email("ann@example.com").name == "Ann"
+    writer.delete_user("ann@example.com")
+    assert reader.get_by_email("ann@example.com") is None
+
+def test_json_binary_round_trip(tmp_path):
+    """
+    Test converting JSON to binary and back, through the functions and the command line.
+    """
+    json_path, binary_path = str(tmp_path / "users.json"), str(tmp_path / "users.bin")
+    users = make_users(20)
+    UserRepository(json_path).bulk_add_users(users)
+    assert json_to_binary(json_path, binary_path) == 20
+    assert len(BinaryUserFile(binary_path)) == 20
+    assert main(["to-json", binary_path, str(tmp_path / "copy.json")]) == 0
+    with open(json_path) as original, open(tmp_path / "copy.json") as copy:
+        assert json.load(copy) == json.load(original)
+    assert binary_to_json(binary_path, json_path) == 20
+
+def test_binary_file_rejects_other_files(tmp_path):
+    """
+    Test that a file in another format raises instead of reading as empty.
+    """
+    path = tmp_path / "users.bin"
+    path.write_text("[]")
+    with pytest.raises(CorruptDataError):
+        BinaryUserRepository(str(path)).get_by_email("ann@example.com")
+
+def test_binary_file_rejects_truncated_or_damaged_files(tmp_path):
+    """
+    Test that a truncated file or a header pointing outside the file raises CorruptDataError.
+    """
+    path = tmp_path / "users.bin"
+    BinaryUserRepository(str(path)).bulk_add_users(make_users(10))
+    data = path.read_bytes()
+    for size in [0, 10, HEADER.size, HEADER.size + 30, len(data) // 2, len(data) - 40]:
+        path.write_bytes(data[:size])
+        with pytest.raises(CorruptDataError, match="users.bin"):
+            BinaryUserRepository(str(path)).get_by_email("user3@example.com")
+    damaged = bytearray(data)
+    struct.pack_into('<Q', damaged, HEADER.size - 8, len(data) + 1000)
+    path.write_bytes(bytes(damaged))
+    with pytest.raises(CorruptDataError):
+        BinaryUserFile(str(path))
@@ -0,0 +1,113 @@
+import io
+import json
+from src.bulk import export_users, import_users, main, read_records
+from src.log_repository import LogUserRepository
+from src.models import User
+from src.passwords import PasswordHasher
+from src.repository import CachedUserRepository, UserRepository, create_repository
+from src.sqlite_repository import SqliteUserRepository
+import pytest
+
+CSV_INPUT = """name,email,password
+Alice,alice@example.com,Password1@
+Bob,not-an-email,Password1@
+Carol,carol@example.com,weak
+Dave,alice@example.com,Password1@
+Erin,erin@example.com,Password1@
+"""
+
+@pytest.mark.parametrize("repo_class", [UserRepository, CachedUserRepository, LogUserRepository])
+def test_import_users_validates_and_dedupes(tmp_path, repo_class):
+    """
+    Test that bulk import skips invalid records and duplicate emails.
+    """
+    repo = repo_class(str(tmp_path / "users.json"))
+    repo.add_user(User("Erin", "erin@example.com", "Password1@"))
+    result = import_users(repo, read_records(io.StringIO(CSV_INPUT), "csv"), batch_size=2)
+    assert (result.read, result.added, result.invalid, result.duplicates) == (5, 1, 2, 2)
+    assert result.errors == ["record 2: invalid email", "record 3: invalid password"]
+    assert [u.email for u in repo.get_all_users()] == ["erin@example.com", "alice@example.com"]
+
+@pytest.mark.parametrize("backend, filename", [
+    ("json", "users.json"), ("cached", "users.json"), ("log", "users.json"), ("sqlite", "users.db"),
+    ("binary", "users.bin"), ("sharded", "users.json")
+])
+def test_import_users_skips_existing_user_ids(tmp_path, backend, filename):
+    """
+    Test that a record reusing a stored UserID, or one seen earlier in the input, is a duplicate.
+    """
+    path = str(tmp_path / filename)
+    repo = create_repository(path, backend)
+    repo.add_user(User("Alice", "alice@example.com", "Password1@", "id-1"))
+    records = [{"user_id": "id-1", "name": "Alicia", "email": "alicia@example.com", "password": "Password1@"},
+               {"user_id": "id-2", "name": "Bob", "email": "bob@example.com", "password": "Password1@"},
+               {"user_id": "id-2", "name": "Bobby", "email": "bobby@example.com", "password": "Password1@"}]
+    result = import_users(repo, records, batch_size=2)
+    assert (result.read, result.added, result.invalid, result.duplicates) == (3, 1, 0, 2)
+    for reopened in [repo, create_repository(path, backend)]:
+        assert sorted((u.user_id, u.email) for u in reopened.get_all_users()) == [
+            ("id-1", "alice@example.com"), ("id-2", "bob@example.com")]
+        assert reopened.get_by_email("alice@example.com").name == "Alice"
+        assert reopened.get_by_id("id-1").email == "alice@example.com"
+
+def test_import_users_reports_malformed_records(tmp_path):
+    """
+    Test that bad JSON lines and fields are counted as invalid without stopping the import.
+    """
+    lines = [json.dumps({"name": "Alice", "email": "alice@example.com", "password": "Password1@"}),
+             '{"name": "Bob", "email":',
+             '["Carol", "carol@example.com"]',
+             json.dumps({"name": "Dave", "email": "dave@example.com", "password": "Password1@", "version": "x"}),
+             json.dumps({"name": "Erin", "email": "erin@example.com", "password": "Password1@"})]
+    repo = UserRepository(str(tmp_path / "users.json"))
+    result = import_users(repo, read_records(io.StringIO("\n".join(lines) + "\n"), "jsonl"), batch_size=1)
+    assert (result.read, result.added, result.invalid, result.duplicates) == (5, 2, 3, 0)
+    assert [error.split(":")[0] for error in result.errors] == ["record 2", "record 3", "record 4"]
+    assert result.errors[1] == "record 3: not a JSON object"
+    assert [u.email for u in repo.get_all_users()] == ["alice@example.com", "erin@example.com"]
+
+def test_sqlite_bulk_add_users(tmp_path):
+    repo = SqliteUserRepository(str(tmp_path / "users.db"))
+    users = (User(f"User{i}", f"user{i % 50}@example.com", "Password1@") for i in range(100))
+    assert repo.bulk_add_users(users, batch_size=7) == 50
+    assert repo.count() == 50
+
+def test_export_users_jsonl_roundtrip(tmp_path):
+    """
+    Test that an export can be imported back into an empty repository.
+    """
+    source = UserRepository(str(tmp_path / "a.json"))
+    source.bulk_add_users(User(f"User{i}", f"user{i}@example.com", "Password1@") for i in range(3))
+    out = io.StringIO()
+    assert export_users(source, out, "jsonl") == 3
+    target = UserRepository(str(tmp_path / "b.json"))
+    result = import_users(target, read_records(io.StringIO(out.getvalue()), "jsonl"))
+    assert result.added == 3
+    assert [u.to_dict() for u in target.get_all_users()] == [u.to_dict() for u in source.get_all_users()]
+
+def test_bulk_cli(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATA_FILE_PATH", str(tmp_path / "users.json"))
+    monkeypatch.setenv("STORAGE_BACKEND", "cached")
+    input_path = tmp_path / "in.csv"
+    input_path.write_text(CSV_INPUT)
+    assert main(["import", str(input_path)]) == 1
+    output_path = tmp_path / "out.jsonl"
+    assert main(["export", str(output_path)]) == 0
+    emails = [json.loads(line)["email"] for line in output_path.read_text().splitlines()]
+    assert emails == ["alice@example.com", "erin@example.com"]
+
+def test_import_users_hashes_passwords(tmp_path):
+    """
+    Test that import hashes plain text passwords and keeps already hashed ones.
+    """
+    hasher = PasswordHasher("scrypt", cost=4)
+    hashed = hasher.hash("Password2@")
+    records = [
+        {"name": "Alice", "email": "alice@example.com", "password": "Password1@"},
+        {"name": "Bob", "email": "bob@example.com", "password": hashed},
+    ]
+    repo = UserRepository(str(tmp_path / "users.json"))
+    assert import_users(repo, records, hasher=hasher, workers=1).added == 2
+    alice, bob = repo.get_all_users()
+    assert hasher.verify("Password1@", alice.password)
+    assert bob.password == hashed
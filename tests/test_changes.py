@@ -0,0 +1,148 @@
+import sqlite3
+import threading
+from src.changes import ChangeFeed, SubscriptionClosed
+from src.models import User
+from src.repository import create_repository
+import pytest
+
+def make_users(count):
+    return [User(f"User{i}", f"user{i}@example.com", "Password1@") for i in range(count)]
+
+@pytest.mark.parametrize("backend, filename", [
+    ("json", "users.json"), ("cached", "users.json"), ("log", "users.json"), ("sqlite", "users.db"),
+    ("binary", "users.bin"), ("sharded", "users.json")
+])
+def test_every_write_path_publishes_ordered_events(tmp_path, backend, filename):
+    """
+    Test that adds, batches, updates and deletes are published once each, in commit order.
+    """
+    path = str(tmp_path / filename)
+    repo = create_repository(path, backend, change_feed=True)
+    users = make_users(5)
+    assert repo.add_user(users[0]) is True
+    assert repo.add_user(User("Copy", "user0@example.com", "Password1@")) is False
+    assert repo.bulk_add_users(users) == 4
+    repo.apply_batch([("add", users[0]), ("delete", "user1@example.com"), ("delete_id", users[2].user_id)])
+    repo.update_user(users[3].user_id, name="Renamed")
+    repo.delete_user("user3@example.com")
+    repo.delete_many([users[4].user_id, "missing"])
+    events = repo.change_feed.changes_since(0)
+    assert [event.seq for event in events] == list(range(1, 11))
+    expected = [
+        ("add", "User0"), ("add", "User1"), ("add", "User2"), ("add", "User3"), ("add", "User4"),
+        ("delete", "User1"), ("delete", "User2"), ("update", "Renamed"), ("delete", "Renamed"), ("delete", "User4"),
+    ]
+    published = [(event.op, event.user['name']) for event in events]
+    if backend == "sharded":
+        # Each shard publishes its part of a batch: events are ordered per user, not across shards
+        def by_user(change):
+            return change[1].replace("Renamed", "User3")
+        assert sorted(published, key=by_user) == sorted(expected, key=by_user)
+    else:
+        assert published == expected
+    assert events[7].user['version'] == 2
+    # A new process continues the sequence, and a cursor only reads what follows it
+    other = create_repository(path, backend, change_feed=True)
+    other.add_user(User("Late", "late@example.com", "Password1@"))
+    assert [(e.seq, e.op, e.user_id) for e in repo.change_feed.changes_since(9)] == [
+        (10, "delete", users[4].user_id), (11, "add", other.get_by_email("late@example.com").user_id)]
+
+class FailingCommit:
+    """
+    Connection whose transactions roll back and fail when they should commit.
+    """
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+    def __enter__(self):
+        return self.conn.__enter__()
+
+    def __exit__(self, *exc_info):
+        self.conn.rollback()
+        raise sqlite3.OperationalError("disk I/O error")
+
+def test_sqlite_publishes_only_committed_writes(tmp_path):
+    """
+    Test that a failed SQLite commit publishes nothing, and that a failed publication keeps the commit.
+    """
+    repo = create_repository(str(tmp_path / "users.db"), change_feed=True)
+    users = make_users(3)
+    repo.add_user(users[0])
+    conn = repo._connection()
+    repo._conn = FailingCommit(conn)
+    with pytest.raises(sqlite3.OperationalError):
+        repo.add_user(users[1])
+    with pytest.raises(sqlite3.OperationalError):
+        repo.delete_user("user0@example.com")
+    repo._conn = conn
+    assert [event.user['name'] for event in repo.change_feed.changes_since(0)] == ["User0"]
+    assert [user.name for user in repo.get_all_users()] == ["User0"]
+
+    def fail(changes):
+        raise OSError("feed unavailable")
+
+    repo.change_feed.publish = fail
+    with pytest.raises(OSError):
+        repo.add_user(users[2])
+    assert repo.get_by_email("user2@example.com") is not None
+
+def test_changes_since_finds_its_start_by_search(tmp_path):
+    """
+    Test cursors at every position, limits, and recovery from a torn last line.
+    """
+    feed = ChangeFeed(str(tmp_path / "users.json.changes"))
+    assert feed.changes_since(0) == [] and feed.last_seq() == 0
+    for user in make_users(30):
+        feed.publish([("add", user)])
+    for seq in range(0, 31):
+        assert [event.seq for event in feed.changes_since(seq)] == list(range(seq + 1, 31))
+    assert [event.seq for event in feed.changes_since(10, limit=3)] == [11, 12, 13]
+    with open(feed.path, 'a') as f:
+        f.write('{"seq": 31, "op": "add", "us')  # a crash in the middle of an append
+    other = ChangeFeed(feed.path)
+    assert other.last_seq() == 30 and len(other.changes_since(25)) == 5
+    other.publish([("add", User("Next", "next@example.com", "Password1@"))])
+    assert [event.seq for event in feed.changes_since(29)] == [30, 31]
+
+def test_subscription_receives_events_in_order(tmp_path):
+    """
+    Test live delivery, replay from a cursor, and closing.
+    """
+    feed = ChangeFeed(str(tmp_path / "users.json.changes"))
+    users = make_users(3)
+    feed.publish([("add", users[0])])
+    live = feed.subscribe()
+    replay = feed.subscribe(since=0)
+    feed.publish([("add", users[1]), ("add", users[2])])
+    assert [live.get(timeout=1).seq for _ in range(2)] == [2, 3]
+    assert live.get(timeout=0.01) is None
+    assert [replay.get(timeout=1).seq for _ in range(3)] == [1, 2, 3]
+    live.close()
+    with pytest.raises(SubscriptionClosed):
+        live.get()
+    feed.publish([("delete", users[0])])
+    assert replay.get(timeout=1).op == "delete"
+
+def test_slow_subscriber_applies_backpressure_then_catches_up(tmp_path):
+    """
+    Test that a full queue blocks the writer for block_timeout, and that a
+    subscriber that fell behind still gets every event exactly once.
+    """
+    feed = ChangeFeed(str(tmp_path / "users.json.changes"), block_timeout=0.05)
+    subscription = feed.subscribe(maxsize=4)
+    for user in make_users(20):
+        feed.publish([("add", user)])
+    assert subscription.lagging
+    received = []
+    writer = threading.Thread(target=lambda: [feed.publish([("add", user)]) for user in make_users(10)])
+    writer.start()
+    while len(received) < 30:
+        event = subscription.get(timeout=2)
+        assert event is not None
+        received.append(event.seq)
+    writer.join()
+    assert received == list(range(1, 31))
+    assert subscription.get(timeout=0.01) is None
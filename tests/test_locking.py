@@ -0,0 +1,88 @@
+import multiprocessing
+import os
+import threading
+import time
+from src.locking import RWLock, atomic_write
+from src.log_repository import LogUserRepository
+from src.models import User
+from src.repository import CachedUserRepository, UserRepository
+import pytest
+
+def test_rwlock_allows_concurrent_readers_and_exclusive_writer():
+    """
+    Test that readers share the lock and a writer waits for them.
+    """
+    lock = RWLock()
+    events = []
+    lock.acquire_read()
+    reader = threading.Thread(target=lambda: (lock.acquire_read(), events.append("read"), lock.release_read()))
+    reader.start()
+    reader.join(timeout=1)
+    assert events == ["read"]
+    writer = threading.Thread(target=lambda: (lock.acquire_write(), events.append("write"), lock.release_write()))
+    writer.start()
+    time.sleep(0.05)
+    assert events == ["read"]
+    lock.release_read()
+    writer.join(timeout=1)
+    assert events == ["read", "write"]
+
+def test_rwlock_is_reentrant_for_writer_but_not_upgradable():
+    lock = RWLock()
+    with lock.write_locked():
+        with lock.read_locked(), lock.write_locked():
+            assert lock.owned_for_write()
+    assert not lock.owned_for_write()
+    with lock.read_locked():
+        with pytest.raises(RuntimeError):
+            lock.acquire_write()
+
+def test_atomic_write_keeps_old_file_on_error(tmp_path):
+    path = str(tmp_path / "users.json")
+    with atomic_write(path) as f:
+        f.write("[]")
+    with pytest.raises(ValueError):
+        with atomic_write(path) as f:
+            f.write("[{")
+            raise ValueError("crash")
+    with open(path) as f:
+        assert f.read() == "[]"
+    assert os.listdir(tmp_path) == ["users.json"]
+
+@pytest.mark.parametrize("repo_class", [UserRepository, CachedUserRepository, LogUserRepository])
+def test_concurrent_threads_lose_no_writes(tmp_path, repo_class):
+    """
+    Test that concurrent add_user calls from several threads all persist.
+    """
+    path = str(tmp_path / "users.json")
+    repo = repo_class(path)
+
+    def worker(n):
+        for i in range(10):
+            assert repo.add_user(User(f"User{n}x{i}", f"user{n}x{i}@example.com", "Password1@"))
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(repo_class(path).get_all_users()) == 40
+
+def _add_users(path, backend, worker, count):
+    repo = {"json": UserRepository, "log": LogUserRepository}[backend](path)
+    for i in range(count):
+        repo.add_user(User(f"User{worker}x{i}", f"user{worker}x{i}@example.com", "Password1@"))
+
+@pytest.mark.skipif(os.name == "nt", reason="advisory file locks need fcntl")
+@pytest.mark.parametrize("backend", ["json", "log"])
+def test_concurrent_processes_lose_no_writes(tmp_path, backend):
+    """
+    Test that several processes writing the same data file lose no updates.
+    """
+    path = str(tmp_path / "users.json")
+    processes = [multiprocessing.Process(target=_add_users, args=(path, backend, n, 10)) for n in range(3)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert len(LogUserRepository(path).get_all_users() if backend == "log" else UserRepository(path).get_all_users()) == 30
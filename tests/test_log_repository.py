@@ -0,0 +1,118 @@
+import json
+import os
+from src.models import User
+from src.log_repository import LogUserRepository
+from src.repository import CorruptDataError, UserRepository, create_repository
+import pytest
+
+def test_log_repository_appends_instead_of_rewriting(tmp_path):
+    """
+    Test that adds and deletes go to the log and leave the snapshot untouched.
+    """
+    path = str(tmp_path / "users.json")
+    repo = LogUserRepository(path, compact_threshold=None)
+    alice = User("Alice", "alice@example.com", "Password1@")
+    assert repo.add_user(alice) is True
+    assert repo.add_user(User("Bob", "alice@example.com", "Password2@")) is False
+    repo.add_user(User("Carol", "carol@example.com", "Password1@"))
+    assert repo.delete_user("carol@example.com") is True
+    with open(path) as f:
+        assert json.load(f) == []
+    with open(repo.log_path) as f:
+        assert [json.loads(line)["op"] for line in f] == ["add", "add", "delete"]
+    assert [u.email for u in repo.get_all_users()] == ["alice@example.com"]
+
+def test_log_repository_replays_on_startup(tmp_path):
+    """
+    Test that a new repository instance rebuilds its state from snapshot and log.
+    """
+    path = str(tmp_path / "users.json")
+    UserRepository(path).add_user(User("Dave", "dave@example.com", "Password1@"))
+    repo = LogUserRepository(path, compact_threshold=None)
+    repo.add_user(User("Erin", "erin@example.com", "Password1@"))
+    repo.delete_user("dave@example.com")
+    reopened = LogUserRepository(path, compact_threshold=None)
+    assert [u.email for u in reopened.get_all_users()] == ["erin@example.com"]
+    assert reopened.get_by_email("erin@example.com") is not None
+
+def test_log_repository_compaction(tmp_path):
+    """
+    Test that compaction folds the log into the JSON snapshot.
+    """
+    path = str(tmp_path / "users.json")
+    repo = LogUserRepository(path, compact_threshold=1)
+    repo.add_user(User("Frank", "frank@example.com", "Password1@"))
+    repo.wait_for_compaction()
+    with open(path) as f:
+        assert [u["email"] for u in json.load(f)] == ["frank@example.com"]
+    with open(repo.log_path) as f:
+        assert f.read() == ""
+    assert [u.email for u in LogUserRepository(path).get_all_users()] == ["frank@example.com"]
+
+def test_log_repository_ignores_torn_record(tmp_path):
+    path = str(tmp_path / "users.json")
+    repo = LogUserRepository(path, compact_threshold=None)
+    repo.add_user(User("Gina", "gina@example.com", "Password1@"))
+    with open(repo.log_path, "a") as f:
+        f.write('{"op": "add", "user": {"na')
+    reopened = LogUserRepository(path, compact_threshold=None)
+    assert [u.email for u in reopened.get_all_users()] == ["gina@example.com"]
+    # The next append drops the torn record instead of gluing itself to it
+    reopened.add_user(User("Hugo", "hugo@example.com", "Password1@"))
+    assert [u.email for u in LogUserRepository(path).get_all_users()] == ["gina@example.com", "hugo@example.com"]
+
+def test_log_repository_rejects_corrupt_middle_record(tmp_path):
+    """
+    Test that a damaged record followed by more records raises instead of being skipped.
+    """
+    path = str(tmp_path / "users.json")
+    repo = LogUserRepository(path, compact_threshold=None)
+    repo.add_user(User("Ivan", "ivan@example.com", "Password1@"))
+    jane = User("Jane", "jane@example.com", "Password1@")
+    with open(repo.log_path, "a") as f:
+        f.write('{"op": "delete", "user_id\n')
+        f.write(json.dumps({"op": "add", "user": jane.to_dict()}) + "\n")
+    with pytest.raises(CorruptDataError, match="users.json.log"):
+        LogUserRepository(path, compact_threshold=None).get_all_users()
+    with pytest.raises(CorruptDataError):
+        repo.add_user(User("Kurt", "kurt@example.com", "Password1@"))
+
+def test_log_repository_fsyncs_appends(tmp_path, monkeypatch):
+    """
+    Test that appends are fsynced unless LOG_SYNC turns it off.
+    """
+    synced = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: synced.append(fd) or real_fsync(fd))
+    repo = LogUserRepository(str(tmp_path / "users.json"), compact_threshold=None)
+    repo._ensure_data_directory()
+    synced.clear()
+    repo.add_user(User("Kate", "kate@example.com", "Password1@"))
+    assert len(synced) == 1
+    monkeypatch.setenv("LOG_SYNC", "False")
+    repo = LogUserRepository(str(tmp_path / "other.json"), compact_threshold=None)
+    repo._ensure_data_directory()
+    synced.clear()
+    repo.add_user(User("Kate", "kate@example.com", "Password1@"))
+    assert synced == []
+
+def test_create_repository_log_backend(tmp_path):
+    assert isinstance(create_repository(str(tmp_path / "users.json"), "log"), LogUserRepository)
+
+def test_log_repository_delete_many_appends_tombstones(tmp_path):
+    """
+    Test that a batch delete is one append of tombstones and leaves the snapshot alone.
+    """
+    path = str(tmp_path / "users.json")
+    repo = LogUserRepository(path, compact_threshold=None)
+    users = [User(f"User{i}", f"user{i}@example.com", "Password1@") for i in range(3)]
+    repo.bulk_add_users(users)
+    with open(path) as f:
+        snapshot = f.read()
+    assert repo.delete_many([users[0].user_id, users[2].user_id]) == 2
+    with open(path) as f:
+        assert f.read() == snapshot
+    with open(repo.log_path) as f:
+        records = [json.loads(line) for line in f]
+    assert sorted(r["user_id"] for r in records if r["op"] == "delete") == sorted([users[0].user_id, users[2].user_id])
+    assert [u.name for u in LogUserRepository(path, compact_threshold=None).get_all_users()] == ["User1"]
@@ -0,0 +1,85 @@
+import json
+import pstats
+from src import metrics
+from src.metrics import MetricsRegistry
+from src.models import User
+from src.repository import CachedUserRepository
+import pytest
+
+@pytest.fixture
+def registry():
+    metrics.REGISTRY.reset()
+    metrics.REGISTRY.enabled = True
+    yield metrics.REGISTRY
+    metrics.REGISTRY.enabled = False
+    metrics.REGISTRY.reset()
+
+def test_disabled_registry_records_nothing():
+    """
+    Test that recording calls are no-ops while metrics are disabled.
+    """
+    registry = MetricsRegistry()
+    registry.inc("requests_total")
+    registry.observe("latency_seconds", 0.1)
+    with registry.timer("block"):
+        pass
+    assert registry.timed("fn")(lambda x: x + 1)(1) == 2
+    assert registry.snapshot() == {"counters": {}, "histograms": {}}
+
+def test_counters_histograms_and_prometheus_text():
+    """
+    Test counter and histogram samples and their Prometheus rendering.
+    """
+    registry = MetricsRegistry(enabled=True)
+    registry.inc("requests_total", route="/users")
+    registry.inc("requests_total", 2, route="/users")
+    registry.observe("latency_seconds", 0.003, buckets=(0.001, 0.01), route="/users")
+    registry.observe("latency_seconds", 0.5, route="/users")
+    assert registry.snapshot()["counters"]["requests_total"] == [{"labels": {"route": "/users"}, "value": 3}]
+    text = registry.to_prometheus()
+    assert 'requests_total{route="/users"} 3' in text
+    assert 'latency_seconds_bucket{route="/users",le="0.001"} 0' in text
+    assert 'latency_seconds_bucket{route="/users",le="0.01"} 1' in text
+    assert 'latency_seconds_bucket{route="/users",le="+Inf"} 2' in text
+    assert 'latency_seconds_count{route="/users"} 2' in text
+
+def test_repository_instrumentation(registry, tmp_path):
+    """
+    Test that repository operations record latency, bytes, records per load and cache lookups.
+    """
+    path = str(tmp_path / "users.json")
+    repo = CachedUserRepository(path)
+    repo.add_user(User("Alice", "alice@example.com", "Password1@"))
+    repo.get_by_email("alice@example.com")
+    CachedUserRepository(path).get_by_email("alice@example.com")
+    data = registry.snapshot()
+    counters = {name: {json.dumps(s["labels"]): s["value"] for s in samples} for name, samples in data["counters"].items()}
+    assert counters["json_bytes_written_total"]["{}"] > 0
+    assert counters["json_bytes_read_total"]["{}"] > 0
+    assert counters["repository_cache_lookups_total"]['{"result": "hit"}'] >= 1
+    assert counters["repository_cache_lookups_total"]['{"result": "miss"}'] >= 1
+    operations = {s["labels"]["operation"]: s["count"] for s in data["histograms"]["operation_duration_seconds"]}
+    assert operations["repository.add_user"] == 1
+    assert operations["repository.get_by_email"] == 2
+    # Only the second repository read the file; it held one user
+    assert [(s["count"], s["sum"]) for s in data["histograms"]["repository_load_records"]] == [(1, 1)]
+
+def test_dump_formats(registry, tmp_path):
+    registry.inc("requests_total")
+    registry.dump(str(tmp_path / "metrics.prom"))
+    registry.dump(str(tmp_path / "metrics.json"))
+    assert "requests_total 1" in (tmp_path / "metrics.prom").read_text()
+    assert json.loads((tmp_path / "metrics.json").read_text())["counters"]["requests_total"][0]["value"] == 1
+
+def test_profiled_writes_pstats_when_enabled(tmp_path, monkeypatch):
+    """
+    Test that the cProfile hook only runs when PROFILE is enabled.
+    """
+    output = tmp_path / "profile.pstats"
+    with metrics.profiled(str(output)):
+        sum(range(10))
+    assert not output.exists()
+    monkeypatch.setenv("PROFILE", "True")
+    with metrics.profiled(str(output)):
+        sum(range(10))
+    assert pstats.Stats(str(output)).total_calls > 0
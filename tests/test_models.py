@@ -1,4 +1,5 @@
-from src.models import User
+import json
+from src.models import User, UserTable
 from src.repository import UserRepository
 import tempfile
 import os
@@ -103,4 +104,53 @@ def test_name_validation():
     for name in valid_names:
         assert len(name) >= 3 and name.isalpha()
     for name in invalid_names:
-        assert not (len(name) >= 3 and name.isalpha()) 
\ No newline at end of file
+        assert not (len(name) >= 3 and name.isalpha())
+
+def test_user_uses_slots():
+    user = User("Jane Doe", "jane@example.com", "Password1@")
+    assert not hasattr(user, "__dict__")
+
+def test_user_list_from_json():
+    """
+    Test decoding a JSON array straight into User objects.
+    """
+    text = json.dumps([
+        {"user_id": "1", "name": "Ann", "email": "ann@example.com", "password": "Password1@"},
+        {"name": "Ben", "email": "ben@example.com", "password": "Password1@"}
+    ])
+    users = User.list_from_json(text)
+    assert [u.name for u in users] == ["Ann", "Ben"]
+    assert users[0].user_id == "1"
+    assert users[1].user_id is not None
+
+def test_user_table_columns():
+    """
+    Test the columnar UserTable against the equivalent list of users.
+    """
+    users = [User(f"User{i}", f"user{i}@example.com", "Password1@") for i in range(3)]
+    table = UserTable.from_json(json.dumps([u.to_dict() for u in users]))
+    assert len(table) == 3
+    assert table.emails == [u.email for u in users]
+    assert table[1].to_dict() == users[1].to_dict()
+    assert [u.to_dict() for u in table] == [u.to_dict() for u in UserTable(users)]
+
+def test_user_version_round_trip():
+    """
+    Test that the version stamp survives to_dict/from_dict and defaults to 1 for old records.
+    """
+    user = User("John Doe", "john@example.com", "Password1!", version=3)
+    assert User.from_dict(user.to_dict()).version == 3
+    assert User.from_dict({"name": "Ann", "email": "ann@example.com", "password": "x"}).version == 1
+    assert UserTable([user])[0].version == 3
+
+def test_user_table_snapshot(tmp_path):
+    """
+    Test that a saved table loads back only for the stamp it was written with.
+    """
+    users = [User(f"User{i}", f"user{i}@example.com", "Password1@", version=i + 1) for i in range(3)]
+    path = str(tmp_path / "users.snapshot")
+    UserTable(users).save(path, ("users.json", 1, 2))
+    table = UserTable.load(path, ("users.json", 1, 2))
+    assert [u.to_dict() for u in table.to_users()] == [u.to_dict() for u in users]
+    assert UserTable.load(path, ("users.json", 1, 3)) is None
+    assert UserTable.load(str(tmp_path / "missing.snapshot"), None) is None
@@ -0,0 +1,72 @@
+import random
+from src.models import User
+from src.name_index import NameIndex
+from src.repository import CachedUserRepository, UserRepository
+
+def test_search_ranks_prefix_matches_first():
+    """
+    Test that prefix matches come before other substring matches.
+    """
+    index = NameIndex([("1", "Malice"), ("2", "Alice"), ("3", "Bob"), ("4", "alicia")])
+    assert index.search("ALI") == ["2", "4", "1"]
+    assert index.search("al") == ["2", "4", "1"]
+    assert index.search("ali", limit=1) == ["2"]
+    assert index.search("zzz") == []
+    assert index.search("") == ["2", "4", "3", "1"]
+
+def test_add_and_remove_keep_index_consistent():
+    index = NameIndex()
+    index.add("1", "Carol")
+    index.add("2", "Caroline")
+    index.remove("1")
+    assert index.search("carol") == ["2"]
+    index.add("2", "Dave")
+    assert index.search("carol") == []
+    assert index.search("ave") == ["2"]
+    index.remove("missing")
+    assert len(index) == 1
+
+def test_prefix_and_contains_lookups():
+    """
+    Test the lookups the query planner uses, and its candidate counts.
+    """
+    index = NameIndex([("1", "Malice"), ("2", "Alice"), ("3", "Bob"), ("4", "alicia")])
+    assert index.prefix("AL") == ["2", "4"] and index.prefix("al", reverse=True) == ["4", "2"]
+    assert index.prefix_count("al") == 2 and index.prefix_count("") == 4 and index.prefix_count("x") == 0
+    assert index.contains("lic") == ["1", "2", "4"]
+    assert index.contains_estimate("lic") == 3 and index.contains_estimate("li") is None
+
+def test_search_matches_linear_scan():
+    """
+    Test index results against a plain case-insensitive scan on random names.
+    """
+    rng = random.Random(7)
+    names = ["".join(rng.choice("abcAB") for _ in range(rng.randint(1, 6))) for _ in range(300)]
+    index = NameIndex((str(i), name) for i, name in enumerate(names))
+    for query in ["a", "Ab", "bca", "aaB", "cc", "abab"]:
+        expected = {str(i) for i, name in enumerate(names) if query.lower() in name.lower()}
+        assert set(index.search(query)) == expected
+
+def test_persisted_index_is_used_only_for_same_stamp(tmp_path):
+    path = str(tmp_path / "users.json.names")
+    NameIndex([("1", "Erin")]).save(path, ("users.json", 1, 2))
+    loaded = NameIndex.load(path, ("users.json", 1, 2))
+    assert loaded.search("eri") == ["1"]
+    assert NameIndex.load(path, ("users.json", 1, 3)) is None
+    assert NameIndex.load(str(tmp_path / "missing"), None) is None
+
+def test_repository_find_by_name_with_index(tmp_path):
+    """
+    Test find_by_name on the cached repository against the plain JSON repository.
+    """
+    path = str(tmp_path / "users.json")
+    repo = CachedUserRepository(path)
+    for name in ["Malice", "Alice", "Bob", "Alicia"]:
+        repo.add_user(User(name, f"{name.lower()}@example.com", "Password1@"))
+    repo.delete_user("bob@example.com")
+    expected = [u.name for u in UserRepository(path).find_by_name("ali")]
+    assert expected == ["Alice", "Alicia", "Malice"]
+    assert [u.name for u in repo.find_by_name("ali")] == expected
+    assert [u.name for u in repo.find_by_name("ali", limit=2)] == expected[:2]
+    reopened = CachedUserRepository(path)
+    assert [u.name for u in reopened.find_by_name("ALI")] == expected
@@ -0,0 +1,104 @@
+from src.bulk import validate_record
+from src.models import User
+from src.passwords import PasswordHasher, is_hashed, migrate_passwords
+from src.repository import create_repository
+import pytest
+
+FAST_SCRYPT = PasswordHasher("scrypt", cost=4)
+FAST_PBKDF2 = PasswordHasher("pbkdf2_sha256", cost=1000)
+
+@pytest.mark.parametrize("hasher", [FAST_SCRYPT, FAST_PBKDF2])
+def test_hash_and_verify(hasher):
+    """
+    Test that hashes are salted per call, store their cost and verify.
+    """
+    first, second = hasher.hash("Password1@"), hasher.hash("Password1@")
+    assert first != second
+    assert first.split("$")[:2] == [hasher.algorithm, str(hasher.cost)]
+    assert is_hashed(first)
+    assert hasher.verify("Password1@", first)
+    assert not hasher.verify("Password2@", first)
+    assert not hasher.needs_rehash(first)
+
+def test_needs_rehash_when_cost_or_algorithm_changes():
+    """
+    Test that old hashes still verify but are flagged for rehashing.
+    """
+    stored = FAST_SCRYPT.hash("Password1@")
+    stronger = PasswordHasher("scrypt", cost=5)
+    assert stronger.verify("Password1@", stored)
+    assert stronger.needs_rehash(stored)
+    assert FAST_PBKDF2.needs_rehash(stored)
+
+def test_malformed_or_too_costly_hashes_never_run():
+    """
+    Test that hash-shaped values with a huge cost or a bad salt/key are not hashes and match no password.
+    """
+    _, _, salt, key = FAST_SCRYPT.hash("Password1@").split("$")
+    for crafted in [f"scrypt$40${salt}${key}", f"pbkdf2_sha256$4000000000${salt}${key}", f"scrypt$4$!{salt[1:]}${key}",
+                    f"scrypt$4${salt}${key[:-2]}", f"scrypt$\u0664${salt}${key}", "scrypt$40$a$b"]:
+        assert not is_hashed(crafted)
+        assert not FAST_SCRYPT.verify("Password1@", crafted)
+        assert not FAST_SCRYPT.verify(crafted, crafted)
+        assert FAST_SCRYPT.needs_rehash(crafted)
+    with pytest.raises(ValueError):
+        PasswordHasher("scrypt", cost=40)
+    # An import can no longer skip the password rules with such a value
+    assert validate_record({"name": "Eve", "email": "eve@example.com", "password": "scrypt$40$a$b"}) is not None
+
+def test_plain_text_passwords_are_legacy():
+    """
+    Test that unmigrated plain text passwords verify and need a rehash.
+    """
+    assert not is_hashed("Password1@")
+    assert FAST_SCRYPT.verify("Password1@", "Password1@")
+    assert not FAST_SCRYPT.verify("Password2@", "Password1@")
+    assert FAST_SCRYPT.needs_rehash("Password1@")
+    with pytest.raises(ValueError):
+        PasswordHasher("md5")
+
+def test_hash_many_uses_worker_processes():
+    """
+    Test that parallel hashing returns one valid hash per password, in order.
+    """
+    passwords = [f"Password{i}@" for i in range(20)]
+    hashes = FAST_SCRYPT.hash_many(passwords, workers=2)
+    assert len(hashes) == 20
+    assert all(FAST_SCRYPT.verify(p, h) for p, h in zip(passwords, hashes))
+
+@pytest.mark.parametrize("backend", ["json", "cached", "log"])
+def test_migrate_passwords(tmp_path, backend):
+    """
+    Test that migration hashes plain text passwords once and keeps the users.
+    """
+    path = str(tmp_path / "users.json")
+    repo = create_repository(path, backend)
+    repo.add_user(User("Alice", "alice@example.com", "Password1@"))
+    repo.add_user(User("Bob", "bob@example.com", FAST_SCRYPT.hash("Password2@")))
+    assert migrate_passwords(repo, FAST_SCRYPT, workers=1) == 1
+    assert migrate_passwords(repo, FAST_SCRYPT, workers=1) == 0
+    users = create_repository(path, backend).get_all_users()
+    assert [u.name for u in users] == ["Alice", "Bob"]
+    assert FAST_SCRYPT.verify("Password1@", users[0].password)
+    assert FAST_SCRYPT.verify("Password2@", users[1].password)
+
+def test_migrate_passwords_skips_users_changed_meanwhile(tmp_path):
+    """
+    Test that migration hashes without the write lock and skips a user another writer changed meanwhile.
+    """
+    repo = create_repository(str(tmp_path / "users.json"))
+    users = [User(f"User{i}", f"user{i}@example.com", "Password1@") for i in range(5)]
+    repo.bulk_add_users(users)
+    hasher = PasswordHasher("scrypt", cost=4)
+
+    def hash_users_racing(plain, batch_size, workers):
+        # Another writer renames a user while its password is being hashed
+        repo.update_user(users[2].user_id, name="Renamed")
+        return FAST_SCRYPT.hash_users(plain, batch_size, workers)
+
+    hasher.hash_users = hash_users_racing
+    assert migrate_passwords(repo, hasher, workers=1, batch_size=2) == 4
+    assert repo.get_by_id(users[2].user_id).name == "Renamed"
+    assert not is_hashed(repo.get_by_id(users[2].user_id).password)
+    assert migrate_passwords(repo, FAST_SCRYPT, workers=1) == 1
+    assert all(FAST_SCRYPT.verify("Password1@", user.password) for user in repo.get_all_users())
@@ -0,0 +1,94 @@
+import random
+from src.models import User
+from src.query import UserQuery
+from src.repository import create_repository
+import pytest
+
+BACKENDS = [
+    ("json", "users.json"), ("cached", "users.json"), ("log", "users.json"), ("sqlite", "users.db"),
+    ("binary", "users.bin"), ("sharded", "users.json")
+]
+
+def make_users(count):
+    rng = random.Random(7)
+    first = ["Ana", "anabel", "Andrés", "Bob", "Bobby", "Carla", "carl", "Dan", "ÉLODIE", "élise", "Émile"]
+    domains = ["example.com", "Example.org", "mail.test"]
+    return [User(f"{rng.choice(first)} {i}", f"user{i}@{rng.choice(domains)}", "Password1@", version=i % 4 + 1)
+            for i in range(count)]
+
+def expected(users, **criteria):
+    query = UserQuery(**criteria)
+    matches = [user for user in users if query.matches(user)]
+    if query.order_field:
+        matches.sort(key=query.sort_key(), reverse=query.descending)
+    return matches[:query.limit]
+
+@pytest.mark.parametrize("backend, filename", BACKENDS)
+def test_query_matches_a_linear_scan(tmp_path, backend, filename):
+    """
+    Test combined conditions, orders and limits against filtering and sorting every user.
+    """
+    repo = create_repository(str(tmp_path / filename), backend)
+    users = make_users(120)
+    repo.bulk_add_users(users)
+    cases = [
+        {"name_prefix": "an"}, {"name_prefix": "ANA", "email_domain": "EXAMPLE.com"},
+        {"email_domain": "example.org", "order_by": "name", "limit": 5},
+        {"name_prefix": "bob", "order_by": "-name", "limit": 3},
+        {"name_contains": "arl", "order_by": "email"}, {"name_contains": "1", "order_by": "-version", "limit": 7},
+        {"order_by": "user_id", "limit": 4}, {"email": users[7].email},
+        {"user_id": users[9].user_id, "name_prefix": "zzz"}, {"name_prefix": "dan", "limit": 0},
+        {"name_prefix": "él"}, {"name_prefix": "ÉL", "order_by": "-name", "limit": 4},
+        {"name_contains": "LOD", "order_by": "name"}, {"order_by": "name"},
+    ]
+    for criteria in cases:
+        result = list(repo.query(**criteria))
+        reference = expected(users, **criteria)
+        if "order_by" in criteria:
+            key = UserQuery(**criteria).sort_key()
+            assert [key(user) for user in result] == [key(user) for user in reference], criteria
+        else:
+            assert {user.user_id for user in result} == {user.user_id for user in reference}, criteria
+    with pytest.raises(ValueError):
+        repo.query(order_by="password")
+
+def test_cached_planner_picks_the_most_selective_index(tmp_path):
+    """
+    Test the plan of each kind of query, and that the domain index follows writes.
+    """
+    repo = create_repository(str(tmp_path / "users.json"), "cached")
+    users = make_users(60) + [User("Zoe", "zoe@rare.net", "Password1@")]
+    repo.bulk_add_users(users)
+    plan = repo.query(name_prefix="zo", email_domain="example.com").plan
+    assert (plan.index, plan.candidates, plan.filters) == ("name", 1, ["email_domain = 'example.com'"])
+    plan = repo.query(name_prefix="a", email_domain="rare.net", order_by="name", limit=2).plan
+    assert (plan.index, plan.candidates, plan.order) == ("email_domain", 1, "top-k heap")
+    assert repo.query(name_prefix="bob", order_by="-name", limit=2).plan.order == "index"
+    assert repo.query(user_id=users[0].user_id, email_domain="rare.net").plan.index == "user_id"
+    assert repo.query(name_contains="arl").plan.index == "name"
+    plan = repo.query(name_contains="an", order_by="email").plan
+    assert (plan.index, plan.order, str(plan)) == (None, "sort", "full scan (61 candidates), "
+                                                   "filter name_contains = 'an', order: sort")
+    repo.update_user(users[-1].user_id, email="zoe@example.com")
+    repo.add_user(User("Yan", "yan@RARE.net", "Password1@"))
+    assert [user.name for user in repo.query(email_domain="rare.net")] == ["Yan"]
+    repo.delete_user("yan@RARE.net")
+    assert list(repo.query(email_domain="rare.net")) == []
+    assert [user.name for user in repo.query(name_prefix="zo", email_domain="example.com")] == ["Zoe"]
+
+@pytest.mark.parametrize("backend, filename", [("sqlite", "users.db"), ("sharded", "users.json")])
+def test_plan_reports_backend_index(tmp_path, backend, filename):
+    """
+    Test that SQLite reports the index it chose, and a sharded store the plans of its shards.
+    """
+    repo = create_repository(str(tmp_path / filename), backend)
+    users = make_users(40)
+    repo.bulk_add_users(users)
+    plan = repo.query(email_domain="mail.test", order_by="name", limit=3).plan
+    assert plan.index == "email_domain"
+    if backend == "sqlite":
+        assert "users_email_domain" in plan.detail and plan.order == "sort"
+        assert repo.query(name_prefix="an", order_by="name").plan.order == "index"
+    else:
+        assert plan.order == "merge" and len(plan.parts) == 4
+        assert len(repo.query(user_id=users[0].user_id).plan.parts) == 1
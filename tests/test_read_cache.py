@@ -0,0 +1,167 @@
+import threading
+from src.cache import LRUCache
+from src.models import User
+from src.read_cache import ReadThroughCache, read_cache_from_config
+from src.repository import create_repository
+import pytest
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def as_dicts(result):
+    if isinstance(result, list):
+        return [user.to_dict() for user in result]
+    return None if result is None else result.to_dict()
+
+def make_users(count):
+    return [User(f"User{i}", f"user{i}@example.com", "Password1@") for i in range(count)]
+
+@pytest.mark.parametrize("backend, filename", [
+    ("json", "users.json"), ("cached", "users.json"), ("log", "users.json"), ("sqlite", "users.db"),
+    ("binary", "users.bin"), ("sharded", "users.json")
+])
+def test_cached_reads_follow_every_write(tmp_path, backend, filename):
+    """
+    Test that cached lookups always agree with the repository through adds, updates and deletes.
+    """
+    repo = create_repository(str(tmp_path / filename), backend)
+    users = make_users(30)
+    repo.bulk_add_users(users)
+    cache = ReadThroughCache(repo)
+
+    def check():
+        for email in ["user3@example.com", "user4@example.com", "new@example.com", "moved@example.com"]:
+            assert as_dicts(cache.get_by_email(email)) == as_dicts(repo.get_by_email(email))
+        for user_id in [users[3].user_id, users[4].user_id]:
+            assert as_dicts(cache.get_by_id(user_id)) == as_dicts(repo.get_by_id(user_id))
+        for name, limit in [("user1", None), ("USER2", 3), ("new", None), ("er", 5), ("", 2), ("x", None)]:
+            assert as_dicts(cache.find_by_name(name, limit)) == as_dicts(repo.find_by_name(name, limit))
+
+    check()
+    check()
+    assert cache.stats()['hits'] == 12
+    cache.add_user(User("Newcomer", "new@example.com", "Password1@"))
+    check()
+    cache.update_user(users[3].user_id, email="moved@example.com", name="Xavier")
+    check()
+    repo.delete_user("user4@example.com")
+    check()
+    cache.delete_many([users[1].user_id, users[10].user_id])
+    check()
+
+def test_invalidation_only_drops_affected_entries(tmp_path):
+    """
+    Test that a write drops the lookups of the changed user and the name searches it matches, and nothing else.
+    """
+    repo = create_repository(str(tmp_path / "users.json"))
+    users = make_users(20)
+    repo.bulk_add_users(users)
+    cache = ReadThroughCache(repo)
+    cache.get_by_email("user5@example.com")
+    cache.get_by_email("ann@example.com")
+    cache.get_by_id(users[6].user_id)
+    cache.find_by_name("user1")
+    cache.find_by_name("an")
+    cache.find_by_name("zz")
+    repo.add_user(User("Ann", "ann@example.com", "Password1@"))
+    assert cache.invalidations == 2  # the negative email lookup and the "an" search
+    assert cache.stats()['size'] == 4
+    assert cache.get_by_email("ann@example.com").name == "Ann"
+    assert [user.name for user in cache.find_by_name("an")] == ["Ann"]
+    cache.delete_user("user5@example.com")
+    assert cache.invalidations == 3
+    assert cache.get_by_email("user5@example.com") is None
+    cache.update_user(users[12].user_id, name="Renamed")
+    assert cache.invalidations == 4  # "user1" held User12; "zz" and the UserID lookup of User6 are kept
+    assert [user.name for user in cache.find_by_name("user1")] == ["User1"] + [f"User{i}" for i in range(10, 20)
+                                                                               if i != 12]
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (0, 10)
+    cache.find_by_name("zz")
+    cache.get_by_id(users[6].user_id)
+    assert cache.stats()['hits'] == 2
+
+def test_concurrent_reads_never_keep_a_stale_result(tmp_path):
+    """
+    Test that results read while a writer renames users are not cached past the rename.
+    """
+    repo = create_repository(str(tmp_path / "users.json"))
+    users = make_users(10)
+    repo.bulk_add_users(users)
+    cache = ReadThroughCache(repo)
+    done = threading.Event()
+
+    def read():
+        while not done.is_set():
+            for user in users:
+                cache.get_by_id(user.user_id)
+                cache.find_by_name(user.name[:5])
+
+    readers = [threading.Thread(target=read) for _ in range(3)]
+    for reader in readers:
+        reader.start()
+    for step in range(20):
+        for user in users:
+            cache.update_user(user.user_id, name=f"{user.name[:5]}-{step}")
+    done.set()
+    for reader in readers:
+        reader.join()
+    for user in users:
+        assert cache.get_by_id(user.user_id).name == repo.get_by_id(user.user_id).name
+        assert as_dicts(cache.find_by_name(user.name[:5])) == as_dicts(repo.find_by_name(user.name[:5]))
+
+def test_entries_expire_and_memory_is_bounded(tmp_path):
+    """
+    Test the per-entry TTLs and that the estimated memory stays under max_bytes.
+    """
+    repo = create_repository(str(tmp_path / "users.json"))
+    repo.bulk_add_users(make_users(200))
+    clock = FakeClock()
+    cache = ReadThroughCache(repo, maxsize=1000, max_bytes=20000, ttl=60, negative_ttl=5, clock=clock)
+    cache.get_by_email("user1@example.com")
+    cache.get_by_email("nobody@example.com")
+    clock.now = 10
+    cache.get_by_email("user1@example.com")
+    cache.get_by_email("nobody@example.com")
+    assert cache.stats()['hits'] == 1
+    assert as_dicts(cache.find_by_name("user")) == as_dicts(repo.find_by_name("user"))  # too large to keep
+    for i in range(200):
+        cache.get_by_id(repo.get_by_email(f"user{i}@example.com").user_id)
+    stats = cache.stats()
+    assert 0 < stats['bytes'] <= 20000 and stats['evictions'] > 0
+    assert stats['size'] < 200
+    cache.restore_users(make_users(3))
+    assert cache.stats()['size'] == 0 and cache.get_by_email("user150@example.com") is None
+
+def test_lru_cache_bounds_bytes_and_reports_discards():
+    """
+    Test that entries are evicted to stay under max_bytes, and that evicted and expired entries are reported.
+    """
+    clock = FakeClock()
+    discarded = []
+    cache = LRUCache(maxsize=10, ttl=10, clock=clock, max_bytes=100, on_discard=lambda k, v: discarded.append(k))
+    cache.put("a", 1, nbytes=40)
+    cache.put("b", 2, nbytes=40, ttl=1)
+    cache.put("c", 3, nbytes=40)
+    assert (discarded, cache.nbytes) == (["a"], 80)
+    clock.now = 2
+    assert cache.get("b") is None and cache.get("c") == 3
+    assert (discarded, cache.nbytes) == (["a", "b"], 40)
+    assert cache.pop("c") == 3 and cache.nbytes == 0 and discarded == ["a", "b"]
+
+def test_read_cache_from_config(tmp_path, monkeypatch):
+    """
+    Test that the cache is only added when READ_CACHE_SIZE is set.
+    """
+    repo = create_repository(str(tmp_path / "users.json"))
+    monkeypatch.delenv("READ_CACHE_SIZE", raising=False)
+    assert read_cache_from_config(repo) is repo
+    monkeypatch.setenv("READ_CACHE_SIZE", "100")
+    monkeypatch.setenv("READ_CACHE_TTL", "30")
+    cache = read_cache_from_config(repo)
+    assert isinstance(cache, ReadThroughCache) and cache._cache.ttl == 30 and cache._cache.maxsize == 100
+    assert cache.file_path == repo.file_path
@@ -0,0 +1,253 @@
+import io
+import json
+import os
+from src.models import User
+from src.repository import (CachedUserRepository, UserRepository, VersionConflictError, create_repository, dump_users,
+                            iter_json_array)
+import pytest
+
+def test_cached_repository_point_lookups(tmp_path):
+    """
+    Test O(1) lookups by email and user_id on the cached repository.
+    """
+    repo = CachedUserRepository(str(tmp_path / "users.json"))
+    user = User("Alice", "alice@example.com", "Password1@")
+    assert repo.add_user(user) is True
+    assert repo.add_user(User("Bob", "alice@example.com", "Password2@")) is False
+    assert repo.get_by_email("alice@example.com").user_id == user.user_id
+    assert repo.get_by_id(user.user_id).email == "alice@example.com"
+    assert repo.get_by_email("missing@example.com") is None
+
+def test_cached_repository_reloads_when_file_changes(tmp_path):
+    """
+    Test that writes made by another repository are picked up by the cache.
+    """
+    path = str(tmp_path / "users.json")
+    cached = CachedUserRepository(path)
+    assert cached.get_all_users() == []
+    other = UserRepository(path)
+    other.add_user(User("Carol", "carol@example.com", "Password1@"))
+    assert [u.email for u in cached.get_all_users()] == ["carol@example.com"]
+    assert cached.get_by_email("carol@example.com") is not None
+
+def test_cached_repository_reloads_file_replaced_with_same_mtime_and_size(tmp_path):
+    """
+    Test that a file moved into place is picked up even when its mtime and size match the old one.
+    """
+    path = tmp_path / "users.json"
+    UserRepository(str(path)).add_user(User("Carol", "carol@example.com", "Password1@"))
+    cached = CachedUserRepository(str(path))
+    assert cached.get_by_email("carol@example.com").name == "Carol"
+    replacement = tmp_path / "replacement.json"
+    replacement.write_text(path.read_text().replace("Carol", "Caryl"))
+    stat = path.stat()
+    os.utime(replacement, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.replace(replacement, path)
+    assert cached.get_by_email("carol@example.com").name == "Caryl"
+
+def test_cached_repository_follows_file_path(tmp_path):
+    """
+    Test that changing file_path switches the cache to the new file.
+    """
+    repo = CachedUserRepository(str(tmp_path / "a.json"))
+    repo.add_user(User("Dave", "dave@example.com", "Password1@"))
+    repo.file_path = str(tmp_path / "b.json")
+    assert repo.get_all_users() == []
+    assert repo.get_by_email("dave@example.com") is None
+
+def test_cached_repository_warm_start_from_snapshot(tmp_path, monkeypatch):
+    """
+    Test that a restart with an unchanged file reads the binary snapshot instead of the JSON.
+    """
+    path = str(tmp_path / "users.json")
+    UserRepository(path).add_user(User("Fay", "fay@example.com", "Password1@"))
+    cold = CachedUserRepository(path)
+    assert cold.get_by_email("fay@example.com") is not None
+    # Reads leave the warm-start files to the write lock holders
+    assert not (tmp_path / "users.json.snapshot").exists() and not (tmp_path / "users.json.names").exists()
+    cold.save_snapshot()
+    assert (tmp_path / "users.json.snapshot").exists() and (tmp_path / "users.json.names").exists()
+
+    def no_json(self):
+        raise AssertionError("the JSON file was parsed")
+
+    monkeypatch.setattr(UserRepository, "_load_users", no_json)
+    warm = CachedUserRepository(path)
+    assert warm.get_by_email("fay@example.com").name == "Fay"
+    assert [u.name for u in warm.find_by_name("fa")] == ["Fay"]
+    monkeypatch.undo()
+    # A stale snapshot is ignored, and replaced by the next write
+    UserRepository(path).add_user(User("Gus", "gus@example.com", "Password1@"))
+    stale = (tmp_path / "users.json.snapshot").read_bytes()
+    reloaded = CachedUserRepository(path)
+    assert len(reloaded.get_all_users()) == 2
+    assert (tmp_path / "users.json.snapshot").read_bytes() == stale
+    reloaded.add_user(User("Hal", "hal@example.com", "Password1@"))
+    assert (tmp_path / "users.json.snapshot").read_bytes() != stale
+
+@pytest.mark.parametrize("backend", ["json", "cached", "log", "binary"])
+def test_repository_creates_no_files_until_first_write(tmp_path, backend):
+    """
+    Test that opening a file repository and reading from it leaves the filesystem untouched.
+    """
+    data_dir = tmp_path / "data"
+    repo = create_repository(str(data_dir / "users.json"), backend)
+    assert repo.get_by_email("nobody@example.com") is None
+    assert not data_dir.exists()
+    repo.add_user(User("Hal", "hal@example.com", "Password1@"))
+    assert repo.get_by_email("hal@example.com").name == "Hal"
+
+def test_cached_repository_delete_user(tmp_path):
+    path = str(tmp_path / "users.json")
+    repo = CachedUserRepository(path)
+    repo.add_user(User("Erin", "erin@example.com", "Password1@"))
+    assert repo.delete_user("erin@example.com") is True
+    assert repo.delete_user("erin@example.com") is False
+    with open(path) as f:
+        assert json.load(f) == []
+
+def test_create_repository_backends(tmp_path):
+    path = str(tmp_path / "users.json")
+    assert type(create_repository(path, "json")) is UserRepository
+    assert isinstance(create_repository(path, "cached"), CachedUserRepository)
+    with pytest.raises(ValueError):
+        create_repository(path, "unknown")
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64 * 1024])
+def test_iter_json_array_matches_json_load(chunk_size):
+    """
+    Test incremental array decoding with chunks smaller than one item.
+    """
+    data = [{"name": "Ann", "tags": ["a", "b"]}, 12, "x,]", {"nested": {"k": [1, 2]}}]
+    text = json.dumps(data, indent=4)
+    assert list(iter_json_array(io.StringIO(text), chunk_size=chunk_size)) == data
+    assert list(iter_json_array(io.StringIO(" [ ] "), chunk_size=chunk_size)) == []
+
+def test_iter_json_array_rejects_invalid_content():
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array(io.StringIO('{"a": 1}')))
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array(io.StringIO('[{"a": 1} {"b": 2}]')))
+
+@pytest.mark.parametrize("repo_class", [UserRepository, CachedUserRepository])
+def test_iter_users_and_list_users(tmp_path, repo_class):
+    """
+    Test streaming iteration and pagination over stored users.
+    """
+    repo = repo_class(str(tmp_path / "users.json"))
+    repo.bulk_add_users(User(f"User{i}", f"user{i}@example.com", "Password1@") for i in range(5))
+    assert [u.name for u in repo.iter_users()] == [f"User{i}" for i in range(5)]
+    assert [u.name for u in repo.list_users(offset=1, limit=2)] == ["User1", "User2"]
+    assert [u.name for u in repo.list_users(offset=4)] == ["User4"]
+    assert repo.list_users(offset=10, limit=5) == []
+
+def test_dump_users_matches_json_dump_layout():
+    """
+    Test that the fast writer produces the same bytes as json.dump(indent=4).
+    """
+    users = [User("Zoë", "zoe@example.com", 'Pa"ss\\word1@'), User("Ann", "ann@example.com", "Password1@")]
+    out = io.StringIO()
+    dump_users(users, out)
+    assert out.getvalue() == json.dumps([u.to_dict() for u in users], indent=4)
+    out = io.StringIO()
+    dump_users([], out)
+    assert out.getvalue() == json.dumps([], indent=4)
+
+@pytest.mark.parametrize("backend, filename", [
+    ("json", "users.json"), ("cached", "users.json"), ("log", "users.json"), ("sqlite", "users.db"),
+    ("binary", "users.bin"), ("sharded", "users.json")
+])
+def test_delete_by_id_and_delete_many(tmp_path, backend, filename):
+    """
+    Test deleting by UserID, one at a time and in batches, on every backend.
+    """
+    path = str(tmp_path / filename)
+    repo = create_repository(path, backend)
+    users = [User(f"User{i}", f"user{i}@example.com", "Password1@") for i in range(5)]
+    repo.bulk_add_users(users)
+    assert repo.delete_by_id(users[0].user_id) is True
+    assert repo.delete_by_id(users[0].user_id) is False
+    assert repo.delete_many([users[1].user_id, users[3].user_id, "missing", users[1].user_id]) == 2
+    assert repo.delete_many(["missing"]) == 0
+    assert repo.apply_batch([("delete_id", users[2].user_id), ("delete_id", users[2].user_id)]) == [True, False]
+    assert [u.name for u in create_repository(path, backend).get_all_users()] == ["User4"]
+    assert repo.get_by_id(users[1].user_id) is None
+
+@pytest.mark.parametrize("backend, filename", [
+    ("json", "users.json"), ("cached", "users.json"), ("log", "users.json"), ("sqlite", "users.db"),
+    ("binary", "users.bin"), ("sharded", "users.json")
+])
+def test_add_rejects_existing_user_id(tmp_path, backend, filename):
+    """
+    Test that add_user and apply_batch refuse a UserID already stored, or added earlier in the batch.
+    """
+    path = str(tmp_path / filename)
+    repo = create_repository(path, backend)
+    assert repo.add_user(User("Alice", "alice@example.com", "Password1@", "id-1")) is True
+    assert repo.add_user(User("Alicia", "alicia@example.com", "Password1@", "id-1")) is False
+    assert repo.apply_batch([("add", User("Ali", "ali@example.com", "Password1@", "id-1")),
+                             ("add", User("Bob", "bob@example.com", "Password1@", "id-2")),
+                             ("add", User("Bobby", "bobby@example.com", "Password1@", "id-2"))]) == [False, True, False]
+    for reopened in [repo, create_repository(path, backend)]:
+        assert sorted((u.user_id, u.email) for u in reopened.get_all_users()) == [
+            ("id-1", "alice@example.com"), ("id-2", "bob@example.com")]
+        assert reopened.get_by_email("alice@example.com").name == "Alice"
+        assert reopened.get_by_email("alicia@example.com") is None
+    # A deleted UserID can be added again
+    assert repo.apply_batch([("delete_id", "id-2"), ("add", User("Bea", "bea@example.com", "Password1@", "id-2"))]) == [
+        True, True]
+    assert repo.get_by_id("id-2").name == "Bea"
+
+@pytest.mark.parametrize("backend, filename", [
+    ("json", "users.json"), ("cached", "users.json"), ("log", "users.json"), ("sqlite", "users.db"),
+    ("binary", "users.bin"), ("sharded", "users.json")
+])
+def test_update_user_checks_versions(tmp_path, backend, filename):
+    """
+    Test updates, version stamps and stale-writer rejection on every backend.
+    """
+    path = str(tmp_path / filename)
+    repo = create_repository(path, backend)
+    alice, bob = User("Alice", "alice@example.com", "Password1@"), User("Bob", "bob@example.com", "Password1@")
+    repo.bulk_add_users([alice, bob])
+    updated = repo.update_user(alice.user_id, expected_version=1, name="Alicia", email="alicia@example.com")
+    assert (updated.name, updated.email, updated.version) == ("Alicia", "alicia@example.com", 2)
+    with pytest.raises(VersionConflictError):
+        repo.update_user(alice.user_id, expected_version=1, name="Stale")
+    with pytest.raises(ValueError):
+        repo.update_user(alice.user_id, email="bob@example.com")
+    with pytest.raises(ValueError):
+        repo.update_user(alice.user_id, role="admin")
+    assert repo.update_user("missing", name="Nobody") is None
+    assert repo.get_by_email("alice@example.com") is None
+    assert repo.get_by_email("alicia@example.com").version == 2
+    assert [u.name for u in repo.find_by_name("alicia")] == ["Alicia"]
+    assert create_repository(path, backend).get_by_id(alice.user_id).name == "Alicia"
+
+@pytest.mark.parametrize("backend, filename", [
+    ("json", "users.json"), ("cached", "users.json"), ("log", "users.json"), ("sqlite", "users.db"),
+    ("binary", "users.bin"), ("sharded", "users.json")
+])
+def test_update_many_is_all_or_nothing(tmp_path, backend, filename):
+    """
+    Test that a batch of updates commits together, or not at all on a conflict.
+    """
+    path = str(tmp_path / filename)
+    repo = create_repository(path, backend)
+    users = [User(f"User{i}", f"user{i}@example.com", "Password1@") for i in range(3)]
+    repo.bulk_add_users(users)
+    # Two users swap emails: the first email is released before the second one claims it
+    results = repo.update_many([
+        {'user_id': users[0].user_id, 'version': 1, 'email': "tmp@example.com"},
+        {'user_id': users[1].user_id, 'version': 1, 'email': "user0@example.com"},
+        {'user_id': users[0].user_id, 'version': 2, 'email': "user1@example.com"},
+        {'user_id': "missing", 'name': "Nobody"},
+    ])
+    assert [r and r.version for r in results] == [2, 2, 3, None]
+    with pytest.raises(VersionConflictError):
+        repo.update_many([{'user_id': users[2].user_id, 'name': "Changed"},
+                          {'user_id': users[0].user_id, 'version': 1, 'name': "Stale"}])
+    stored = {u.user_id: u for u in create_repository(path, backend).get_all_users()}
+    assert stored[users[0].user_id].email == "user1@example.com"
+    assert stored[users[1].user_id].email == "user0@example.com"
+    assert (stored[users[2].user_id].name, stored[users[2].user_id].version) == ("User2", 1)
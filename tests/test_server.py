@@ -0,0 +1,159 @@
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from src.changes import ChangeFeed
+from src.passwords import PasswordHasher
+from src.read_cache import ReadThroughCache
+from src.repository import CachedUserRepository
+from src.server import UserHTTPServer, UserService
+import pytest
+
+HASHER = PasswordHasher("scrypt", cost=4)
+
+@pytest.fixture(params=[False, True], ids=["uncached", "read_cache"])
+def server(tmp_path, request):
+    repository = CachedUserRepository(str(tmp_path / "users.json"))
+    if request.param:
+        repository = ReadThroughCache(repository)
+    service = UserService(repository, HASHER, page_size=2)
+    server = UserHTTPServer(("127.0.0.1", 0), service)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def request(conn, method, path, body=None):
+    conn.request(method, path, body=None if body is None else json.dumps(body),
+                 headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    data = response.read()
+    return response.status, json.loads(data) if data else None
+
+def test_api_endpoints_over_one_keep_alive_connection(server):
+    """
+    Test register/list/search/get/delete/login, all on the same connection.
+    """
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+    status, alice = request(conn, "POST", "/users", {"name": "Alice", "email": "alice@example.com", "password": "Password1@"})
+    assert status == 201 and alice["name"] == "Alice" and "password" not in alice
+    sock = conn.sock
+    assert request(conn, "POST", "/users", {"name": "Alice", "email": "alice@example.com", "password": "Password1@"})[0] == 409
+    assert request(conn, "POST", "/users", {"name": "Bob", "email": "bob", "password": "Password1@"}) == (400, {"error": "invalid email"})
+    request(conn, "POST", "/users", {"name": "Alina", "email": "alina@example.com", "password": "Password1@"})
+    request(conn, "POST", "/users", {"name": "Carol", "email": "carol@example.com", "password": "Password1@"})
+    status, page = request(conn, "GET", "/users?offset=1")
+    assert status == 200 and [u["name"] for u in page["users"]] == ["Alina", "Carol"]
+    status, found = request(conn, "GET", "/users/search?name=ali&limit=5")
+    assert [u["name"] for u in found["users"]] == ["Alice", "Alina"]
+    assert request(conn, "GET", "/users/search?email=carol@example.com")[1]["users"][0]["name"] == "Carol"
+    assert request(conn, "GET", f"/users/{alice['user_id']}") == (200, alice)
+    assert request(conn, "POST", "/login", {"email": "alice@example.com", "password": "Password1@"}) == (200, alice)
+    assert request(conn, "POST", "/login", {"email": "alice@example.com", "password": "Wrong1@xx"})[0] == 401
+    assert request(conn, "DELETE", f"/users/{alice['user_id']}") == (204, None)
+    assert request(conn, "GET", f"/users/{alice['user_id']}")[0] == 404
+    assert request(conn, "GET", "/nowhere")[0] == 404
+    assert request(conn, "GET", "/users?limit=x")[0] == 400
+    assert conn.sock is sock
+    conn.close()
+
+def test_invalid_content_length_is_rejected(server):
+    """
+    Test that a negative or non-numeric Content-Length gets a 400 and closes the connection.
+    """
+    for length in ["-5", "abc", "1e3"]:
+        with socket.create_connection(("127.0.0.1", server.server_address[1]), timeout=5) as sock:
+            sock.sendall(f"POST /users HTTP/1.1\r\nHost: localhost\r\nContent-Length: {length}\r\n\r\n{{}}".encode())
+            response = b""
+            while chunk := sock.recv(4096):
+                response += chunk
+        assert response.startswith(b"HTTP/1.1 400") and b"invalid Content-Length" in response
+
+def test_patch_user_with_version_check(server):
+    """
+    Test that PATCH updates a user and rejects a stale version with 409.
+    """
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+    _, alice = request(conn, "POST", "/users", {"name": "Alice", "email": "alice@example.com", "password": "Password1@"})
+    request(conn, "POST", "/users", {"name": "Bob", "email": "bob@example.com", "password": "Password1@"})
+    assert alice["version"] == 1
+    status, renamed = request(conn, "PATCH", f"/users/{alice['user_id']}", {"name": "Alicia", "version": 1})
+    assert status == 200 and (renamed["name"], renamed["version"]) == ("Alicia", 2)
+    status, body = request(conn, "PATCH", f"/users/{alice['user_id']}", {"name": "Stale", "version": 1})
+    assert status == 409 and body["current"] == renamed
+    assert request(conn, "PATCH", f"/users/{alice['user_id']}", {"email": "bob@example.com"})[0] == 409
+    assert request(conn, "PATCH", f"/users/{alice['user_id']}", {"password": "weak"})[0] == 400
+    assert request(conn, "PATCH", "/users/missing", {"name": "Nobody"})[0] == 404
+    status, _ = request(conn, "PATCH", f"/users/{alice['user_id']}", {"password": "Newpass1@"})
+    assert request(conn, "POST", "/login", {"email": "alice@example.com", "password": "Newpass1@"})[0] == 200
+    conn.close()
+
+def test_changes_endpoint_pages_through_the_feed(server, tmp_path):
+    """
+    Test GET /changes: 404 while the feed is off, then cursor paging without password hashes.
+    """
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+    assert request(conn, "GET", "/changes")[0] == 404
+    server.service.repository.change_feed = ChangeFeed(str(tmp_path / "users.json.changes"))
+    for name in ["Ann", "Ben", "Cid"]:
+        request(conn, "POST", "/users", {"name": name, "email": f"{name.lower()}@example.com", "password": "Password1@"})
+    status, page = request(conn, "GET", "/changes?since=0&limit=2")
+    assert status == 200 and [c["user"]["name"] for c in page["changes"]] == ["Ann", "Ben"]
+    assert "password" not in page["changes"][0]["user"]
+    status, page = request(conn, "GET", f"/changes?since={page['last_seq']}")
+    assert [(c["seq"], c["op"]) for c in page["changes"]] == [(3, "add")] and page["last_seq"] == 3
+    assert request(conn, "GET", "/changes?since=3")[1] == {"changes": [], "last_seq": 3}
+
+def test_search_query_with_explain(server):
+    """
+    Test GET /users/search with query conditions, an order and the plan.
+    """
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+    for name, email in [("Ann", "ann@example.com"), ("Anton", "anton@test.org"), ("Anna", "anna@example.com")]:
+        request(conn, "POST", "/users", {"name": name, "email": email, "password": "Password1@"})
+    status, found = request(conn, "GET", "/users/search?name_prefix=an&email_domain=example.com&order_by=-name")
+    assert status == 200 and [user["name"] for user in found["users"]] == ["Anna", "Ann"] and "plan" not in found
+    status, found = request(conn, "GET", "/users/search?email_domain=test.org&explain=1")
+    assert [user["name"] for user in found["users"]] == ["Anton"]
+    assert found["plan"]["index"] == "email_domain" and found["plan"]["candidates"] == 1
+    assert request(conn, "GET", "/users/search?name_prefix=an&order_by=password")[0] == 400
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="pre-fork mode needs os.fork")
+def test_prefork_workers_share_the_data_store(tmp_path):
+    """
+    Test that users registered through one worker are visible through the others.
+    """
+    port = free_port()
+    env = dict(os.environ, DATA_FILE_PATH=str(tmp_path / "users.json"), STORAGE_BACKEND="cached",
+               PASSWORD_HASH_COST="4")
+    process = subprocess.Popen([sys.executable, "-m", "src.server", "--port", str(port), "--workers", "2"],
+                               env=env, stderr=subprocess.DEVNULL)
+    try:
+        for _ in range(100):
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                break
+            except OSError:
+                time.sleep(0.05)
+        for i in range(10):
+            conn = http.client.HTTPConnection("127.0.0.1", port)
+            body = {"name": f"User{chr(97 + i)}", "email": f"user{i}@example.com", "password": "Password1@"}
+            assert request(conn, "POST", "/users", body)[0] == 201
+            conn.close()
+        for _ in range(4):
+            conn = http.client.HTTPConnection("127.0.0.1", port)
+            assert len(request(conn, "GET", "/users?limit=100")[1]["users"]) == 10
+            conn.close()
+    finally:
+        process.terminate()
+        process.wait(10)
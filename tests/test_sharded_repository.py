@@ -0,0 +1,106 @@
+import os
+from src.models import User
+from src.repository import CachedUserRepository, VersionConflictError, create_repository
+from src.sharded_repository import ShardedUserRepository, shard_of
+import pytest
+
+def make_users(count):
+    return [User(f"User{i}", f"user{i}@example.com", "Password1@") for i in range(count)]
+
+@pytest.mark.parametrize("shard_backend", ["cached", "json", "log", "sqlite"])
+def test_sharded_repository_interface(tmp_path, shard_backend):
+    """
+    Test that users are spread over the shards and found like in a single repository.
+    """
+    repo = ShardedUserRepository(str(tmp_path / "users.json"), shards=3, shard_backend=shard_backend)
+    users = make_users(30)
+    assert repo.bulk_add_users(users) == 30
+    assert repo.add_user(User("Copy", "user7@example.com", "Password1@")) is False
+    assert repo.add_user(User("Ann", "ann@example.com", "Password1@")) is True
+    for index, shard in enumerate(repo.shards):
+        assert all(shard_of(u.user_id, 3) == index for u in shard.get_all_users())
+    assert repo.get_by_email("user12@example.com").user_id == users[12].user_id
+    assert repo.get_by_id(users[5].user_id).email == "user5@example.com"
+    assert len(repo.get_all_users()) == 31
+    assert len(repo.list_users(offset=29, limit=5)) == 2
+    assert repo.delete_user("user1@example.com") is True
+    assert repo.delete_user("user1@example.com") is False
+    assert repo.get_by_email("user1@example.com") is None
+
+def test_sharded_find_by_name_matches_single_repository(tmp_path):
+    """
+    Test that the merged fan-out search ranks results like a single cached repository.
+    """
+    names = ["Alice", "Malice", "alina", "Bob", "Ali", "Kalima", "ALIX", "Zali"]
+    users = [User(name, f"{name.lower()}{i}@example.com", "Password1@") for i, name in enumerate(names)]
+    single = CachedUserRepository(str(tmp_path / "single.json"))
+    single.bulk_add_users(users)
+    sharded = ShardedUserRepository(str(tmp_path / "users.json"), shards=4)
+    sharded.bulk_add_users(users)
+    expected = [u.name for u in single.find_by_name("ali")]
+    # Names starting with the text come first in name order; the others in storage order, which differs
+    assert [u.name for u in sharded.find_by_name("ali")][:4] == expected[:4] == ["Ali", "Alice", "alina", "ALIX"]
+    assert sorted(u.name for u in sharded.find_by_name("ali")) == sorted(expected)
+    assert [u.name for u in sharded.find_by_name("ali", limit=3)] == expected[:3]
+
+def test_sharded_repository_batches_and_updates(tmp_path):
+    """
+    Test apply_batch, delete_many and update_many across shards.
+    """
+    repo = ShardedUserRepository(str(tmp_path / "users.json"), shards=4)
+    users = make_users(6)
+    repo.bulk_add_users(users[:4])
+    assert repo.apply_batch([("add", users[4]), ("add", User("Dup", "user4@example.com", "x")),
+                             ("delete", "user0@example.com"), ("delete_id", users[0].user_id),
+                             ("delete_id", users[1].user_id)]) == [True, False, True, False, True]
+    assert repo.delete_many([users[2].user_id, users[5].user_id, "missing"]) == 1
+    assert sorted(u.email for u in repo.get_all_users()) == ["user3@example.com", "user4@example.com"]
+    # Swap emails between two users, most likely on different shards
+    results = repo.update_many([
+        {'user_id': users[3].user_id, 'version': 1, 'email': "tmp@example.com"},
+        {'user_id': users[4].user_id, 'version': 1, 'email': "user3@example.com"},
+        {'user_id': users[3].user_id, 'email': "user4@example.com"},
+    ])
+    assert [r.version for r in results] == [2, 2, 3]
+    assert repo.get_by_email("user4@example.com").user_id == users[3].user_id
+    with pytest.raises(ValueError):
+        repo.update_user(users[3].user_id, email="user3@example.com")
+    with pytest.raises(VersionConflictError):
+        repo.update_user(users[4].user_id, expected_version=1, name="Stale")
+
+def test_sharded_repository_sees_other_instances(tmp_path):
+    """
+    Test that the email index picks up users written by another instance.
+    """
+    path = str(tmp_path / "users.json")
+    first = ShardedUserRepository(path, shards=2)
+    second = create_repository(path, "sharded")
+    assert len(second.shards) == 2
+    first.add_user(User("Ann", "ann@example.com", "Password1@"))
+    assert second.get_by_email("ann@example.com").name == "Ann"
+    assert second.add_user(User("Ann", "ann@example.com", "Password1@")) is False
+    first.delete_user("ann@example.com")
+    assert second.get_by_email("ann@example.com") is None
+
+def test_reshard_moves_users_to_more_shards(tmp_path):
+    """
+    Test growing the layout while another instance keeps using the data store.
+    """
+    path = str(tmp_path / "users.json")
+    repo = ShardedUserRepository(path, shards=2)
+    other = ShardedUserRepository(path)
+    users = make_users(50)
+    repo.bulk_add_users(users)
+    repo.save_snapshot()
+    old_files = [shard.file_path for shard in repo.shards]
+    assert all(os.path.exists(f + ".snapshot") for f in old_files)
+    assert repo.reshard(5) == 50
+    with pytest.raises(ValueError):
+        repo.reshard(3)
+    assert len(repo.shards) == 5
+    assert not [name for name in os.listdir(tmp_path) for f in old_files if name.startswith(os.path.basename(f))]
+    assert all(shard_of(u.user_id, 5) == i for i, shard in enumerate(repo.shards) for u in shard.get_all_users())
+    assert other.get_by_email("user42@example.com").user_id == users[42].user_id
+    assert len(other.shards) == 5
+    other.add_user(User("New", "new@example.com", "Password1@"))
+    assert len(ShardedUserRepository(path).get_all_users()) == 51
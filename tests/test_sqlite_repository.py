@@ -0,0 +1,88 @@
+import sqlite3
+from src.models import User
+from src.repository import UserRepository, VersionConflictError, create_repository
+from src.sqlite_repository import SqliteUserRepository
+import pytest
+
+def test_sqlite_repository_interface(tmp_path):
+    """
+    Test add, lookup, search and delete on the SQLite repository.
+    """
+    repo = SqliteUserRepository(str(tmp_path / "users.db"))
+    alice = User("Alice", "alice@example.com", "Password1@")
+    assert repo.add_user(alice) is True
+    assert repo.add_user(User("Bob", "alice@example.com", "Password2@")) is False
+    repo.add_user(User("Malice", "malice@example.com", "Password1@"))
+    assert [u.name for u in repo.get_all_users()] == ["Alice", "Malice"]
+    assert repo.get_by_email("alice@example.com").user_id == alice.user_id
+    assert repo.get_by_id(alice.user_id).name == "Alice"
+    assert [u.name for u in repo.find_by_name("ALI")] == ["Alice", "Malice"]
+    assert repo.delete_user("alice@example.com") is True
+    assert repo.delete_user("alice@example.com") is False
+    assert repo.count() == 1
+
+def test_sqlite_repository_persists(tmp_path):
+    path = str(tmp_path / "users.db")
+    repo = SqliteUserRepository(path)
+    repo.add_user(User("Carol", "carol@example.com", "Password1@"))
+    repo.close()
+    assert [u.email for u in SqliteUserRepository(path).get_all_users()] == ["carol@example.com"]
+
+def test_sqlite_repository_migrates_json(tmp_path):
+    """
+    Test the one-shot migration from an existing users.json.
+    """
+    json_path = str(tmp_path / "users.json")
+    json_repo = UserRepository(json_path)
+    dave = User("Dave", "dave@example.com", "Password1@")
+    json_repo.add_user(dave)
+    json_repo.add_user(User("Erin", "erin@example.com", "Password1@"))
+    repo = SqliteUserRepository(str(tmp_path / "users.db"), migrate_from=json_path)
+    assert repo.count() == 2
+    assert repo.get_by_id(dave.user_id).email == "dave@example.com"
+    assert repo.migrate_from_json(json_path) == 0
+
+def test_create_repository_picks_sqlite_by_extension(tmp_path):
+    assert isinstance(create_repository(str(tmp_path / "users.db")), SqliteUserRepository)
+    assert isinstance(create_repository(str(tmp_path / "users.sqlite"), "sqlite"), SqliteUserRepository)
+
+def test_sqlite_list_users_pages(tmp_path):
+    repo = SqliteUserRepository(str(tmp_path / "users.db"))
+    repo.bulk_add_users(User(f"User{i}", f"user{i}@example.com", "Password1@") for i in range(5))
+    assert [u.name for u in repo.list_users(offset=3)] == ["User3", "User4"]
+    assert [u.name for u in repo.list_users(offset=1, limit=1)] == ["User1"]
+    assert [u.name for u in repo.iter_users(chunk_size=2)] == [f"User{i}" for i in range(5)]
+
+def test_sqlite_find_by_name_ranking_matches_json(tmp_path):
+    names = ["Malice", "Bali", "Alicia", "Alice", "Bob"]
+    json_repo = UserRepository(str(tmp_path / "users.json"))
+    sqlite_repo = SqliteUserRepository(str(tmp_path / "users.db"))
+    for name in names:
+        user = User(name, f"{name.lower()}@example.com", "Password1@")
+        json_repo.add_user(user)
+        sqlite_repo.add_user(user)
+    expected = [u.name for u in json_repo.find_by_name("ALI")]
+    assert expected == ["Alice", "Alicia", "Malice", "Bali"]
+    assert [u.name for u in sqlite_repo.find_by_name("ALI")] == expected
+    assert [u.name for u in sqlite_repo.find_by_name("ali", limit=3)] == expected[:3]
+
+def test_sqlite_adds_version_column_to_old_databases(tmp_path):
+    """
+    Test that a database created before version stamps and lowercased names gets the columns on open.
+    """
+    path = str(tmp_path / "users.db")
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("CREATE TABLE users (user_id TEXT PRIMARY KEY, name TEXT NOT NULL, "
+                     "email TEXT NOT NULL, password TEXT NOT NULL)")
+        conn.execute("INSERT INTO users VALUES ('1', 'Ann', 'ann@example.com', 'Password1@')")
+        conn.execute("INSERT INTO users VALUES ('2', 'ÉLODIE', 'elodie@example.com', 'Password1@')")
+    conn.close()
+    repo = SqliteUserRepository(path)
+    assert repo.get_by_id("1").version == 1
+    assert [user.name for user in repo.query(name_prefix="él")] == ["ÉLODIE"]
+    assert repo.update_user("1", expected_version=1, name="Anna").version == 2
+    # A second connection with a stale read is rejected by the compare-and-set UPDATE
+    with pytest.raises(VersionConflictError):
+        SqliteUserRepository(path).update_user("1", expected_version=1, name="Stale")
+    assert repo.get_by_id("1").name == "Anna"
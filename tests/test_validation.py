@@ -0,0 +1,40 @@
+import random
+import re
+from src.validation import validate_email, validate_many, validate_password
+
+LEGACY_PASSWORD = r'^(?=.*[0-9])(?=.*[a-z])(?=.*[A-Z])(?=.*[@#$%^&+=])(?=\S+$).{8,}$'
+
+def test_validate_password_matches_legacy_pattern():
+    """
+    Test that the single-pass check accepts exactly what the old regex accepted.
+    """
+    rng = random.Random(0)
+    alphabet = "aZ9@ #x\tQ1=é -"
+    samples = ["Abcdef1@", "StrongPass9#", "My$ecurePwd2", "abcdefg", "ABCDEFG1", "Abcdefgh", "Abc def1@", ""]
+    samples += ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12))) for _ in range(5000)]
+    for password in samples:
+        assert validate_password(password) == bool(re.match(LEGACY_PASSWORD, password)), password
+
+def test_validate_email():
+    assert validate_email("user@example.com")
+    assert not validate_email("user@example")
+    assert not validate_email("us er@example.com")
+    assert not validate_email("user@@example.com")
+
+def test_validate_many_reports_errors_and_duplicates():
+    """
+    Test that batch validation reports each invalid record with its index.
+    """
+    records = [
+        {"name": "Alice", "email": "alice@example.com", "password": "Password1@"},
+        {"name": "", "email": "bob@example.com", "password": "Password1@"},
+        {"name": "Carol", "email": "carol@example", "password": "Password1@"},
+        {"name": "Dave", "email": "dave@example.com", "password": "weak"},
+        {"name": "Alice", "email": "alice@example.com", "password": "Password1@"},
+        {"name": "Erin", "email": "erin@example.com", "password": "Password1@"},
+    ]
+    assert validate_many(records) == [(1, "missing name"), (2, "invalid email"), (3, "invalid password")]
+    assert validate_many(records, existing_emails={"erin@example.com"}) == [
+        (1, "missing name"), (2, "invalid email"), (3, "invalid password"),
+        (4, "duplicate email"), (5, "duplicate email"),
+    ]